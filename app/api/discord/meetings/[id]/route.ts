@@ -46,4 +46,58 @@ export async function GET(
       { status: 500 }
     )
   }
-} 
\ No newline at end of file
+} 
+
+/**
+ * API route for updating a meeting's token/cost usage
+ * PATCH /api/discord/meetings/[id]
+ */
+export async function PATCH(
+  req: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const resolvedParams = await params
+    const meetingId = resolvedParams.id
+
+    if (!meetingId) {
+      return NextResponse.json(
+        { isSuccess: false, message: "Meeting ID is required", data: null },
+        { status: 400 }
+      )
+    }
+
+    const body = await req.json()
+    if (!body?.usage) {
+      return NextResponse.json(
+        { isSuccess: false, message: "Usage is required", data: null },
+        { status: 400 }
+      )
+    }
+
+    const [updatedMeeting] = await db
+      .update(meetingsTable)
+      .set({ usage: body.usage })
+      .where(eq(meetingsTable.id, meetingId))
+      .returning()
+
+    if (!updatedMeeting) {
+      return NextResponse.json(
+        { isSuccess: false, message: "Meeting not found", data: null },
+        { status: 404 }
+      )
+    }
+
+    return NextResponse.json({
+      isSuccess: true,
+      message: "Meeting usage updated successfully",
+      data: updatedMeeting
+    })
+  } catch (error) {
+    console.error("Error updating meeting usage:", error)
+    return NextResponse.json(
+      { isSuccess: false, message: "Failed to update meeting usage", data: null },
+      { status: 500 }
+    )
+  }
+}
\ No newline at end of file
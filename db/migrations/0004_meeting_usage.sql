@@ -0,0 +1 @@
+ALTER TABLE "meetings" ADD COLUMN "usage" jsonb;
\ No newline at end of file
@@ -4,10 +4,21 @@ Defines the database schema for meetings (parallel runs).
 </ai_context>
 */
 
-import { boolean, integer, pgEnum, pgTable, text, timestamp, uuid } from "drizzle-orm/pg-core"
+import { boolean, integer, jsonb, pgEnum, pgTable, text, timestamp, uuid } from "drizzle-orm/pg-core"
 import { sessionsTable, SelectSession } from "./sessions-schema"
 import { relations } from "drizzle-orm"
 
+// Token and cost totals for a meeting's LLM calls, written by the Discord bot
+export interface MeetingUsage {
+  promptTokens: number
+  completionTokens: number
+  cachedTokens: number
+  totalTokens: number
+  costUsd: number
+  calls: number
+  byModel: Record<string, { totalTokens: number; costUsd: number; calls: number }>
+}
+
 export const meetingStatusEnum = pgEnum("meeting_status", ["pending", "in_progress", "completed", "failed"])
 
 export const meetingsTable = pgTable("meetings", {
@@ -28,7 +39,8 @@ export const meetingsTable = pgTable("meetings", {
     .defaultNow()
     .notNull()
     .$onUpdate(() => new Date()),
-  completedAt: timestamp("completed_at")
+  completedAt: timestamp("completed_at"),
+  usage: jsonb("usage").$type<MeetingUsage>()
 })
 
 export const meetingsRelations = relations(meetingsTable, ({ one }) => ({
@@ -0,0 +1,219 @@
+# batch_api.py
+
+"""
+Provider Batch API execution for meetings nobody watches live.
+
+In throughput mode (non-live meetings with batch mode on) completions are
+not sent as interactive requests. Each call joins the current wave: calls
+from all runs that arrive within LLM_BATCH_WINDOW seconds of each other
+(openings, turns, syntheses and summaries of parallel runs reach the same
+point together) are written to a JSONL file per model, uploaded, and
+submitted to the provider's batch endpoint. The batch is polled in the
+background, and when it completes every waiting call gets its response and
+its meeting resumes.
+
+Batches are billed at a discount and do not count against interactive rate
+limits, at the price of latency (minutes to hours). OpenAI, Mistral and the
+OpenAI-compatible local endpoint are supported (local_llm_stub.py emulates
+the batch endpoint); other models, failed requests and batches that expire
+fall back to interactive calls.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from credential_pool import credential_pools
+from local_provider import is_local, litellm_request, local_endpoint
+from llm_simulator import llm_simulator
+from traffic_log import traffic_log
+
+logger = logging.getLogger(__name__)
+
+# Batch mode for non-live meetings (per meeting with initialize_meeting(batch_mode=...))
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "false").lower() == "true"
+# Seconds to gather a wave after its first call, and the most calls in one batch
+LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "2"))
+LLM_BATCH_MAX_REQUESTS = int(os.getenv("LLM_BATCH_MAX_REQUESTS", "1000"))
+# How often to poll a submitted batch, and how long to wait before falling back to interactive calls
+LLM_BATCH_POLL_INTERVAL = float(os.getenv("LLM_BATCH_POLL_INTERVAL", "15"))
+LLM_BATCH_MAX_WAIT = float(os.getenv("LLM_BATCH_MAX_WAIT", str(24 * 3600)))
+
+# Model prefix -> litellm provider whose files/batches API serves it
+BATCH_PROVIDERS = {"openai": "openai", "mistral": "mistral", "local": "openai"}
+BATCH_ENDPOINT = "/v1/chat/completions"
+DONE_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchError(RuntimeError):
+    """A call could not be completed through a batch (the caller then calls interactively)."""
+
+
+_current_executor: ContextVar[Optional["BatchExecutor"]] = ContextVar("batch_executor", default=None)
+
+
+def current_batch_executor() -> Optional["BatchExecutor"]:
+    return _current_executor.get()
+
+
+def bind_batch_executor(executor: Optional["BatchExecutor"]) -> None:
+    """Send completions in the rest of the current task (and tasks it starts) through `executor`."""
+    _current_executor.set(executor)
+
+
+class BatchRequest:
+    """One completion waiting for its wave."""
+
+    def __init__(self, custom_id: str, body: Dict[str, Any]):
+        self.custom_id = custom_id
+        self.body = body
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class BatchExecutor:
+    """Collects completions into waves and runs each wave as one batch per model."""
+
+    def __init__(
+        self,
+        window: float = LLM_BATCH_WINDOW,
+        poll_interval: float = LLM_BATCH_POLL_INTERVAL,
+        max_wait: float = LLM_BATCH_MAX_WAIT,
+        max_requests: int = LLM_BATCH_MAX_REQUESTS,
+    ):
+        self.window = window
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.max_requests = max_requests
+        self.pending: Dict[str, List[BatchRequest]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._count = 0
+        self.batches = 0
+
+    def supports(self, full_model: str) -> bool:
+        """Whether `full_model`'s provider has a batch endpoint."""
+        if llm_simulator.enabled or traffic_log.replaying:
+            # The simulator and replayed traffic answer interactive calls only
+            return False
+        if is_local(full_model):
+            return local_endpoint.configured
+        return full_model.split("/", 1)[0] in BATCH_PROVIDERS
+
+    async def complete(self, full_model: str, body: Dict[str, Any]) -> Any:
+        """
+        A chat completion through the next batch for `full_model`.
+
+        Args:
+            full_model: Full litellm model string
+            body: The request body without "model" (messages, temperature, max_tokens, ...)
+
+        Returns:
+            A litellm ModelResponse
+
+        Raises:
+            BatchError: The batch or this request failed
+        """
+        self._count += 1
+        request = BatchRequest(f"req-{self._count}", body)
+        queue = self.pending.setdefault(full_model, [])
+        queue.append(request)
+        if len(queue) >= self.max_requests:
+            self._submit(full_model)
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._submit_wave)
+        return await request.future
+
+    def _submit_wave(self) -> None:
+        self._timer = None
+        for full_model in list(self.pending):
+            self._submit(full_model)
+
+    def _submit(self, full_model: str) -> None:
+        requests = self.pending.pop(full_model, [])
+        if requests:
+            asyncio.create_task(self._run(full_model, requests))
+
+    async def _run(self, full_model: str, requests: List[BatchRequest]) -> None:
+        try:
+            results = await self._run_batch(full_model, requests)
+        except Exception as e:
+            logger.error(f"Batch of {len(requests)} requests for {full_model} failed: {e}")
+            results = {}
+        for request in requests:
+            if request.future.done():
+                continue
+            result = results.get(request.custom_id)
+            if isinstance(result, Exception) or result is None:
+                request.future.set_exception(result or BatchError(f"No batch result for {request.custom_id}"))
+            else:
+                request.future.set_result(result)
+
+    async def _run_batch(self, full_model: str, requests: List[BatchRequest]) -> Dict[str, Any]:
+        """Upload, submit and poll one batch; its responses (or errors) by custom_id."""
+        import litellm
+
+        provider = BATCH_PROVIDERS[full_model.split("/", 1)[0]]
+        pool = credential_pools.for_model(full_model)
+        credential = pool.acquire()
+        pool.release(credential)
+        target = litellm_request(full_model, {"api_key": credential.api_key} if credential.api_key else {})
+        # The provider's own model name, and the credentials / endpoint for its files and batches API
+        model_name = target.pop("model").split("/", 1)[-1]
+        target.pop("max_tokens", None)
+        target.pop("timeout", None)
+
+        lines = []
+        for request in requests:
+            body = {"model": model_name, **{k: v for k, v in request.body.items() if v is not None}}
+            if is_local(full_model):
+                body["max_tokens"] = local_endpoint.clamp_max_tokens(body.get("max_tokens"))
+            lines.append(json.dumps({"custom_id": request.custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}))
+        data = ("\n".join(lines) + "\n").encode()
+
+        input_file = await litellm.acreate_file(
+            file=("wave.jsonl", data), purpose="batch", custom_llm_provider=provider, **target
+        )
+        batch = await litellm.acreate_batch(
+            completion_window="24h", endpoint=BATCH_ENDPOINT, input_file_id=input_file.id,
+            custom_llm_provider=provider, **target
+        )
+        self.batches += 1
+        logger.info(f"Submitted batch {batch.id}: {len(requests)} requests for {full_model}")
+
+        started = time.monotonic()
+        while batch.status not in DONE_STATUSES:
+            if time.monotonic() - started > self.max_wait:
+                try:
+                    await litellm.acancel_batch(batch_id=batch.id, custom_llm_provider=provider, **target)
+                except Exception as e:
+                    logger.warning(f"Could not cancel batch {batch.id}: {e}")
+                raise BatchError(f"Batch {batch.id} still {batch.status} after {self.max_wait:.0f}s")
+            await asyncio.sleep(self.poll_interval)
+            batch = await litellm.aretrieve_batch(batch_id=batch.id, custom_llm_provider=provider, **target)
+        logger.info(f"Batch {batch.id} {batch.status} after {time.monotonic() - started:.1f}s")
+
+        results: Dict[str, Any] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await litellm.afile_content(file_id=file_id, custom_llm_provider=provider, **target)
+            for line in content.content.decode().splitlines():
+                if line.strip():
+                    custom_id, result = parse_result_line(line)
+                    results[custom_id] = result
+        return results
+
+
+def parse_result_line(line: str):
+    """(custom_id, ModelResponse or BatchError) for one line of a batch output or error file."""
+    from litellm import ModelResponse
+
+    record = json.loads(line)
+    response = record.get("response") or {}
+    if record.get("error") or response.get("status_code", 200) >= 400:
+        error = record.get("error") or response.get("body", {}).get("error")
+        return record["custom_id"], BatchError(f"Batch request {record['custom_id']} failed: {error}")
+    return record["custom_id"], ModelResponse(**response["body"])
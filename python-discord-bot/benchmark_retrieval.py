@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Tool Agent retrieval modes (FAISS embeddings vs. local BM25).
+
+For the same set of abstracts and the same conversation, this script reports:
+  1. Retrieval latency for each mode (median over --repeat runs)
+  2. Overlap of the BM25 top-k with the FAISS top-k
+  3. With --answers: end-to-end answer latency and an LLM-judged quality score
+
+Usage:
+    python benchmark_retrieval.py --papers papers.json
+    python benchmark_retrieval.py --keywords "T-cell engineering" "immunotherapy" --answers
+
+    # Deterministic, offline retrieval (local hashing embeddings)
+    python benchmark_retrieval.py --papers papers.json --embedding-backend hashing
+"""
+
+import json
+import time
+import argparse
+import logging
+import statistics
+
+from litellm import completion
+from langchain.schema import Document
+
+import tool_agent_file
+from embedding_backends import BACKENDS, get_embedding_backend
+from tool_agent_file import (
+    select_context_documents,
+    get_combine_docs_chain,
+    query_pubmed,
+    MODEL,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("benchmark_retrieval")
+
+DEFAULT_CONVERSATION = (
+    "The user wants to discuss: new immunotherapy approaches\n\n"
+    "[Principal Investigator]: Let's look at T-cell engineering techniques and what is new there.\n"
+    "[Computational Biologist]: We also talked about using deep learning to predict patient response "
+    "to CAR-T therapy from single-cell sequencing data."
+)
+
+JUDGE_PROMPT = """You are grading a literature summary written for a research discussion.
+Rate how relevant, specific and well-grounded the summary is for the last speaker's question,
+on a scale from 1 (useless) to 10 (excellent). Reply with only the number."""
+
+
+def load_papers(args) -> list[dict]:
+    """Load papers from a JSON file or fetch them from PubMed."""
+    if args.papers:
+        with open(args.papers, "r") as f:
+            return json.load(f)
+    query = " AND ".join(f"({k})" for k in args.keywords)
+    logger.info(f"Fetching papers from PubMed for: {query}")
+    return query_pubmed(query)
+
+
+def judge_answer(conversation: str, answer: str) -> float:
+    """Ask the LLM for a 1-10 quality score of an answer."""
+    response = completion(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": JUDGE_PROMPT},
+            {"role": "user", "content": f"Conversation:\n{conversation}\n\nSummary:\n{answer}"},
+        ],
+        temperature=0,
+        max_tokens=5,
+    )
+    try:
+        return float(response.choices[0].message.content.strip())
+    except ValueError:
+        return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Tool Agent retrieval modes")
+    parser.add_argument("--papers", help="JSON file with a list of paper records (title/abstract)")
+    parser.add_argument("--keywords", nargs="+", default=["T-cell engineering", "immunotherapy"])
+    parser.add_argument("--conversation", default=DEFAULT_CONVERSATION)
+    parser.add_argument("--top-k", type=int, default=tool_agent_file.RETRIEVAL_TOP_K)
+    parser.add_argument("--repeat", type=int, default=5, help="Retrieval runs per mode")
+    parser.add_argument("--answers", action="store_true", help="Also generate and judge full answers")
+    parser.add_argument("--embedding-backend", choices=list(BACKENDS),
+                        help="Embedding backend for the faiss mode (default: EMBEDDING_BACKEND)")
+    args = parser.parse_args()
+    embeddings = get_embedding_backend(args.embedding_backend)
+
+    papers = load_papers(args)
+    docs = [Document(page_content=p["abstract"], metadata={"title": p.get("title")})
+            for p in papers if p.get("abstract")]
+    logger.info(f"Benchmarking with {len(docs)} abstracts, top_k={args.top_k}, embeddings={embeddings.model_id}")
+
+    input_str = (
+        f"{args.conversation}\n\n"
+        f"Based on the above conversation, provide relevant context for these keywords: {args.keywords}."
+    )
+
+    results = {}
+    for mode in ("faiss", "bm25"):
+        timings = []
+        selected = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            selected = select_context_documents(docs, input_str, args.conversation, args.keywords,
+                                                mode=mode, k=args.top_k, embeddings=embeddings)
+            timings.append(time.perf_counter() - start)
+        results[mode] = {
+            "retrieval_median_s": statistics.median(timings),
+            "selected": [d.page_content for d in selected],
+        }
+
+        if args.answers:
+            start = time.perf_counter()
+            answer = get_combine_docs_chain().invoke({"input": input_str, "context": selected})
+            results[mode]["answer_s"] = time.perf_counter() - start
+            results[mode]["quality"] = judge_answer(args.conversation, answer)
+
+    overlap = len(set(results["faiss"]["selected"]) & set(results["bm25"]["selected"]))
+    print("\n=== RETRIEVAL BENCHMARK ===")
+    for mode, r in results.items():
+        line = f"{mode:>6}: retrieval {r['retrieval_median_s'] * 1000:8.1f} ms"
+        if args.answers:
+            line += f" | answer {r['answer_s']:6.2f} s | quality {r['quality']:.1f}/10"
+        print(line)
+    print(f"overlap@{args.top_k} (bm25 vs faiss): {overlap}/{min(args.top_k, len(docs))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark meeting turns: selection call + agent call vs. one fused select-and-speak call.
+
+For the same meeting and conversation, this script runs --trials turns in each
+mode and reports:
+  1. Turn latency (median and mean)
+  2. Which agents were chosen
+  3. An LLM-judged quality score of the replies (1-10)
+  4. How often the fused call fell back (invalid reply)
+
+Usage:
+    python benchmark_turns.py
+    python benchmark_turns.py --trials 20 --judge-model openai/gpt-4o
+    python benchmark_turns.py --conversation-file transcript.txt
+"""
+
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from collections import Counter
+
+from llm_client import LLMClient, provider_for_model
+from models import LLMMessage
+from model_routing import model_policy
+from orchestrator import AGENT_TEMPERATURE, agent_key_for_role, speaker_choice_schema
+from fused_turn import select_and_speak
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("benchmark_turns")
+
+AGENTS = [
+    {"name": "Immunologist", "role": "Scientist",
+     "expertise": "T-cell biology and cancer immunotherapy", "goal": "identify promising immunotherapy targets"},
+    {"name": "Computational Biologist", "role": "Scientist",
+     "expertise": "single-cell sequencing analysis and machine learning", "goal": "predict patient response from omics data"},
+    {"name": "Scientific Critic", "role": "Critical Reviewer",
+     "expertise": "Critical analysis of scientific research", "goal": "Ensure scientific rigor"},
+]
+
+DEFAULT_CONVERSATION = (
+    "The user wants to discuss: new immunotherapy approaches\n\n"
+    "[Principal Investigator (Opening)]: Welcome. Today we look at how to improve CAR-T response rates in solid tumors. "
+    "1) Which targets look most promising? 2) Can we predict who will respond?\n\n"
+    "=== ROUND 1 of 2 ===\n"
+    "[Immunologist]: The tumor microenvironment is the main obstacle; armored CAR-Ts secreting IL-12 are worth a look.\n"
+    "[Computational Biologist]: Single-cell data from responders could show which T-cell states persist after infusion."
+)
+
+SELECTION_PROMPT = """You are the Orchestrator.
+Read the conversation so far, then decide which agent should speak next.
+Your possible agents are: {agents}.
+
+Only output valid JSON and nothing else.
+"""
+
+JUDGE_PROMPT = """You are grading the next contribution to a research discussion.
+Rate how well it fits the speaker's expertise, moves the discussion forward, and stays
+concise and specific, on a scale from 1 (useless) to 10 (excellent). Reply with only the number."""
+
+
+async def two_call_turn(client, conversation):
+    """The orchestrator's default turn: a selection call, then the chosen agent's call."""
+    names = [a["name"] for a in AGENTS]
+    choice = await client.generate_structured(
+        provider=provider_for_model(model_policy.model_for("selection")),
+        messages=[LLMMessage(role="system", content=SELECTION_PROMPT.format(agents=", ".join(names))),
+                  LLMMessage(role="user", content=conversation)],
+        schema=speaker_choice_schema(names),
+        model=model_policy.model_for("selection"),
+        temperature=1,
+        reply_kind="selection",
+    )
+    agent = next(a for a in AGENTS if a["name"] == choice.agent)
+    reply = await client.call_agent(
+        agent_key=agent_key_for_role(agent["role"]),
+        conversation_history=conversation,
+        expertise=agent["expertise"],
+        goal=agent["goal"],
+        agent_name=agent["name"],
+        model=model_policy.model_for("turn", agent),
+        temperature=AGENT_TEMPERATURE,
+    )
+    return agent["name"], reply
+
+
+async def fused_turn(client, conversation):
+    """One select-and-speak call; None when it fell back."""
+    personas = {
+        a["name"]: client.agent_system_prompt(agent_key_for_role(a["role"]), a["expertise"], a["goal"], None, a["name"])
+        for a in AGENTS
+    }
+    choice = await select_and_speak(
+        client, personas, conversation, model_policy.model_for("turn"), temperature=AGENT_TEMPERATURE
+    )
+    if choice is None or not choice.reply.strip():
+        return None
+    return choice.agent, choice.reply
+
+
+async def judge_reply(client, judge_model, conversation, speaker, reply):
+    """Ask the LLM for a 1-10 quality score of a reply."""
+    agent = next(a for a in AGENTS if a["name"] == speaker)
+    response = await client.generate_response(
+        provider=provider_for_model(judge_model),
+        messages=[
+            LLMMessage(role="system", content=JUDGE_PROMPT),
+            LLMMessage(role="user", content=(
+                f"Conversation:\n{conversation}\n\n"
+                f"Speaker: {speaker} (expertise: {agent['expertise']})\n\nContribution:\n{reply}"
+            )),
+        ],
+        model=judge_model,
+        temperature=0,
+        max_tokens=5,
+    )
+    try:
+        return float(response.content.strip())
+    except ValueError:
+        return float("nan")
+
+
+async def run(args):
+    client = LLMClient()
+    conversation = DEFAULT_CONVERSATION
+    if args.conversation_file:
+        with open(args.conversation_file, "r") as f:
+            conversation = f.read()
+
+    results = {}
+    for mode, turn in (("two-call", two_call_turn), ("fused", fused_turn)):
+        timings, speakers, scores, fallbacks = [], Counter(), [], 0
+        for _ in range(args.trials):
+            start = time.perf_counter()
+            outcome = await turn(client, conversation)
+            if outcome is None:
+                # What the orchestrator does next: the two-call turn
+                fallbacks += 1
+                outcome = await two_call_turn(client, conversation)
+            timings.append(time.perf_counter() - start)
+            speaker, reply = outcome
+            speakers[speaker] += 1
+            scores.append(await judge_reply(client, args.judge_model, conversation, speaker, reply))
+        results[mode] = {
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.mean(timings),
+            "quality": statistics.mean(scores),
+            "speakers": dict(speakers),
+            "fallbacks": fallbacks,
+        }
+
+    print("\n=== TURN BENCHMARK ===")
+    print(f"selection model: {model_policy.model_for('selection')} | turn model: {model_policy.model_for('turn')}")
+    for mode, r in results.items():
+        print(
+            f"{mode:>8}: median {r['median_s']:6.2f} s | mean {r['mean_s']:6.2f} s | "
+            f"quality {r['quality']:.1f}/10 | fallbacks {r['fallbacks']}/{args.trials} | speakers {r['speakers']}"
+        )
+    speedup = results["two-call"]["median_s"] / results["fused"]["median_s"]
+    print(f"fused speedup (median): {speedup:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark two-call vs. fused meeting turns")
+    parser.add_argument("--trials", type=int, default=10, help="Turns per mode")
+    parser.add_argument("--conversation-file", help="Text file with the conversation to continue")
+    parser.add_argument("--judge-model", default="openai/gpt-4o")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
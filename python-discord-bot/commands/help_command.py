@@ -268,7 +268,7 @@ class HelpCommand(commands.Cog):
                 "lab team_meeting": {
                     "title": "Team Meeting Command",
                     "description": "Start a multi-agent conversation in the active session.",
-                    "usage": "/lab team_meeting agenda:\"topic\" [rounds:3] [parallel_meetings:1] [agent_list:\"Agent1,Agent2\"] [auto_generate:false] [auto_scientist_count:3] [auto_include_critic:true] [temperature_variation:true] [live_mode:true] [speakers_per_round:null]",
+                    "usage": "/lab team_meeting agenda:\"topic\" [rounds:3] [parallel_meetings:1] [agent_list:\"Agent1,Agent2\"] [auto_generate:false] [auto_scientist_count:3] [auto_include_critic:true] [temperature_variation:true] [live_mode:true] [speakers_per_round:null] [model_profile:balanced] [budget_usd:null]",
                     "parameters": {
                         "agenda": "The main topic or question (required)",
                         "rounds": "Number of conversation rounds (default: 3)",
@@ -279,7 +279,9 @@ class HelpCommand(commands.Cog):
                         "auto_include_critic": "Include critic if auto-generating (default: true)",
                         "temperature_variation": "Increase temperature variation for parallel runs to get more diverse responses (default: true)",
                         "live_mode": "Show agent responses in real-time (default: true)",
-                        "speakers_per_round": "Number of agent speakers per round (default: all agents)"
+                        "speakers_per_round": "Number of agent speakers per round (default: all agents)",
+                        "model_profile": "Model tiers: balanced, economy (fast models throughout) or premium (default: deployment policy)",
+                        "budget_usd": "Cost limit per run in USD; near it the meeting switches to fast models, at it the meeting skips to the summary (default: deployment budget)"
                     },
                     "example": "/lab team_meeting agenda:\"Novel immunotherapy approaches\" rounds:4 agent_list:\"PI,Scientist1,Critic\"",
                     "color": discord.Color.gold()
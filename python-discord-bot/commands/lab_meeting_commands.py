@@ -13,6 +13,8 @@ from db_client import db_client
 from orchestrator import AgentOrchestrator
 from llm_client import LLMClient, llm_client
 from models import ModelConfig, LLMMessage, LLMProvider
+from model_routing import model_policy
+from usage_ledger import BUDGET_EXHAUSTED, bind_usage_scope, usage_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -70,8 +72,15 @@ class LabMeetingCommands(commands.Cog):
         auto_include_critic="Include a critic agent if auto_generate is true (default: true)",
         temperature_variation="Increase temperature variation for parallel runs (default: true)",
         live_mode="Show agent responses in real-time (default: true)",
-        speakers_per_round="Number of agent speakers selected per round (default: all agents excluding PI)"
+        speakers_per_round="Number of agent speakers selected per round (default: all agents excluding PI)",
+        model_profile="Model tiers for this meeting: balanced, economy or premium (default: deployment policy)",
+        budget_usd="Cost limit per run in USD (default: deployment budget)"
     )
+    @app_commands.choices(model_profile=[
+        app_commands.Choice(name="Balanced", value="balanced"),
+        app_commands.Choice(name="Economy", value="economy"),
+        app_commands.Choice(name="Premium", value="premium"),
+    ])
     async def team_meeting(
         self,
         interaction: discord.Interaction,
@@ -84,9 +93,13 @@ class LabMeetingCommands(commands.Cog):
         auto_include_critic: Optional[bool] = True,
         temperature_variation: Optional[bool] = True,
         live_mode: Optional[bool] = True,
-        speakers_per_round: Optional[int] = None
+        speakers_per_round: Optional[int] = None,
+        model_profile: Optional[app_commands.Choice[str]] = None,
+        budget_usd: Optional[float] = None
     ):
         """Start a multi-agent team meeting."""
+        model_profile = model_profile.value if model_profile else None
+        persona_model = model_policy.with_overrides(model_profile).model_for("persona")
         await interaction.response.defer(ephemeral=True, thinking=True)
         
         user_id = str(interaction.user.id)
@@ -105,12 +118,22 @@ class LabMeetingCommands(commands.Cog):
             session_data = session_result.get("data", {})
             session_id = session_data.get("id")
             
+            # Bill persona generation and the meetings to this session and user
+            bind_usage_scope(session_id=session_id, user_id=user_id)
+            if usage_ledger.budget_status() == BUDGET_EXHAUSTED:
+                await interaction.followup.send(
+                    "Your usage budget has been reached, so no new meetings can be started right now.",
+                    ephemeral=True
+                )
+                return
+            
             # If auto_generate is true, create the agents
             if auto_generate:
                 # Generate variables for the PI based on the agenda
                 pi_variables = await llm_client.generate_agent_variables(
                     topic=agenda,
-                    agent_type="principal_investigator"
+                    agent_type="principal_investigator",
+                    model=persona_model
                 )
                 
                 # Create PI
@@ -160,7 +183,8 @@ class LabMeetingCommands(commands.Cog):
                     scientist_variables = await llm_client.generate_agent_variables(
                         topic=agenda,
                         agent_type="scientist",
-                        additional_context="\n".join(diversity_context)
+                        additional_context="\n".join(diversity_context),
+                        model=persona_model
                     )
                     
                     # Get the agent name, ensuring it's unique
@@ -288,7 +312,11 @@ class LabMeetingCommands(commands.Cog):
                     agenda=agenda,
                     round_count=rounds,
                     parallel_index=i,
-                    total_parallel_meetings=parallel_meetings
+                    total_parallel_meetings=len(meetings),
+                    model_policy=model_profile,
+                    budget=budget_usd,
+                    temperature_variation=temperature_variation,
+                    parallel_group=meetings[0].get("id")
                 )
                 
                 # Start the conversation in a background task
@@ -793,7 +821,7 @@ class LabMeetingCommands(commands.Cog):
                         provider=LLMProvider.OPENAI,
                         messages=messages,
                         temperature=0.7,
-                        max_tokens=2000
+                        reply_kind="combined_summary"
                     )
                     
                     combined_summary = response.content
@@ -1002,7 +1030,7 @@ class LabMeetingCommands(commands.Cog):
                         provider=LLMProvider.OPENAI,
                         messages=messages,
                         temperature=0.7,
-                        max_tokens=2000
+                        reply_kind="combined_summary"
                     )
                     
                     combined_summary = response.content
@@ -0,0 +1,345 @@
+# corpus_index.py
+
+"""
+Semantic vector index over the local preprint dumps.
+
+An offline job (`python manage_dumps.py build-index`) embeds the title and
+abstract of every record into an append-only, memory-mapped float16 matrix
+stored next to the dump. Queries are answered with a blocked brute-force
+cosine search in NumPy, so the Tool Agent can search hundreds of thousands of
+abstracts locally. Indexes that fit in CORPUS_INDEX_RESIDENT_MB are also kept
+in RAM as float32 for speed; larger ones are streamed from the memory map.
+
+Because the dumps are append-only (see preprint_dumps.py), building the index
+again only embeds the records added since the last build.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_backends import EMBEDDING_BACKEND, get_embedding_backend, normalize_rows
+from preprint_dumps import DUMP_SERVERS, dump_path
+
+logger = logging.getLogger(__name__)
+
+# Backend used for the corpus (see embedding_backends.py). The index records
+# which one built it, and a different backend requires a rebuild.
+CORPUS_EMBEDDING_BACKEND = os.getenv("CORPUS_EMBEDDING_BACKEND", EMBEDDING_BACKEND)
+# text-embedding-3 models can return shortened vectors; 512 dims keeps the
+# matrix small enough for fast brute-force search
+EMBEDDING_DIMENSIONS = int(os.getenv("CORPUS_EMBEDDING_DIMENSIONS", "512"))
+
+# Rows scored per block during search (bounds the float32 working set)
+SEARCH_BLOCK_ROWS = 65536
+# Indexes up to this size are also kept in RAM as float32: converting float16
+# rows on every query costs several times more than the matrix product itself
+RESIDENT_MAX_MB = int(os.getenv("CORPUS_INDEX_RESIDENT_MB", "1024"))
+QUERY_CACHE_SIZE = 256
+
+
+# =============================================================================
+# Embedding
+# =============================================================================
+
+def corpus_backend():
+    """The embedding backend for the corpus index."""
+    return get_embedding_backend(CORPUS_EMBEDDING_BACKEND, dimensions=EMBEDDING_DIMENSIONS)
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """Embed texts with the corpus backend, returning L2-normalized float32 rows."""
+    return corpus_backend().embed_array(texts)
+
+
+_query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Embed a single query, reusing cached embeddings for repeated queries."""
+    with _query_cache_lock:
+        if text in _query_cache:
+            _query_cache.move_to_end(text)
+            return _query_cache[text]
+    vector = embed_texts([text])[0]
+    with _query_cache_lock:
+        _query_cache[text] = vector
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return vector
+
+
+# =============================================================================
+# Append-only memory-mapped vector store
+# =============================================================================
+
+class VectorStore:
+    """
+    Float16 vectors in a raw file, memory-mapped for search.
+
+    Layout for a base path `p`:
+        p.f16        row-major float16 matrix (count x dim)
+        p.meta.json  {"dim": ..., "count": ..., "model": ...}
+
+    Vectors are appended by writing to the end of the raw file and then
+    bumping `count` in the metadata, so readers never see a partial row.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.vectors_path = base_path + ".f16"
+        self.meta_path = base_path + ".meta.json"
+        self._matrix = None
+        self._matrix_count = -1
+        self._resident = None
+        self._lock = threading.Lock()
+
+    def meta(self) -> Dict:
+        try:
+            with open(self.meta_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dim": None, "count": 0, "model": None}
+
+    def _write_meta(self, meta: Dict) -> None:
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    @property
+    def count(self) -> int:
+        return self.meta()["count"]
+
+    def append(self, vectors: np.ndarray, model: Optional[str] = None) -> None:
+        """Append L2-normalized vectors to the store."""
+        if len(vectors) == 0:
+            return
+        meta = self.meta()
+        if meta["dim"] is not None and meta["dim"] != vectors.shape[1]:
+            raise ValueError(f"Dimension mismatch: store has {meta['dim']}, got {vectors.shape[1]}")
+
+        os.makedirs(os.path.dirname(self.base_path) or ".", exist_ok=True)
+        with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+            # Drop any rows written after the last committed count (e.g. an interrupted build)
+            f.truncate(meta["count"] * vectors.shape[1] * 2)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float16).tobytes())
+
+        meta.update(dim=int(vectors.shape[1]), count=meta["count"] + len(vectors), model=model or meta.get("model"))
+        self._write_meta(meta)
+
+    def matrix(self) -> Optional[np.ndarray]:
+        """Read-only memory map of the committed rows (reopened when the store grows)."""
+        meta = self.meta()
+        if not meta["count"]:
+            return None
+        if self._matrix is None or self._matrix_count != meta["count"]:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float16, mode="r",
+                                     shape=(meta["count"], meta["dim"]))
+            self._matrix_count = meta["count"]
+        return self._matrix
+
+    def _search_matrix(self) -> Optional[np.ndarray]:
+        """
+        The matrix to scan: a float32 copy in RAM when it fits RESIDENT_MAX_MB,
+        otherwise the float16 memory map (converted block by block).
+        """
+        with self._lock:
+            matrix = self.matrix()
+            if matrix is None:
+                return None
+            if matrix.shape[0] * matrix.shape[1] * 4 > RESIDENT_MAX_MB * 1024 * 1024:
+                self._resident = None
+                return matrix
+            resident_rows = 0 if self._resident is None else self._resident.shape[0]
+            if resident_rows != matrix.shape[0]:
+                # Only convert rows appended since the copy was made
+                if resident_rows > matrix.shape[0]:
+                    resident_rows, self._resident = 0, None
+                new_rows = np.asarray(matrix[resident_rows:], dtype=np.float32)
+                self._resident = new_rows if self._resident is None else np.concatenate([self._resident, new_rows])
+            return self._resident
+
+    def check_model(self, model_id: str) -> None:
+        """Raise if the store was built by a different embedding model."""
+        built_with = self.meta().get("model")
+        if self.count and built_with and built_with != model_id:
+            raise ValueError(
+                f"{self.base_path} was built with {built_with}, not {model_id}; "
+                f"delete it and run `manage_dumps.py build-index` again"
+            )
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Blocked brute-force cosine search.
+
+        Each block keeps only its own top-k via argpartition, so memory use and
+        sorting cost stay bounded regardless of the number of rows.
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results
+            mask: Optional boolean array; rows where it is False are skipped
+
+        Returns:
+            (row, score) pairs, best first
+        """
+        matrix = self._search_matrix()
+        if matrix is None or k <= 0:
+            return []
+
+        query = np.asarray(query, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+            block = matrix[start:start + SEARCH_BLOCK_ROWS]
+            if block.dtype != np.float32:
+                block = np.asarray(block, dtype=np.float32)
+            scores = block @ query
+            if mask is not None:
+                scores[~mask[start:start + len(block)]] = -np.inf
+            # Keep only this block's top-k candidates, then merge with the running best
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores, kind="stable")
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order if np.isfinite(best_scores[i])]
+
+
+# =============================================================================
+# Index over a preprint dump
+# =============================================================================
+
+class CorpusIndex:
+    """
+    Vector index for one server's dump.
+
+    Besides the VectorStore it keeps `<dump>.vec.offsets.i64`: the byte offset
+    of each indexed line in the dump, so hits can be read back with a seek.
+    """
+
+    def __init__(self, server: str):
+        self.server = server
+        self.dump_path = dump_path(server)
+        self.store = VectorStore(self.dump_path + ".vec")
+        self.offsets_path = self.dump_path + ".vec.offsets.i64"
+
+    def offsets(self) -> np.ndarray:
+        if not os.path.exists(self.offsets_path):
+            return np.empty(0, dtype=np.int64)
+        return np.fromfile(self.offsets_path, dtype=np.int64)[:self.store.count]
+
+    def _next_offset(self) -> int:
+        """Byte offset in the dump where unindexed records start."""
+        offsets = self.offsets()
+        if len(offsets) == 0:
+            return 0
+        with open(self.dump_path, "rb") as f:
+            f.seek(int(offsets[-1]))
+            f.readline()
+            return f.tell()
+
+    def build(self, batch_size: int = 1024, limit: Optional[int] = None) -> int:
+        """
+        Embed the records appended to the dump since the last build.
+
+        Args:
+            batch_size: Records embedded and committed per step
+            limit: Optional cap on the number of records embedded in this run
+
+        Returns:
+            Number of newly indexed records
+        """
+        if not os.path.exists(self.dump_path):
+            raise FileNotFoundError(f"Dump not found: {self.dump_path}")
+
+        model_id = corpus_backend().model_id
+        self.store.check_model(model_id)
+
+        added = 0
+        with open(self.dump_path, "rb") as f:
+            f.seek(self._next_offset())
+            while limit is None or added < limit:
+                texts, offsets = [], []
+                while len(texts) < batch_size and (limit is None or added + len(texts) < limit):
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line or not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        record = {}
+                    texts.append(f"{record.get('title') or ''}\n{record.get('abstract') or ''}")
+                    offsets.append(offset)
+                if not texts:
+                    break
+
+                vectors = embed_texts(texts)
+                # Offsets first: rows past the committed vector count are ignored on read
+                existing = self.store.count
+                with open(self.offsets_path, "r+b" if os.path.exists(self.offsets_path) else "wb") as offsets_file:
+                    offsets_file.truncate(existing * 8)
+                    offsets_file.seek(0, os.SEEK_END)
+                    offsets_file.write(np.asarray(offsets, dtype=np.int64).tobytes())
+                self.store.append(vectors, model=model_id)
+
+                added += len(texts)
+                logger.info(f"Indexed {added} new {self.server} records ({self.store.count} total)")
+
+        return added
+
+    def read_records(self, rows: Sequence[int]) -> List[Dict]:
+        """Read dump records for the given index rows."""
+        offsets = self.offsets()
+        records = []
+        with open(self.dump_path, "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        """Semantic search; returns dump records with a `score` field, best first."""
+        self.store.check_model(corpus_backend().model_id)
+        hits = self.store.search(embed_query(query), k)
+        records = self.read_records([row for row, _ in hits])
+        for record, (_, score) in zip(records, hits):
+            record["score"] = score
+        return records
+
+
+_corpus_indexes: Dict[str, CorpusIndex] = {}
+
+
+def get_corpus_index(server: str) -> CorpusIndex:
+    """Shared CorpusIndex per server (keeps the memory maps open between queries)."""
+    if server not in _corpus_indexes:
+        _corpus_indexes[server] = CorpusIndex(server)
+    return _corpus_indexes[server]
+
+
+def search_corpus(query: str, k: int = 10, servers: Sequence[str] = DUMP_SERVERS) -> List[Dict]:
+    """Search every server that has an index and return the overall top-k records."""
+    results = []
+    for server in servers:
+        index = get_corpus_index(server)
+        if index.store.count:
+            results.extend(index.search(query, k))
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:k]
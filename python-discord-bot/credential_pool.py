@@ -0,0 +1,308 @@
+# credential_pool.py
+
+"""
+Pools of API keys per provider.
+
+A deployment can configure several keys (or organizations) per provider:
+
+    OPENAI_API_KEYS=sk-first,sk-second|org-team-b
+    ANTHROPIC_API_KEYS=sk-ant-first,sk-ant-second
+
+(`KEY|ORGANIZATION` sets an OpenAI organization for that key; the single
+OPENAI_API_KEY / ANTHROPIC_API_KEY / MISTRAL_API_KEY variables still work and
+join the pool; a local endpoint's keys are LOCAL_LLM_API_KEYS / LOCAL_LLM_API_KEY.) Every request takes the key with the most remaining quota,
+as reported by the provider's rate-limit headers and counting requests still
+in flight. A key that gets a 429 goes cold until the provider's Retry-After
+(or its rate-limit reset) has passed, and the request moves straight on to a
+warm key, so parallel meetings scale with the number of keys.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from llm_resilience import retry_after_seconds
+from prompt_cache import usage_dict
+
+logger = logging.getLogger(__name__)
+
+# How long a key stays cold after a 429 without a Retry-After hint
+KEY_COOLDOWN = float(os.getenv("LLM_KEY_COOLDOWN", "30"))
+
+# litellm provider prefix -> environment variable prefix
+PROVIDER_ENV = {"openai": "OPENAI", "anthropic": "ANTHROPIC", "mistral": "MISTRAL", "local": "LOCAL_LLM"}
+
+# Remaining-quota headers as litellm exposes them (raw and provider-prefixed)
+REMAINING_REQUESTS_HEADERS = (
+    "x-ratelimit-remaining-requests",
+    "llm_provider-x-ratelimit-remaining-requests",
+    "llm_provider-anthropic-ratelimit-requests-remaining",
+)
+REMAINING_TOKENS_HEADERS = (
+    "x-ratelimit-remaining-tokens",
+    "llm_provider-x-ratelimit-remaining-tokens",
+    "llm_provider-anthropic-ratelimit-tokens-remaining",
+)
+RESET_REQUESTS_HEADERS = (
+    "x-ratelimit-reset-requests",
+    "llm_provider-x-ratelimit-reset-requests",
+)
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in an OpenAI reset header ("1s", "6m0s", "20ms", or a plain number)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def _header(headers: Dict[str, Any], names) -> Optional[str]:
+    for name in names:
+        if headers.get(name) is not None:
+            return str(headers[name])
+    return None
+
+
+def _response_headers(response: Any) -> Dict[str, Any]:
+    hidden = getattr(response, "_hidden_params", None) or {}
+    return hidden.get("additional_headers") or {}
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+@dataclass
+class Credential:
+    """One API key and what it has done."""
+    label: str
+    api_key: str
+    organization: Optional[str] = None
+    remaining_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    cold_until: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    tokens: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+
+    @property
+    def is_cold(self) -> bool:
+        return time.monotonic() < self.cold_until
+
+    def request_kwargs(self) -> Dict[str, str]:
+        """litellm arguments selecting this key (none for the environment's default)."""
+        if not self.api_key:
+            return {}
+        kwargs = {"api_key": self.api_key}
+        if self.organization:
+            kwargs["organization"] = self.organization
+        return kwargs
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "key": self.label,
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "rateLimited": self.rate_limited,
+            "errors": self.errors,
+            "remainingRequests": self.remaining_requests,
+            "remainingTokens": self.remaining_tokens,
+            "cold": self.is_cold,
+        }
+
+
+@dataclass
+class CredentialPool:
+    """The keys for one provider."""
+    provider: str
+    credentials: List[Credential] = field(default_factory=list)
+
+    def __post_init__(self):
+        # Without configured keys, requests go out with litellm's own default credentials
+        if not self.credentials:
+            self.credentials.append(Credential(label=f"{self.provider} (default)", api_key=""))
+        # Keys are taken from the event loop and from worker threads (structured Tool Agent calls)
+        self._lock = threading.Lock()
+
+    @property
+    def has_keys(self) -> bool:
+        return any(c.api_key for c in self.credentials)
+
+    def acquire(self) -> Credential:
+        """
+        Take the warm key with the most remaining quota.
+
+        When every key is cold, the one that recovers first is returned (its
+        429 then reaches the retry logic with the provider's Retry-After).
+        """
+        with self._lock:
+            warm = [c for c in self.credentials if not c.is_cold]
+            if warm:
+                credential = max(warm, key=self._headroom)
+            else:
+                credential = min(self.credentials, key=lambda c: c.cold_until)
+            credential.in_flight += 1
+            credential.requests += 1
+            if credential.remaining_requests is not None:
+                credential.remaining_requests = max(0, credential.remaining_requests - 1)
+            return credential
+
+    @staticmethod
+    def _headroom(credential: Credential):
+        # Unknown quota sorts first so every key reports its headers early;
+        # ties go to the key with fewer requests in flight, then fewer overall
+        remaining = credential.remaining_requests
+        return (
+            float("inf") if remaining is None else remaining,
+            float("inf") if credential.remaining_tokens is None else credential.remaining_tokens,
+            -credential.in_flight,
+            -credential.requests,
+        )
+
+    def release(self, credential: Credential, response: Any = None, error: Optional[BaseException] = None) -> None:
+        """Return a key, updating its quota from the response or cooling it on a 429."""
+        with self._lock:
+            credential.in_flight = max(0, credential.in_flight - 1)
+            if error is not None:
+                credential.errors += 1
+                if is_rate_limited(error):
+                    credential.rate_limited += 1
+                    cooldown = retry_after_seconds(error) or KEY_COOLDOWN
+                    credential.cold_until = time.monotonic() + cooldown
+                    credential.remaining_requests = 0
+                    logger.warning(f"{credential.label} rate limited; cold for {cooldown:.0f}s")
+                return
+            if response is None:
+                return
+            headers = _response_headers(response)
+            remaining = _header(headers, REMAINING_REQUESTS_HEADERS)
+            if remaining is not None and remaining.isdigit():
+                credential.remaining_requests = int(remaining)
+                if credential.remaining_requests == 0:
+                    # Out of requests for this window: cool down until it resets
+                    reset = parse_duration(_header(headers, RESET_REQUESTS_HEADERS) or "")
+                    credential.cold_until = time.monotonic() + (reset or KEY_COOLDOWN)
+            remaining = _header(headers, REMAINING_TOKENS_HEADERS)
+            if remaining is not None and remaining.isdigit():
+                credential.remaining_tokens = int(remaining)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                credential.tokens += usage_dict(usage)["total_tokens"]
+
+    def record_tokens(self, credential: Credential, usage: Any) -> None:
+        """Add a streamed reply's tokens (known only once the stream ends)."""
+        with self._lock:
+            credential.tokens += usage_dict(usage)["total_tokens"]
+
+    def _has_warm_key(self) -> bool:
+        with self._lock:
+            return any(not c.is_cold for c in self.credentials)
+
+    async def call(self, request: Callable[[Credential], Awaitable[Any]]) -> Any:
+        """
+        Run `request(credential)`, moving on to another key after a 429.
+
+        The request passes credential.request_kwargs() to litellm.
+
+        Raises:
+            Exception: The request's error, or the last 429 once every key is cold
+        """
+        while True:
+            credential = self.acquire()
+            try:
+                response = await request(credential)
+            except Exception as e:
+                self.release(credential, error=e)
+                if is_rate_limited(e) and self._has_warm_key():
+                    continue
+                raise
+            except BaseException:
+                # Cancelled (e.g. the losing side of a hedged request): not the key's fault
+                self.release(credential)
+                raise
+            self.release(credential, response)
+            return response
+
+    def call_sync(self, request: Callable[[Credential], Any]) -> Any:
+        """Blocking variant of call()."""
+        while True:
+            credential = self.acquire()
+            try:
+                response = request(credential)
+            except Exception as e:
+                self.release(credential, error=e)
+                if is_rate_limited(e) and self._has_warm_key():
+                    continue
+                raise
+            except BaseException:
+                # Cancelled (e.g. the losing side of a hedged request): not the key's fault
+                self.release(credential)
+                raise
+            self.release(credential, response)
+            return response
+
+    def report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [credential.report() for credential in self.credentials]
+
+
+def load_credentials(provider: str) -> List[Credential]:
+    """The keys configured for a provider (<PREFIX>_API_KEYS plus <PREFIX>_API_KEY)."""
+    prefix = PROVIDER_ENV.get(provider, provider.upper())
+    entries = [e.strip() for e in os.getenv(f"{prefix}_API_KEYS", "").split(",") if e.strip()]
+    single = os.getenv(f"{prefix}_API_KEY", "").strip()
+    if single and single not in [e.split("|", 1)[0] for e in entries]:
+        entries.insert(0, single)
+    credentials = []
+    for index, entry in enumerate(entries, start=1):
+        api_key, _, organization = entry.partition("|")
+        credentials.append(Credential(
+            label=f"{provider}#{index} (...{api_key[-4:]})",
+            api_key=api_key,
+            organization=organization or None,
+        ))
+    return credentials
+
+
+class CredentialPools:
+    """A CredentialPool per provider, keyed by litellm model prefix."""
+
+    def __init__(self):
+        self.pools: Dict[str, CredentialPool] = {
+            provider: CredentialPool(provider, load_credentials(provider)) for provider in PROVIDER_ENV
+        }
+        for provider, pool in self.pools.items():
+            if len(pool.credentials) > 1:
+                logger.info(f"Using {len(pool.credentials)} API keys for {provider}")
+
+    def for_model(self, full_model: str) -> CredentialPool:
+        provider = full_model.split("/", 1)[0] if "/" in full_model else "openai"
+        if provider not in self.pools:
+            self.pools[provider] = CredentialPool(provider)
+        return self.pools[provider]
+
+    def has_keys(self, provider: str) -> bool:
+        pool = self.pools.get(provider)
+        return bool(pool and pool.has_keys)
+
+    def report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Usage per key for every provider with keys configured."""
+        return {provider: pool.report() for provider, pool in self.pools.items() if pool.has_keys}
+
+
+# Process-wide pools
+credential_pools = CredentialPools()
@@ -183,6 +183,16 @@ class DatabaseClient:
                         result = await response.json()
                         return result
                 
+                elif method == "PATCH":
+                    async with session.patch(url, json=data, headers=headers) as response:
+                        if response.status >= 400:
+                            error_text = await response.text()
+                            logger.error(f"API error ({response.status}): {error_text}")
+                            return {"isSuccess": False, "message": f"API error: {response.status}", "data": None}
+                        
+                        result = await response.json()
+                        return result
+                
                 elif method == "DELETE":
                     async with session.delete(url, json=data, headers=headers) as response:
                         if response.status >= 400:
@@ -375,6 +385,18 @@ class DatabaseClient:
         """
         return await self._make_request("PUT", f"/discord/meetings/{meeting_id}/end")
     
+    async def update_meeting_usage(self, meeting_id: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a meeting's token/cost totals.
+        
+        Args:
+            meeting_id: ID of the meeting
+            usage: Totals from the usage ledger (UsageTotals.to_record)
+            
+        Returns:
+            Meeting data or error information
+        """
+        return await self._make_request("PATCH", f"/discord/meetings/{meeting_id}", data={"usage": usage})
+    
     # Transcript-related methods
     async def add_message(
         self, 
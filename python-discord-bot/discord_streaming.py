@@ -0,0 +1,166 @@
+# discord_streaming.py
+
+"""
+Progressive rendering of streamed LLM replies into Discord messages.
+
+A placeholder message is posted as soon as a turn starts and then edited with
+the accumulated text. Edits are debounced to at most one per
+STREAM_EDIT_INTERVAL seconds, and only one edit is in flight at a time, so
+Discord's edit rate limits are respected however fast tokens arrive. Text
+beyond Discord's 2000-character limit rolls over into follow-up messages.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DISCORD_MESSAGE_LIMIT = 2000
+STREAM_EDIT_INTERVAL = float(os.getenv("DISCORD_STREAM_EDIT_INTERVAL", "1.0"))
+STREAM_CURSOR = " ▌"
+PLACEHOLDER = "…"
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """
+    Split text into pages of at most `limit` characters.
+
+    Pages break at the last newline (or else space) before the limit, so a
+    page never changes once the text has grown past it.
+    """
+    pages = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut < limit // 2:
+            cut = text.rfind(" ", 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        pages.append(text[:cut])
+        text = text[cut:].lstrip("\n ")
+    pages.append(text)
+    return pages
+
+
+class StreamingMessageRenderer:
+    """
+    Renders a growing reply into one or more Discord messages.
+
+    Usage:
+        renderer = StreamingMessageRenderer(send, prefix="**[Agent]**: ")
+        await renderer.start()
+        async for delta in stream:
+            renderer.feed(delta)
+        await renderer.finish()
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable],
+        prefix: str = "",
+        edit_interval: float = STREAM_EDIT_INTERVAL,
+        limit: int = DISCORD_MESSAGE_LIMIT,
+    ):
+        """
+        Args:
+            send: Coroutine function that posts a new message and returns it
+            prefix: Text shown before the reply (e.g. the agent's name)
+            edit_interval: Minimum seconds between edits
+            limit: Maximum characters per message
+        """
+        self.send = send
+        self.prefix = prefix
+        self.edit_interval = edit_interval
+        self.limit = limit - len(STREAM_CURSOR)
+        self.text = ""
+        self.messages: List = []
+        self._rendered: List[str] = []
+        self._last_edit = 0.0
+        self._dirty = asyncio.Event()
+        self._edit_task: Optional[asyncio.Task] = None
+        self._render_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Post the placeholder message."""
+        await self._render(self.prefix + PLACEHOLDER, final=True)
+        self._last_edit = time.monotonic()
+
+    def feed(self, delta: str) -> None:
+        """Append a text delta; an edit is scheduled in the background."""
+        self.text += delta
+        self._dirty.set()
+        if self._edit_task is None:
+            self._edit_task = asyncio.create_task(self._edit_loop())
+
+    async def finish(self, final_text: Optional[str] = None) -> List:
+        """
+        Render the complete reply (without the cursor) and stop editing.
+
+        Args:
+            final_text: Replacement for the accumulated text (e.g. stripped)
+
+        Returns:
+            The Discord messages the reply was rendered into
+        """
+        if final_text is not None:
+            self.text = final_text
+        await self._stop_edit_loop()
+        await self._render(self.prefix + (self.text or PLACEHOLDER), final=True)
+        return self.messages
+
+    async def discard(self) -> None:
+        """Delete the messages posted so far (e.g. when the stream failed)."""
+        await self._stop_edit_loop()
+        async with self._render_lock:
+            for message in self.messages:
+                try:
+                    await message.delete()
+                except Exception as e:
+                    logger.warning(f"Could not delete streamed message: {e}")
+            self.messages, self._rendered = [], []
+
+    async def _stop_edit_loop(self) -> None:
+        if self._edit_task is not None:
+            self._edit_task.cancel()
+            try:
+                await self._edit_task
+            except asyncio.CancelledError:
+                pass
+            self._edit_task = None
+
+    async def _edit_loop(self) -> None:
+        while True:
+            await self._dirty.wait()
+            # Debounce: wait out the rest of the interval, collecting more deltas meanwhile
+            delay = self._last_edit + self.edit_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty.clear()
+            try:
+                # Shielded so stopping the loop never abandons a half-done send/edit
+                await asyncio.shield(self._render(self.prefix + self.text, final=False))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error editing streamed message: {e}")
+            self._last_edit = time.monotonic()
+
+    async def _render(self, content: str, final: bool) -> None:
+        """Bring the posted messages in line with `content`, editing only what changed."""
+        async with self._render_lock:
+            pages = split_message(content, self.limit)
+            for index, page in enumerate(pages):
+                shown = page if final or index < len(pages) - 1 else page + STREAM_CURSOR
+                if index >= len(self.messages):
+                    self.messages.append(await self.send(shown))
+                    self._rendered.append(shown)
+                elif self._rendered[index] != shown:
+                    await self.messages[index].edit(content=shown)
+                    self._rendered[index] = shown
+            if final:
+                # The final text can be shorter than the streamed one (e.g. stripped)
+                for message in self.messages[len(pages):]:
+                    await message.delete()
+                del self.messages[len(pages):], self._rendered[len(pages):]
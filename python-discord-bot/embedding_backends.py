@@ -0,0 +1,218 @@
+# embedding_backends.py
+
+"""
+Pluggable text embedding backends.
+
+Every backend implements LangChain's `Embeddings` interface, so it can be
+passed straight to FAISS, and adds `embed_array()` for NumPy callers such as
+corpus_index.py. The backend is chosen with EMBEDDING_BACKEND:
+
+    openai                 - OpenAI embeddings through litellm (default)
+    hashing                - signed feature hashing of words and word pairs;
+                             local, deterministic, no model download
+    sentence-transformers  - a small local sentence-embedding model on CPU
+                             (needs `pip install sentence-transformers`)
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from local_rerank import tokenize
+from credential_pool import credential_pools
+from usage_ledger import record_usage
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+SENTENCE_TRANSFORMER_MODEL = os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
+HASHING_DIMENSIONS = 1024
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+# Batches embedded concurrently by API backends
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "4"))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so a dot product is a cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class EmbeddingBackend(Embeddings):
+    """Base class: subclasses implement `_embed_batch` for one batch of texts."""
+
+    name = "base"
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the vector space; vectors with different ids are not comparable."""
+        return self.name
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts in batches, returning L2-normalized float32 rows."""
+        texts = [t or " " for t in texts]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+        return normalize_rows(np.vstack([self._embed_batch(batch) for batch in batches]).astype(np.float32))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed in a worker thread so the event loop is never blocked."""
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings through litellm; batches are sent concurrently."""
+
+    name = "openai"
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL, dimensions: Optional[int] = None):
+        self.model = model
+        self.dimensions = dimensions
+
+    @property
+    def model_id(self) -> str:
+        return f"openai:{self.model}:{self.dimensions or 'default'}"
+
+    @property
+    def full_model(self) -> str:
+        """The litellm model string, for the credential pool and pricing."""
+        return self.model if "/" in self.model else f"openai/{self.model}"
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        from litellm import embedding
+
+        kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+        # Sent with the key that has the most quota left (see credential_pool.py), billed to the current meeting
+        response = credential_pools.for_model(self.full_model).call_sync(
+            lambda credential: embedding(
+                model=self.model, input=[t[:8000] for t in texts], **credential.request_kwargs(), **kwargs
+            )
+        )
+        record_usage(self.full_model, getattr(response, "usage", None))
+        return np.asarray([item["embedding"] for item in response.data], dtype=np.float32)
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        texts = [t or " " for t in texts]
+        batches = [texts[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+        if len(batches) <= 1:
+            return super().embed_array(texts)
+        with ThreadPoolExecutor(max_workers=min(EMBEDDING_THREADS, len(batches))) as pool:
+            # Each in a copy of the caller's context, so the batches are billed to its meeting
+            futures = [pool.submit(contextvars.copy_context().run, self._embed_batch, batch) for batch in batches]
+            results = [future.result() for future in futures]
+        return normalize_rows(np.vstack(results).astype(np.float32))
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Signed feature hashing of word unigrams and bigrams with sublinear term
+    frequencies. Purely lexical, but fast, offline and reproducible across
+    processes (blake2b, not Python's salted hash()).
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self.dimensions = dimensions or HASHING_DIMENSIONS
+        self._feature_cache: Dict[str, tuple] = {}
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing:{self.dimensions}"
+
+    def _feature(self, term: str) -> tuple:
+        cached = self._feature_cache.get(term)
+        if cached is None:
+            digest = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+            cached = (digest % self.dimensions, 1.0 if (digest >> 63) & 1 else -1.0)
+            if len(self._feature_cache) < 200000:
+                self._feature_cache[term] = cached
+        return cached
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not terms:
+                continue
+            features = [self._feature(term) for term in terms]
+            columns = np.fromiter((c for c, _ in features), dtype=np.int64, count=len(features))
+            signs = np.fromiter((s for _, s in features), dtype=np.float32, count=len(features))
+            np.add.at(vectors[row], columns, signs)
+        # Sublinear scaling so repeated terms do not dominate
+        return np.sign(vectors) * np.log1p(np.abs(vectors))
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """A local sentence-transformers model running on CPU."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = SENTENCE_TRANSFORMER_MODEL, dimensions: Optional[int] = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=sentence-transformers needs: pip install sentence-transformers"
+            ) from e
+        self.model = model
+        self._model = SentenceTransformer(model, device="cpu")
+        if dimensions:
+            logger.warning(f"Ignoring dimensions={dimensions}; {model} has a fixed embedding size")
+
+    @property
+    def model_id(self) -> str:
+        return f"sentence-transformers:{self.model}"
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+
+
+BACKENDS = {
+    "openai": OpenAIEmbeddingBackend,
+    "hashing": HashingEmbeddingBackend,
+    "sentence-transformers": SentenceTransformerBackend,
+}
+
+_backends: Dict[tuple, EmbeddingBackend] = {}
+
+
+def get_embedding_backend(name: Optional[str] = None, dimensions: Optional[int] = None) -> EmbeddingBackend:
+    """
+    Shared embedding backend instance (models are loaded once per process).
+
+    Args:
+        name: Backend name; defaults to EMBEDDING_BACKEND
+        dimensions: Optional output size (OpenAI text-embedding-3 and hashing only)
+    """
+    name = (name or EMBEDDING_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (choose from {', '.join(BACKENDS)})")
+    key = (name, dimensions)
+    if key not in _backends:
+        logger.info(f"Loading {name} embedding backend")
+        _backends[key] = BACKENDS[name](dimensions=dimensions)
+    return _backends[key]
@@ -0,0 +1,102 @@
+# fused_turn.py
+
+"""
+Select-and-speak: choosing the next speaker and drafting their reply in one call.
+
+A normal meeting turn makes two sequential calls: the orchestrator picks
+who speaks next, then that agent is called with its own system prompt. In a
+fused turn one structured call sees every candidate's persona (the same
+system prompt the agent would get) and returns the chosen speaker, a short
+rationale and that speaker's reply, which roughly halves turn latency.
+
+The fused call runs on the turn model, so it is only used when every
+candidate would reply with the same model. The Tool Agent answers from a
+literature search, so when it is chosen only the selection is kept and it
+is called as usual. Callers fall back to the two-call turn when the reply
+does not validate.
+"""
+
+import logging
+from typing import Dict, List, Literal, Optional, Sequence
+
+from pydantic import BaseModel, create_model
+
+from models import LLMMessage
+from prompt_cache import Conversation, conversation_messages
+from llm_client import provider_for_model
+
+logger = logging.getLogger(__name__)
+
+FUSED_TURN_INSTRUCTIONS = """You are running a lab meeting between the participants described below.
+Read the conversation so far, decide which participant should speak next, and write that
+participant's next contribution exactly as they would, following their instructions.
+
+Participants:
+
+{personas}
+
+Reply with the chosen participant's name, a short rationale for choosing them, and their
+contribution in "reply" (only the text of the contribution, without their name in front).{tool_note}"""
+
+TOOL_AGENT_NOTE = """
+If you choose {names}, leave "reply" empty: they answer with a literature search."""
+
+
+class FusedTurnResponse(BaseModel):
+    """The next speaker and their reply."""
+    agent: str
+    rationale: str
+    reply: str
+
+
+def fused_turn_schema(agent_names: List[str]):
+    """FusedTurnResponse restricted to the agents who may speak next."""
+    return create_model(
+        "FusedTurn",
+        __base__=FusedTurnResponse,
+        agent=(Literal[tuple(agent_names)], ...),
+    )
+
+
+def fused_turn_prompt(personas: Dict[str, str], tool_agents: Sequence[str] = ()) -> str:
+    """The system prompt listing each candidate's name and persona."""
+    sections = "\n\n".join(f"### {name}\n{persona.strip()}" for name, persona in personas.items())
+    tool_note = TOOL_AGENT_NOTE.format(names=" or ".join(tool_agents)) if tool_agents else ""
+    return FUSED_TURN_INSTRUCTIONS.format(personas=sections, tool_note=tool_note)
+
+
+async def select_and_speak(
+    llm_client,
+    personas: Dict[str, str],
+    conversation: Conversation,
+    model: str,
+    temperature: float = 1,
+    tool_agents: Sequence[str] = (),
+) -> Optional[FusedTurnResponse]:
+    """
+    Choose the next speaker among `personas` and draft their reply.
+
+    Args:
+        llm_client: The LLMClient
+        personas: Candidate name -> the system prompt that agent would reply with
+        conversation: The meeting's conversation (string or segments)
+        model: The turn model all candidates share
+        temperature: The meeting's agent temperature
+        tool_agents: Candidates that answer with a literature search (no drafted reply)
+
+    Returns:
+        The validated response, or None when the call failed or did not validate
+        (the caller then runs the two-call turn)
+    """
+    try:
+        return await llm_client.generate_structured(
+            provider=provider_for_model(model),
+            messages=[LLMMessage(role="system", content=fused_turn_prompt(personas, tool_agents))] + conversation_messages(conversation),
+            schema=fused_turn_schema(list(personas)),
+            model=model,
+            temperature=temperature,
+            reply_kind="fused_turn",
+        )
+    except Exception as e:
+        logger.warning(f"Fused turn failed, falling back to selection then reply: {e}")
+        return None
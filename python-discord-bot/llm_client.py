@@ -1,10 +1,27 @@
 import os
+import time
+import asyncio
 import logging
-from typing import List, Dict, Optional, Union
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Type, TypeVar, Union
+from pydantic import BaseModel, ValidationError
 from models import LLMProvider, LLMMessage, LLMResponse
 from pathlib import Path
 from dotenv import load_dotenv
-from litellm import completion
+from litellm import acompletion
+from llm_routing import FAILOVER_ENABLED, latency_router
+from credential_pool import credential_pools
+from local_provider import is_local, litellm_request, local_endpoint, request_slot
+from batch_api import BatchError, current_batch_executor
+from llm_simulator import llm_simulator
+from traffic_log import chat_key, response_record, traffic_log
+from model_routing import model_policy
+from prompt_cache import Conversation, conversation_messages, join_conversation, to_litellm_messages, usage_dict
+from usage_ledger import record_usage
+from reply_budget import reply_budgets, supports_stop
+from structured_output import (
+    REPAIR_TEMPERATURE, StructuredOutputError, parse_structured, repair_prompt,
+    response_format_for, schema_instructions,
+)
 
 # Load environment variables from .env file
 dotenv_path = Path(__file__).parent / '.env'
@@ -12,6 +29,22 @@ load_dotenv(dotenv_path)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T", bound=BaseModel)
+
+
+class PIVariables(BaseModel):
+    """Generated variables for a Principal Investigator agent."""
+    expertise: str
+    goal: str
+
+
+class ScientistVariables(BaseModel):
+    """Generated variables for a Scientist agent."""
+    agent_name: str
+    expertise: str
+    goal: str
+
+
 # Dictionary of agent configurations
 AGENTS = {
     "principal_investigator": {
@@ -118,6 +151,7 @@ MODEL_MAPPING = {
     LLMProvider.OPENAI: {
         "default": "openai/gpt-4o",  # Default is gpt-4o
         "gpt-4o": "openai/gpt-4o",
+        "gpt-4o-mini": "openai/gpt-4o-mini",
         "gpt-3.5-turbo": "openai/gpt-3.5-turbo",
     },
     LLMProvider.ANTHROPIC: {
@@ -133,6 +167,11 @@ MODEL_MAPPING = {
         "mistral-small-latest": "mistral/mistral-small-latest",
         # Cross-provider mapping to allow using gpt-4o with Mistral provider
         "gpt-4o": "openai/gpt-4o"
+    },
+    # OpenAI-compatible local endpoint (see local_provider.py); the first model is the default
+    LLMProvider.LOCAL: {
+        **({"default": f"local/{local_endpoint.models[0]}"} if local_endpoint.models else {}),
+        **{name: f"local/{name}" for name in local_endpoint.models},
     }
 }
 
@@ -143,24 +182,33 @@ class LLMClient:
         """Initialize the LLM client."""
         # Log API key availability
         logger.info(f"Loaded environment variables from {dotenv_path}")
-        logger.info(f"OpenAI API Key available: {bool(os.getenv('OPENAI_API_KEY'))}")
-        logger.info(f"Anthropic API Key available: {bool(os.getenv('ANTHROPIC_API_KEY'))}")
-        logger.info(f"Mistral API Key available: {bool(os.getenv('MISTRAL_API_KEY'))}")
+        logger.info(f"OpenAI API Key available: {credential_pools.has_keys('openai')}")
+        logger.info(f"Anthropic API Key available: {credential_pools.has_keys('anthropic')}")
+        logger.info(f"Mistral API Key available: {credential_pools.has_keys('mistral')}")
+        logger.info(f"Local endpoint available: {local_endpoint.configured}")
+        if llm_simulator.enabled or traffic_log.replaying:
+            logger.info("LLM simulator or traffic replay on: every provider is available")
         
-        # Track which providers are available
+        # Track which providers are available (any key in the provider's credential pool, or simulated/replayed)
+        simulated = llm_simulator.enabled or traffic_log.replaying
         self.providers = {
             LLMProvider.OPENAI: {
-                "is_available": bool(os.getenv("OPENAI_API_KEY")),
+                "is_available": credential_pools.has_keys("openai") or simulated,
                 "default_model": MODEL_MAPPING[LLMProvider.OPENAI]["default"]
             },
             LLMProvider.ANTHROPIC: {
-                "is_available": bool(os.getenv("ANTHROPIC_API_KEY")),
+                "is_available": credential_pools.has_keys("anthropic") or simulated,
                 "default_model": MODEL_MAPPING[LLMProvider.ANTHROPIC]["default"]
             },
             LLMProvider.MISTRAL: {
-                "is_available": bool(os.getenv("MISTRAL_API_KEY")),
+                "is_available": credential_pools.has_keys("mistral") or simulated,
                 "default_model": MODEL_MAPPING[LLMProvider.MISTRAL]["default"]
             },
+            LLMProvider.LOCAL: {
+                # A local server needs no key, only its URL
+                "is_available": local_endpoint.configured,
+                "default_model": MODEL_MAPPING[LLMProvider.LOCAL].get("default")
+            },
         }
     
     async def generate_response(
@@ -169,7 +217,11 @@ class LLMClient:
         messages: List[LLMMessage],
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        response_schema: Optional[Type[BaseModel]] = None,
+        reply_kind: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        n: int = 1
     ) -> LLMResponse:
         """
         Generate a response from the specified LLM provider given a list of messages.
@@ -180,13 +232,181 @@ class LLMClient:
             model: Model to use (defaults to gpt-4o if not specified)
             temperature: Sampling temperature (0-1)
             max_tokens: Maximum tokens in the response
+            response_schema: Ask for JSON matching this pydantic model (see generate_structured)
+            reply_kind: Kind of reply (agent key or call site); when given, max_tokens and stop
+                default to the ones learned for it and the reply's length is recorded (see reply_budget.py)
+            stop: Stop sequences
+            n: Number of completions to sample from one request (see LLMResponse.samples)
             
         Returns:
             LLMResponse object with content and usage information
         """
+        provider, full_model = self._resolve_model(provider, model)
+        if reply_kind is not None:
+            max_tokens = max_tokens or reply_budgets.max_tokens(reply_kind)
+            stop = stop or reply_budgets.stop_sequences(reply_kind)
+        
+        def options(candidate_model):
+            kwargs = {}
+            if stop and supports_stop(candidate_model):
+                kwargs["stop"] = stop
+            if n > 1:
+                kwargs["n"] = n
+            if response_schema is not None:
+                # Failover may land on a model with different JSON support
+                response_format = response_format_for(candidate_model, response_schema)
+                if response_format is not None:
+                    kwargs["response_format"] = response_format
+            return kwargs
+        
+        async def complete(candidate_model):
+            kwargs = options(candidate_model)
+            
+            # Sent with the provider key that has the most quota left (see credential_pool.py)
+            async def request(credential):
+                # Converted per candidate: cache markers depend on the provider
+                call = {"messages": to_litellm_messages(messages, candidate_model), "temperature": temperature, **kwargs}
+                async with request_slot(candidate_model):
+                    # Recorded with LLM_RECORD_DIR (see traffic_log.py)
+                    return await traffic_log.observe("chat", candidate_model, call, acompletion(
+                        **litellm_request(candidate_model, credential.request_kwargs(), max_tokens), **call
+                    ))
+            return await credential_pools.for_model(candidate_model).call(request)
+        
+        try:
+            start = time.perf_counter()
+            # In a non-live meeting's batch mode, the call waits for its wave's provider batch (see batch_api.py)
+            response, batched = None, False
+            executor = current_batch_executor()
+            if executor is not None and executor.supports(full_model):
+                call = {"messages": to_litellm_messages(messages, full_model), "temperature": temperature, **options(full_model)}
+                try:
+                    batch_start = time.time()
+                    response = await executor.complete(full_model, {**call, "max_tokens": max_tokens})
+                    served_model, batched = full_model, True
+                    traffic_log.record(
+                        "batch", chat_key(full_model, call["messages"], call), full_model, batch_start,
+                        (time.time() - batch_start) * 1000, response_record(response), request=call,
+                    )
+                except BatchError as e:
+                    logger.warning(f"{e}; calling {full_model} interactively")
+            if response is None:
+                # Call litellm on the best available equivalent model (failover and optional hedging)
+                served_model, response = await latency_router.execute(self._candidate_models(full_model), complete)
+            if served_model != full_model:
+                logger.info(f"Request for {full_model} was served by {served_model}")
+                provider = provider_for_model(served_model)
+                model = served_model.split("/", 1)[-1]
+            
+            # Extract completion content
+            content = (response.choices[0].message.content or "").strip()
+            samples = [(choice.message.content or "").strip() for choice in response.choices] if n > 1 else None
+            
+            # Token usage, including prompt tokens served from the provider's prefix cache
+            usage = usage_dict(getattr(response, "usage", None))
+            if usage["cached_tokens"]:
+                logger.info(f"{usage['cached_tokens']} of {usage['prompt_tokens']} prompt tokens cached for {served_model}")
+            if is_local(served_model):
+                local_endpoint.check_prompt(served_model, usage["prompt_tokens"])
+            # Bill the call to the current meeting/session/user
+            record_usage(served_model, usage, batch=batched)
+            if reply_kind is not None:
+                reply_budgets.observe(
+                    reply_kind, usage["completion_tokens"] // max(1, len(response.choices)), max_tokens,
+                    getattr(response.choices[0], "finish_reason", None),
+                )
+            
+            return LLMResponse(
+                content=content,
+                provider=provider,
+                model=model or "default",
+                usage=usage,
+                latency_ms=(time.perf_counter() - start) * 1000,
+                samples=samples,
+            )
+            
+        except Exception as e:
+            logger.error(f"Error generating response with {provider} ({full_model}): {str(e)}")
+            raise
+
+    async def generate_structured(
+        self,
+        provider: LLMProvider,
+        messages: List[LLMMessage],
+        schema: Type[T],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        reply_kind: Optional[str] = None
+    ) -> T:
+        """
+        Generate a reply that validates against a pydantic model.
+        
+        The provider is asked for schema-constrained JSON (or JSON mode) and
+        the schema is described in the prompt. A reply that fails validation
+        gets one repair attempt, shown its validation error.
+        
+        Args:
+            provider: The LLM provider to use
+            messages: List of messages in the conversation
+            schema: Pydantic model describing the expected JSON object
+            model: Model to use (defaults to gpt-4o if not specified)
+            temperature: Sampling temperature for the first attempt
+            max_tokens: Maximum tokens in the response
+            reply_kind: Learn max_tokens for this kind of reply (see generate_response)
+            
+        Returns:
+            The validated schema instance
+            
+        Raises:
+            StructuredOutputError: If the repaired reply is still invalid
+        """
+        messages = [LLMMessage(role="system", content=schema_instructions(schema))] + list(messages)
+        response = await self.generate_response(
+            provider=provider, messages=messages, model=model,
+            temperature=temperature, max_tokens=max_tokens, response_schema=schema, reply_kind=reply_kind,
+        )
+        try:
+            return parse_structured(response.content, schema)
+        except ValidationError as e:
+            logger.warning(f"Invalid {schema.__name__} from {response.model}, repairing: {e.errors()[:3]}")
+            messages += [
+                LLMMessage(role="assistant", content=response.content),
+                LLMMessage(role="user", content=repair_prompt(e)),
+            ]
+        
+        response = await self.generate_response(
+            provider=provider, messages=messages, model=model,
+            temperature=REPAIR_TEMPERATURE, max_tokens=max_tokens, response_schema=schema, reply_kind=reply_kind,
+        )
+        try:
+            return parse_structured(response.content, schema)
+        except ValidationError as e:
+            raise StructuredOutputError(f"Invalid {schema.__name__} after repair: {e}", response.content) from e
+
+    def _resolve_model(self, provider: LLMProvider, model: Optional[str]) -> Tuple[LLMProvider, str]:
+        """
+        Pick the provider to use and the full litellm model string.
+        
+        Args:
+            provider: The requested LLM provider
+            model: Model key within the provider (defaults to gpt-4o), or a
+                full litellm model string such as "anthropic/claude-3-haiku-20240307"
+            
+        Returns:
+            Tuple of (provider, full model name with provider prefix)
+        """
+        # A full model string names its own provider
+        if model and "/" in model:
+            model_provider = provider_for_model(model)
+            if self.providers.get(model_provider, {}).get("is_available"):
+                return model_provider, model
+            logger.warning(f"{model_provider} is not available for {model}")
+            provider, model = model_provider, None
+        
         # Check if provider is available
-        if not self.providers.get(provider):
-            available_providers = [p for p, available in self.providers.items() if available]
+        if not self.providers.get(provider, {}).get("is_available"):
+            available_providers = [p for p, details in self.providers.items() if details["is_available"]]
             if not available_providers:
                 raise ValueError("No LLM providers are available. Please set at least one API key.")
             
@@ -205,41 +425,53 @@ class LLMClient:
             if not full_model:
                 raise ValueError(f"Unknown model for provider {provider}")
         
-        # Convert our message format to litellm format
-        litellm_messages = [
-            {"role": msg.role, "content": msg.content}
-            for msg in messages
-        ]
+        return provider, full_model
+
+    def _candidate_models(self, full_model: str) -> List[str]:
+        """The requested model followed by equivalent models on available providers."""
+        candidates = [full_model]
+        if FAILOVER_ENABLED:
+            for equivalent in latency_router.equivalents(full_model):
+                details = self.providers.get(provider_for_model(equivalent), {})
+                if details.get("is_available"):
+                    candidates.append(equivalent)
+        return candidates
+
+    def stream_response(
+        self,
+        provider: LLMProvider,
+        messages: List[LLMMessage],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        reply_kind: Optional[str] = None,
+        stop: Optional[List[str]] = None
+    ) -> "LLMStream":
+        """
+        Stream a response token by token.
         
-        try:
-            # Call litellm completion
-            response = completion(
-                model=full_model,
-                messages=litellm_messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            
-            # Extract completion content
-            content = response.choices[0].message.content.strip()
-            
-            # Construct usage dict (simplified)
-            usage = {
-                "prompt_tokens": getattr(response, "usage", {}).get("prompt_tokens", 0),
-                "completion_tokens": getattr(response, "usage", {}).get("completion_tokens", 0),
-                "total_tokens": getattr(response, "usage", {}).get("total_tokens", 0),
-            }
-            
-            return LLMResponse(
-                content=content,
-                provider=provider,
-                model=model or "default",
-                usage=usage
-            )
-            
-        except Exception as e:
-            logger.error(f"Error generating response with {provider} ({full_model}): {str(e)}")
-            raise
+        Takes the same arguments as generate_response. Iterate the returned
+        LLMStream with `async for delta in stream` to receive text deltas as
+        they arrive; afterwards `stream.response` holds the full LLMResponse,
+        including usage, time to first token and total latency.
+        
+        Returns:
+            LLMStream yielding text deltas
+        """
+        provider, full_model = self._resolve_model(provider, model)
+        if reply_kind is not None:
+            max_tokens = max_tokens or reply_budgets.max_tokens(reply_kind)
+            stop = stop or reply_budgets.stop_sequences(reply_kind)
+        return LLMStream(
+            provider=provider,
+            model=model or "default",
+            candidates=self._candidate_models(full_model),
+            messages=list(messages),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            reply_kind=reply_kind,
+            stop=stop,
+        )
     
     def get_available_providers(self):
         """Get a dictionary of available providers."""
@@ -248,26 +480,33 @@ class LLMClient:
     async def call_agent(
         self, 
         agent_key: str, 
-        conversation_history: str,
+        conversation_history: Conversation,
         expertise: Optional[str] = None,
         goal: Optional[str] = None,
         agent_role: Optional[str] = None,
         agent_name: Optional[str] = None,
-        model: Optional[str] = None  # Add model parameter
+        model: Optional[str] = None,  # Add model parameter
+        literature_context=None,
+        temperature: float = 1
     ) -> str:
         """
         Calls the specified agent with the conversation so far.
         The agent's system prompt is used, plus the `conversation_history` is
         appended as the user input. Returns the agent's text response.
         
+        Passing the conversation as segments (see prompt_cache.split_history)
+        sends each as its own message, so the stable prefix is cached.
+        
         Args:
             agent_key: Key of the agent in the AGENTS dictionary
-            conversation_history: The conversation to respond to
+            conversation_history: The conversation to respond to (a string, or stable segments then a volatile one)
             expertise: The agent's area of expertise (optional)
             goal: The agent's goal (optional)
             agent_role: The specific role description (optional, using default if not provided)
             agent_name: The specific name for scientist agents (optional)
             model: Specific model to use (defaults to gpt-4o if not specified)
+            literature_context: Prefetched search results for the tool_agent (optional)
+            temperature: Sampling temperature (parallel runs spread it, see orchestrator.run_temperature)
             
         Returns:
             The agent's response text
@@ -280,15 +519,148 @@ class LLMClient:
             from tool_agent_file import tool_agent
             # Here, pass the entire conversation_history to your `tool_agent` function
             # which will do queries, retrieve references, etc.
-            response_str = tool_agent(conversation_history)
+            # The pipeline is blocking (search APIs, embeddings), so keep it off the event loop.
+            response_str = await asyncio.to_thread(tool_agent, join_conversation(conversation_history), literature_context)
             return response_str
+        
+        provider, model_name, messages = self._build_agent_request(
+            agent_key, conversation_history, expertise, goal, agent_role, agent_name, model
+        )
+        
+        # Generate response
+        response = await self.generate_response(
+            provider=provider,
+            messages=messages,
+            model=model_name,
+            temperature=temperature,
+            reply_kind=agent_key,
+        )
+        
+        return response.content
+    
+    async def sample_agent(
+        self,
+        agent_key: str,
+        conversation_history: Conversation,
+        temperatures: List[float],
+        expertise: Optional[str] = None,
+        goal: Optional[str] = None,
+        agent_role: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Several independent replies to the same prompt, one per temperature.
+        
+        Parallel runs reach identical prompts (the PI opening); sampling them
+        together sends the prompt once per distinct temperature with `n`
+        completions each instead of once per run. Providers without `n`
+        get one request first, so the others can read its prefix from the
+        provider's prompt cache.
+        
+        Args:
+            Same as call_agent, except:
+            temperatures: Sampling temperature for each reply
+            
+        Returns:
+            The replies, in the order of `temperatures`
+        """
+        if agent_key == "tool_agent":
+            raise ValueError("The tool_agent cannot be sampled")
+        provider, model_name, messages = self._build_agent_request(
+            agent_key, conversation_history, expertise, goal, agent_role, agent_name, model
+        )
+        _, full_model = self._resolve_model(provider, model_name)
+        
+        groups: Dict[float, List[int]] = {}
+        for index, temperature in enumerate(temperatures):
+            groups.setdefault(temperature, []).append(index)
+        
+        async def sample(temperature, n):
+            response = await self.generate_response(
+                provider=provider, messages=messages, model=model_name,
+                temperature=temperature, reply_kind=agent_key, n=n,
+            )
+            return response.samples or [response.content]
+        
+        if supports_n(full_model):
+            requests = [(temperature, len(indices)) for temperature, indices in groups.items()]
+            results = await asyncio.gather(*(sample(t, n) for t, n in requests))
+        else:
+            requests = [(temperatures[index], 1) for index in range(len(temperatures))]
+            results = [await sample(*requests[0])]
+            results += await asyncio.gather(*(sample(t, n) for t, n in requests[1:]))
+        
+        replies: List[Optional[str]] = [None] * len(temperatures)
+        pending = {temperature: list(indices) for temperature, indices in groups.items()}
+        for (temperature, _), texts in zip(requests, results):
+            for text in texts:
+                if pending[temperature]:
+                    replies[pending[temperature].pop(0)] = text
+        # A provider may return fewer completions than asked for
+        for temperature, indices in pending.items():
+            for index in indices:
+                replies[index] = (await sample(temperature, 1))[0]
+        return replies
+
+    async def stream_agent(
+        self,
+        agent_key: str,
+        conversation_history: Conversation,
+        expertise: Optional[str] = None,
+        goal: Optional[str] = None,
+        agent_role: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        model: Optional[str] = None,
+        literature_context=None,
+        temperature: float = 1
+    ) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of call_agent: yields the agent's reply as text deltas.
+        
+        The tool_agent pipeline is not token-streamed (its work is search and
+        retrieval), so its whole answer is yielded as a single delta.
+        
+        Args:
+            Same as call_agent
             
+        Yields:
+            Text deltas of the agent's response
+        """
+        if agent_key not in AGENTS:
+            raise ValueError(f"Unknown agent: {agent_key}")
+        
+        if agent_key == "tool_agent":
+            yield await self.call_agent(
+                agent_key, conversation_history, literature_context=literature_context
+            )
+            return
+        
+        provider, model_name, messages = self._build_agent_request(
+            agent_key, conversation_history, expertise, goal, agent_role, agent_name, model
+        )
+        stream = self.stream_response(
+            provider=provider,
+            messages=messages,
+            model=model_name,
+            temperature=temperature,
+            reply_kind=agent_key,
+        )
+        async for delta in stream:
+            yield delta
+
+    def agent_system_prompt(
+        self,
+        agent_key: str,
+        expertise: Optional[str] = None,
+        goal: Optional[str] = None,
+        agent_role: Optional[str] = None,
+        agent_name: Optional[str] = None,
+    ) -> str:
+        """The system prompt an agent replies with, its template filled in."""
         agent_config = AGENTS[agent_key]
         agent_system_prompt_template = agent_config["system_prompt"]
         
-        # Use specified model or agent's default, with gpt-4o as fallback
-        agent_model = model or agent_config.get("model", "openai/gpt-4o")
-        
         # Fill in the template variables if needed
         # Get default role descriptions if not provided
         if agent_key == "principal_investigator" and not agent_role:
@@ -318,11 +690,34 @@ class LLMClient:
             # No formatting needed
             agent_system_prompt = agent_system_prompt_template
         
-        # Create messages
-        messages = [
-            LLMMessage(role="system", content=agent_system_prompt),
-            LLMMessage(role="user", content=conversation_history),
-        ]
+        return agent_system_prompt
+    
+    def _build_agent_request(
+        self,
+        agent_key: str,
+        conversation_history: Conversation,
+        expertise: Optional[str] = None,
+        goal: Optional[str] = None,
+        agent_role: Optional[str] = None,
+        agent_name: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[LLMProvider, str, List[LLMMessage]]:
+        """
+        Build the provider, model name and messages for an LLM-backed agent.
+        
+        Returns:
+            Tuple of (provider, model name, messages)
+        """
+        agent_config = AGENTS[agent_key]
+        
+        # Use specified model or agent's default, with gpt-4o as fallback
+        agent_model = model or agent_config.get("model", "openai/gpt-4o")
+        
+        agent_system_prompt = self.agent_system_prompt(agent_key, expertise, goal, agent_role, agent_name)
+        
+        # Create messages: system prompt, then the conversation (stable prefix first)
+        messages = [LLMMessage(role="system", content=agent_system_prompt)]
+        messages += conversation_messages(conversation_history)
         
         # Determine provider from model string
         provider = LLMProvider.OPENAI  # Default
@@ -331,24 +726,16 @@ class LLMClient:
         elif "mistral" in agent_model.lower():
             provider = LLMProvider.MISTRAL
             
-        model_name = agent_model.split("/")[-1] if "/" in agent_model else agent_model
+        # Keep full model strings: they may name models outside MODEL_MAPPING
+        model_name = agent_model
         
         # Use gpt-4o as default model if no specific model is provided
         if model_name == "default":
             model_name = "gpt-4o"
         
-        # Generate response
-        response = await self.generate_response(
-            provider=provider,
-            messages=messages,
-            model=model_name,
-            temperature=1,
-            max_tokens=500,
-        )
-        
-        return response.content
+        return provider, model_name, messages
 
-    async def generate_agent_variables(self, topic: str, agent_type: str, additional_context: str = "") -> Dict[str, str]:
+    async def generate_agent_variables(self, topic: str, agent_type: str, additional_context: str = "", model: Optional[str] = None) -> Dict[str, str]:
         """
         Generate agent variables (expertise, goal) based on a topic.
         
@@ -356,6 +743,7 @@ class LLMClient:
             topic: The research topic or question
             agent_type: The type of agent ("principal_investigator" or "scientist")
             additional_context: Optional additional context to guide the generation (e.g., to ensure diversity)
+            model: Model to use (defaults to the routing policy's "persona" model)
             
         Returns:
             Dictionary with keys: expertise, goal, and for scientists: agent_name
@@ -427,62 +815,19 @@ class LLMClient:
             LLMMessage(role="user", content=user_prompt)
         ]
         
-        # Use GPT-4o to generate the variables
+        # Persona generation is a control call: the routing policy gives it a fast model
+        model = model or model_policy.model_for("persona")
+        schema = PIVariables if agent_type == "principal_investigator" else ScientistVariables
         try:
-            response = await self.generate_response(
-                provider=LLMProvider.OPENAI,
+            # Schema-validated JSON (one repair attempt); defaults below if it still fails
+            variables = await self.generate_structured(
+                provider=provider_for_model(model),
                 messages=messages,
-                model="gpt-4o",
+                schema=schema,
+                model=model,
                 temperature=0.7
             )
-            
-            # Parse the JSON response with improved error handling
-            import json
-            import re
-            
-            content = response.content.strip()
-            
-            # Find JSON-like content if wrapped in other text
-            json_match = re.search(r'({.*})', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(1)
-            
-            # Try to parse the JSON
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # Try to clean up common issues
-                # Remove markdown code block syntax
-                content = re.sub(r'```(?:json)?\s*(.*?)\s*```', r'\1', content, flags=re.DOTALL)
-                # Try again
-                try:
-                    result = json.loads(content)
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse JSON response after cleanup: {e}")
-                    logger.error(f"Response content: {response.content}")
-                    raise
-            
-            # Validate the expected keys
-            expected_keys = ["expertise", "goal"]
-            if agent_type == "scientist":
-                expected_keys.append("agent_name")
-                
-            missing_keys = [key for key in expected_keys if key not in result]
-            if missing_keys:
-                logger.error(f"Missing keys in generated agent variables: {missing_keys}")
-                if agent_type == "principal_investigator":
-                    result.update({
-                        "expertise": "applying artificial intelligence to biomedical research" if "expertise" not in result else result["expertise"],
-                        "goal": "perform research that maximizes scientific impact" if "goal" not in result else result["goal"]
-                    })
-                else:  # scientist
-                    result.update({
-                        "agent_name": "Domain Scientist" if "agent_name" not in result else result["agent_name"],
-                        "expertise": f"scientific research related to {topic}" if "expertise" not in result else result["expertise"],
-                        "goal": "contribute domain expertise to the research project" if "goal" not in result else result["goal"]
-                    })
-            
-            return result
+            return variables.model_dump()
             
         except Exception as e:
             logger.error(f"Error generating agent variables: {e}")
@@ -499,5 +844,180 @@ class LLMClient:
                     "goal": "contribute domain expertise to the research project"
                 }
 
+def supports_n(full_model: str) -> bool:
+    """Whether a model can return several completions from one request."""
+    if is_local(full_model):
+        return local_endpoint.supports_n
+    try:
+        import litellm
+        
+        return "n" in (litellm.get_supported_openai_params(model=full_model) or [])
+    except Exception as e:
+        logger.debug(f"Could not look up n support for {full_model}: {e}")
+        return False
+
+def provider_for_model(full_model: str) -> LLMProvider:
+    """The LLMProvider of a litellm model string such as "anthropic/claude-3-opus-20240229"."""
+    prefix = full_model.split("/", 1)[0].lower()
+    for provider in LLMProvider:
+        if provider.value == prefix:
+            return provider
+    return LLMProvider.OPENAI
+
+
+class LLMStream:
+    """
+    A streamed completion: an async iterator of text deltas.
+    
+    Once iteration finishes, `response` holds the complete LLMResponse with
+    token usage, time to first token and total latency (both in ms).
+    """
+    
+    def __init__(self, provider: LLMProvider, model: str, candidates: List[str], messages: List[LLMMessage],
+                 temperature: float, max_tokens: Optional[int], reply_kind: Optional[str] = None,
+                 stop: Optional[List[str]] = None):
+        self.provider = provider
+        self.model = model
+        self.candidates = candidates
+        self.full_model = candidates[0]
+        self.messages = messages
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.reply_kind = reply_kind
+        self.stop = stop
+        self.response: Optional[LLMResponse] = None
+        self._credential = None
+        self._slot = None
+        self._call = None
+        self._started = False
+    
+    def __aiter__(self):
+        if self._started:
+            raise RuntimeError("An LLMStream can only be iterated once")
+        self._started = True
+        return self._generate()
+    
+    async def _generate(self) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        usage = None
+        finish_reason = None
+        
+        async def open_stream(candidate_model):
+            kwargs = {"stop": self.stop} if self.stop and supports_stop(candidate_model) else {}
+            
+            async def request(credential):
+                # A local server's request slot is held until the stream ends
+                slot = request_slot(candidate_model)
+                await slot.__aenter__()
+                call = {"messages": to_litellm_messages(self.messages, candidate_model), "temperature": self.temperature, **kwargs}
+                try:
+                    stream = await acompletion(
+                        **litellm_request(candidate_model, credential.request_kwargs(), self.max_tokens),
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **call,
+                    )
+                except BaseException:
+                    await slot.__aexit__(None, None, None)
+                    raise
+                # Its tokens are counted once the stream ends
+                self._credential = credential
+                self._slot = slot
+                self._call = call
+                return stream
+            return await credential_pools.for_model(candidate_model).call(request)
+        
+        try:
+            # Fail over while connecting; once tokens flow the stream stays on one model.
+            # Hedging is skipped: two live streams would both bill their tokens.
+            served_model, stream = await latency_router.execute(
+                self.candidates, open_stream, hedge=False, kind="stream"
+            )
+        except Exception as e:
+            logger.error(f"Error starting stream with {self.provider} ({self.full_model}): {str(e)}")
+            raise
+        if served_model != self.full_model:
+            logger.info(f"Stream for {self.full_model} was served by {served_model}")
+            self.full_model = served_model
+            self.provider = provider_for_model(served_model)
+            self.model = served_model.split("/", 1)[-1]
+        
+        try:
+            async for chunk in stream:
+                chunk_usage = getattr(chunk, "usage", None)
+                if chunk_usage:
+                    usage = chunk_usage
+                if not chunk.choices:
+                    continue
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+                delta = getattr(chunk.choices[0].delta, "content", None)
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Release the HTTP stream if the consumer stopped early
+            close = getattr(stream, "aclose", None)
+            if close is not None:
+                try:
+                    await close()
+                except Exception:
+                    pass
+            if self._slot is not None:
+                await self._slot.__aexit__(None, None, None)
+                self._slot = None
+            # Billed by the provider whether the stream finished, failed, was cancelled or closed early
+            usage = self._usage(usage, "".join(parts).strip())
+            record_usage(self.full_model, usage)
+            if self._credential is not None:
+                credential_pools.for_model(self.full_model).record_tokens(self._credential, usage)
+        
+        content = "".join(parts).strip()
+        if self.reply_kind is not None:
+            reply_budgets.observe(self.reply_kind, usage["completion_tokens"], self.max_tokens, finish_reason)
+        
+        end = time.perf_counter()
+        self.response = LLMResponse(
+            content=content,
+            provider=self.provider,
+            model=self.model,
+            usage=usage,
+            latency_ms=(end - start) * 1000,
+            time_to_first_token_ms=(first_token_at - start) * 1000 if first_token_at else None,
+        )
+        if self._call is not None:
+            traffic_log.record(
+                "stream", chat_key(self.full_model, self._call["messages"], self._call), self.full_model,
+                time.time() - (end - start), self.response.latency_ms,
+                {"choices": [content], "finish": finish_reason, "usage": usage},
+                ttft_ms=self.response.time_to_first_token_ms, request=self._call,
+            )
+        logger.info(
+            f"Streamed {usage['completion_tokens']} tokens from {self.full_model} "
+            f"({usage['cached_tokens']}/{usage['prompt_tokens']} prompt tokens cached): "
+            f"first token {self.response.time_to_first_token_ms or 0:.0f} ms, "
+            f"total {self.response.latency_ms:.0f} ms"
+        )
+
+    def _usage(self, usage, content):
+        """The stream's token usage: as reported, or counted locally from what was received."""
+        if usage:
+            return usage_dict(usage)
+        # Some providers do not report usage on streams (or the stream ended before the final chunk)
+        from litellm import token_counter
+        prompt_tokens = token_counter(
+            model=self.full_model,
+            messages=[{"role": msg.role, "content": msg.content} for msg in self.messages],
+        )
+        completion_tokens = token_counter(model=self.full_model, text=content) if content else 0
+        return usage_dict({
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        })
+
 # Create a singleton instance
 llm_client = LLMClient() 
\ No newline at end of file
@@ -0,0 +1,243 @@
+# llm_resilience.py
+
+"""
+Retries and circuit breaking for LLM calls.
+
+Transient failures (timeouts, connection errors, 408/409/429 and 5xx
+responses) are retried with full-jitter exponential backoff. A Retry-After
+header from the provider takes precedence over the computed delay. Retries
+draw from a process-wide budget, so a provider outage cannot multiply the
+request volume.
+
+Each model has a circuit breaker. After consecutive transient failures it
+opens and calls fail fast (the router then fails over to an equivalent
+model). Once the cooldown has passed it lets a single probe through
+(half-open); a successful probe closes it again.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20.0
+
+# Retry budget: every request earns RETRY_BUDGET_RATIO retries, up to RETRY_BUDGET_MAX banked
+RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = 10.0
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = 300.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while a model's circuit is open."""
+
+
+# =============================================================================
+# Error classification
+# =============================================================================
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient (worth retrying and counted by the breaker)."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    if name in ("Timeout", "APITimeoutError", "APIConnectionError", "ServiceUnavailableError"):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return False
+
+
+def _error_headers(error: BaseException) -> Dict[str, str]:
+    headers = getattr(error, "litellm_response_headers", None)
+    if not headers:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+    try:
+        return {str(k).lower(): str(v) for k, v in dict(headers or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The delay the provider asked for (Retry-After / retry-after-ms), if any."""
+    headers = _error_headers(error)
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """Full-jitter exponential backoff, overridden by a Retry-After hint."""
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+# =============================================================================
+# Retry budget
+# =============================================================================
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of overall traffic."""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, maximum: float = RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = maximum
+
+    def record_request(self) -> None:
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+# =============================================================================
+# Circuit breaker
+# =============================================================================
+
+class CircuitBreaker:
+    """Closed -> open after repeated transient failures -> half-open probe -> closed."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the probe slot when half-open)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(f"Circuit for {self.name} is half-open; probing")
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open and still cooling down)."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            # The probe failed: back off longer before the next one
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.threshold:
+            self._open()
+
+    def release_probe(self) -> None:
+        """Give back the probe slot when the probe ended without a verdict (e.g. cancelled)."""
+        self.probe_in_flight = False
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        logger.warning(f"Circuit for {self.name} opened for {self.cooldown:.0f}s after {self.failures} failures")
+
+
+# =============================================================================
+# Resilient call
+# =============================================================================
+
+class ResilientCaller:
+    """Runs calls with retries, a shared retry budget and per-model circuit breakers."""
+
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        self.max_retries = max_retries
+        self.budget = RetryBudget()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(model)
+        return self.breakers[model]
+
+    async def call(self, model: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Call `call(model)`, retrying transient failures.
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open
+            Exception: The last error once retries or the budget are exhausted
+        """
+        breaker = self.breaker(model)
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {model}")
+            try:
+                result = await call(model)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider is up; the request itself is bad
+                    breaker.release_probe()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.max_retries or breaker.is_open or not self.budget.try_spend():
+                    raise
+                delay = backoff_delay(attempt, e)
+                attempt += 1
+                logger.warning(f"Transient error from {model} ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
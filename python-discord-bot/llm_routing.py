@@ -0,0 +1,226 @@
+# llm_routing.py
+
+"""
+Latency-aware routing, failover and hedging for LLM calls.
+
+Every call records its latency and outcome per model. Those statistics
+(moving average latency, a window for the p95, moving error rate) decide
+which of several equivalent models serves a request. When a model fails, the
+next equivalent one is tried. With hedging enabled, a second request is fired
+if the first has not answered by its model's p95 deadline; whichever answers
+first wins and the other is cancelled.
+
+Each candidate is first retried on transient errors, and skipped outright
+while its circuit breaker is open (see llm_resilience.py), before the router
+fails over to the next one.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llm_resilience import ResilientCaller
+from local_provider import PREFIX as LOCAL_PREFIX, local_endpoint
+
+logger = logging.getLogger(__name__)
+
+FAILOVER_ENABLED = os.getenv("LLM_FAILOVER", "true").lower() == "true"
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "false").lower() == "true"
+
+# Hedge deadline bounds (seconds); the default applies until a model has enough samples
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_MIN_DELAY = 1.0
+HEDGE_MAX_DELAY = 30.0
+MIN_SAMPLES_FOR_P95 = 5
+
+LATENCY_WINDOW = 50
+EWMA_ALPHA = 0.2
+# A requested model is only bypassed when it is this much worse than the best equivalent
+REROUTE_FACTOR = 2.0
+ERROR_RATE_PENALTY = 4.0
+
+# Groups of models considered interchangeable for failover, best first.
+# Override with LLM_EQUIVALENT_MODELS='[["openai/gpt-4o", "anthropic/..."], ...]'
+DEFAULT_EQUIVALENT_MODELS = [
+    ["openai/gpt-4o", "anthropic/claude-3-5-sonnet-20240620", "mistral/mistral-large-latest"],
+    ["openai/gpt-4o-mini", "openai/gpt-3.5-turbo", "anthropic/claude-3-haiku-20240307", "mistral/mistral-small-latest"],
+    ["anthropic/claude-3-opus-20240229", "openai/gpt-4o", "anthropic/claude-3-5-sonnet-20240620"],
+]
+EQUIVALENT_MODELS = json.loads(os.getenv("LLM_EQUIVALENT_MODELS", "null") or "null") or DEFAULT_EQUIVALENT_MODELS
+# Local models fail over to LOCAL_LLM_FALLBACK (see local_provider.py)
+if local_endpoint.fallback:
+    EQUIVALENT_MODELS = EQUIVALENT_MODELS + [
+        [LOCAL_PREFIX + name, local_endpoint.fallback] for name in local_endpoint.models
+    ]
+
+
+class ModelStats:
+    """Moving latency and error statistics for one model."""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+
+    def record_success(self, latency: float) -> None:
+        self.calls += 1
+        self.latencies.append(latency)
+        self.ewma_latency = latency if self.ewma_latency is None else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        )
+        self.error_rate *= (1 - EWMA_ALPHA)
+
+    def record_failure(self) -> None:
+        self.calls += 1
+        self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES_FOR_P95:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def score(self) -> float:
+        """Lower is better. Unseen models score 0 so they get tried."""
+        if self.ewma_latency is None:
+            return 0.0 if self.error_rate == 0 else ERROR_RATE_PENALTY * self.error_rate
+        return self.ewma_latency * (1 + ERROR_RATE_PENALTY * self.error_rate)
+
+
+class LatencyRouter:
+    """Chooses among equivalent models and runs calls with failover and hedging."""
+
+    def __init__(self):
+        self.stats: Dict[Tuple[str, str], ModelStats] = {}
+        self.resilience = ResilientCaller()
+
+    def stats_for(self, model: str, kind: str = "completion") -> ModelStats:
+        """Statistics per model and call kind ("completion", or "stream" for time to open a stream)."""
+        key = (model, kind)
+        if key not in self.stats:
+            self.stats[key] = ModelStats()
+        return self.stats[key]
+
+    def equivalents(self, model: str) -> List[str]:
+        """Models interchangeable with `model` (excluding itself), best first."""
+        result = []
+        for group in EQUIVALENT_MODELS:
+            if model in group:
+                result.extend(m for m in group if m != model and m not in result)
+        return result
+
+    def rank(self, candidates: Sequence[str], kind: str = "completion") -> List[str]:
+        """
+        Order candidates for a call.
+
+        The first candidate (the requested model) keeps its place unless its
+        score is REROUTE_FACTOR times worse than the best alternative; the
+        alternatives are ordered by score. Models whose circuit is open go
+        last; they are only tried (and fail fast) once everything else has.
+        """
+        if len(candidates) <= 1:
+            return list(candidates)
+        tripped = [m for m in candidates if self.resilience.breaker(m).is_open]
+        if tripped:
+            healthy = [m for m in candidates if m not in tripped]
+            return (self.rank(healthy, kind) if healthy else []) + tripped
+        requested, alternatives = candidates[0], sorted(candidates[1:], key=lambda m: self.stats_for(m, kind).score())
+        requested_score = self.stats_for(requested, kind).score()
+        best = alternatives[0]
+        best_score = self.stats_for(best, kind).score()
+        if self.stats_for(best, kind).ewma_latency is not None and requested_score > REROUTE_FACTOR * best_score:
+            logger.info(f"Routing around {requested} (score {requested_score:.2f}s) to {best} ({best_score:.2f}s)")
+            return [best, requested] + alternatives[1:]
+        return [requested] + alternatives
+
+    def hedge_delay(self, model: str, kind: str = "completion") -> float:
+        p95 = self.stats_for(model, kind).p95()
+        delay = HEDGE_DEFAULT_DELAY if p95 is None else p95
+        return min(max(delay, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    async def _timed(self, model: str, call: Callable[[str], Awaitable[Any]], kind: str) -> Any:
+        async def attempt(model: str) -> Any:
+            start = time.perf_counter()
+            try:
+                result = await call(model)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats_for(model, kind).record_failure()
+                raise
+            self.stats_for(model, kind).record_success(time.perf_counter() - start)
+            return result
+
+        # Each attempt is timed on its own; retries and the breaker wrap them
+        return await self.resilience.call(model, attempt)
+
+    async def execute(
+        self,
+        candidates: Sequence[str],
+        call: Callable[[str], Awaitable[Any]],
+        hedge: bool = HEDGING_ENABLED,
+        kind: str = "completion",
+    ) -> Tuple[str, Any]:
+        """
+        Run `call(model)` with the best candidate, failing over and hedging.
+
+        Args:
+            candidates: Requested model first, then acceptable equivalents
+            call: Coroutine function performing the request for a model
+            hedge: Fire one backup request at the primary's p95 deadline
+            kind: Statistics bucket for this kind of call
+
+        Returns:
+            Tuple of (model that answered, its result)
+        """
+        queue = self.rank(candidates, kind)
+        pending: Dict[asyncio.Task, str] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch(model: str) -> None:
+            pending[asyncio.create_task(self._timed(model, call, kind))] = model
+
+        launch(queue.pop(0))
+        try:
+            while pending:
+                timeout = None
+                if hedge and not hedged and len(pending) == 1:
+                    timeout = self.hedge_delay(next(iter(pending.values())), kind)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Deadline passed: fire a backup on the next equivalent model (or the same one)
+                    hedged = True
+                    backup = queue.pop(0) if queue else next(iter(pending.values()))
+                    logger.info(f"Hedging slow request to {next(iter(pending.values()))} with {backup}")
+                    launch(backup)
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        return model, task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"LLM call to {model} failed: {e}")
+
+                if not pending and queue:
+                    model = queue.pop(0)
+                    logger.info(f"Failing over to {model}")
+                    launch(model)
+
+            raise last_error
+        finally:
+            # Cancel the loser (or everything, if we were cancelled ourselves)
+            for task in pending:
+                task.cancel()
+
+
+# Process-wide router so statistics accumulate across meetings
+latency_router = LatencyRouter()
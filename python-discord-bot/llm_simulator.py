@@ -0,0 +1,431 @@
+# llm_simulator.py
+
+"""
+A deterministic LLM simulator for offline runs and load tests.
+
+With LLM_SIMULATOR=true every chat completion the bot makes (agent replies,
+streamed or not, speaker selection, fused turns, persona generation, keyword
+extraction) is answered in-process instead of by a provider. The rest of the
+stack is unchanged: requests still go through litellm (as "sim/<model>"),
+credential pools, failover, reply budgets and the usage ledger, which prices
+the calls as the models they stand in for.
+
+Replies are seeded by LLM_SIMULATOR_SEED and the request, so the same prompt
+always gets the same reply:
+  - plain completions get text in the voice of the agent named in the system
+    prompt (PI, Scientific Critic, Summary Agent, a scientist), about the
+    meeting's topic;
+  - structured calls get a JSON object built from the requested schema (from
+    `response_format`, or from the schema described in the prompt), with enum
+    values such as speaker names chosen by the seed.
+
+Latency follows a profile: a log-normally jittered time to first token and
+output speed. LLM_SIMULATOR_PROFILE sets the default ("instant", "fast",
+"hosted", "slow"); LLM_SIMULATOR_MODEL_PROFILES overrides it per model or
+provider, e.g. "openai/gpt-4o-mini=fast,anthropic=slow". A fraction of
+requests can be failed with 429s (with Retry-After) or 500s to exercise key
+rotation, retries and failover.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import litellm
+from litellm import CustomLLM, ModelResponse
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "sim/"
+
+# Answer every completion with the simulator
+LLM_SIMULATOR = os.getenv("LLM_SIMULATOR", "false").lower() == "true"
+LLM_SIMULATOR_SEED = int(os.getenv("LLM_SIMULATOR_SEED", "0"))
+
+# Default latency profile, per-model/provider overrides ("model=profile,..."), and
+# overrides of the default profile's median time to first token and output speed
+LLM_SIMULATOR_PROFILE = os.getenv("LLM_SIMULATOR_PROFILE", "hosted")
+LLM_SIMULATOR_MODEL_PROFILES = os.getenv("LLM_SIMULATOR_MODEL_PROFILES", "")
+LLM_SIMULATOR_TTFT_MS = os.getenv("LLM_SIMULATOR_TTFT_MS", "")
+LLM_SIMULATOR_TOKENS_PER_SECOND = os.getenv("LLM_SIMULATOR_TOKENS_PER_SECOND", "")
+
+# Fault injection: fraction of requests failed with a 429 or a 500, and the 429s' Retry-After
+LLM_SIMULATOR_RATE_LIMIT_RATE = float(os.getenv("LLM_SIMULATOR_RATE_LIMIT_RATE", "0"))
+LLM_SIMULATOR_ERROR_RATE = float(os.getenv("LLM_SIMULATOR_ERROR_RATE", "0"))
+LLM_SIMULATOR_RETRY_AFTER = float(os.getenv("LLM_SIMULATOR_RETRY_AFTER", "1"))
+
+
+@dataclass
+class LatencyProfile:
+    """How fast a simulated model answers."""
+    ttft_ms: float
+    tokens_per_second: float  # 0 = the whole reply at once
+    jitter: float = 0.3  # sigma of the log-normal noise on both
+
+    def sample(self, rng: random.Random) -> Tuple[float, float]:
+        """(time to first token, seconds per output token) for one request."""
+        ttft = self.ttft_ms / 1000 * (rng.lognormvariate(0, self.jitter) if self.jitter else 1)
+        if not self.tokens_per_second:
+            return ttft, 0.0
+        speed = self.tokens_per_second * (rng.lognormvariate(0, self.jitter / 2) if self.jitter else 1)
+        return ttft, 1 / speed
+
+
+PROFILES = {
+    "instant": LatencyProfile(0, 0, 0),
+    "fast": LatencyProfile(200, 150),
+    "hosted": LatencyProfile(600, 60),
+    "slow": LatencyProfile(2000, 25),
+}
+
+# Roles recognised in system prompts ("You are a Principal Investigator. ...")
+PERSONA_PATTERN = re.compile(r"You are (?:a|an|the) ([A-Z][\w\- ]+?)(?:[.;,:\n]|$)")
+TOPIC_PATTERNS = (
+    re.compile(r"The user wants to discuss: (.+)"),
+    re.compile(r"for the topic: \"(.+?)\""),
+)
+# The schema that structured_output.schema_instructions() puts in the prompt
+SCHEMA_PATTERN = re.compile(r"matches this JSON schema[^\n]*\n(\{.*\})", re.DOTALL)
+
+REPLIES = {
+    "Principal Investigator": [
+        "Welcome, everyone. Today we are looking at {topic}.",
+        "Let me pull together what we have heard so far on {topic}.",
+        "1) Which approach to {topic} is most promising? 2) What evidence would convince us? 3) What could go wrong?",
+        "I would like each of you to ground your answer in data we could actually collect.",
+        "The strongest thread so far is the link between mechanism and measurable outcome.",
+        "Our next step should be a small, well-controlled pilot before we scale up.",
+    ],
+    "Scientific Critic": [
+        "I want to push back on some of the assumptions about {topic}.",
+        "The evidence cited so far comes from small cohorts and may not generalise.",
+        "We have not discussed controls, and without them the effect could be an artefact.",
+        "Feasibility is a real concern: the proposed timeline ignores recruitment and validation.",
+        "Before committing, we should pre-register the primary endpoint and the analysis plan.",
+    ],
+    "Summary Agent": [
+        "Summary: The team discussed {topic}, weighing mechanistic promise against feasibility and evidence quality. "
+        "The PI steered toward a staged plan, and the critic asked for controls and pre-registered endpoints.",
+        "Answer: Pursue {topic} through a small, controlled pilot with clear endpoints, then scale if the signal holds.",
+    ],
+    "scientist": [
+        "From my perspective as a {name}, {topic} hinges on a few measurable mechanisms.",
+        "Recent work in my field suggests a testable hypothesis we could pursue right away.",
+        "I would start with existing datasets to estimate the effect size before any new experiments.",
+        "One risk is that our models do not transfer across populations, so we need external validation.",
+        "I can draft the protocol for the first experiment and share it with the team.",
+    ],
+}
+
+DISCIPLINES = (
+    "Immunologist", "Computational Biologist", "Biophysicist", "Medicinal Chemist",
+    "Epidemiologist", "Materials Scientist", "Neuroscientist", "Bioengineer",
+)
+# Values for schema fields the bot acts on
+FIELD_VALUES = {
+    "agent_name": DISCIPLINES,
+    "resource": ("pubmed", "arxiv"),
+}
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """A message's text (content may be a list of parts, e.g. with prompt cache markers)."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def conversation_topic(messages: List[Dict[str, Any]]) -> str:
+    for message in messages:
+        for pattern in TOPIC_PATTERNS:
+            match = pattern.search(message_text(message))
+            if match:
+                return match.group(1).strip()
+    return "the research question"
+
+
+def persona(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """The agent named in the first system prompt, if any."""
+    for message in messages:
+        if message.get("role") == "system":
+            match = PERSONA_PATTERN.search(message_text(message))
+            if match:
+                return match.group(1).strip()
+    return None
+
+
+def requested_schema(messages: List[Dict[str, Any]], optional_params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The JSON schema a structured call expects, from response_format or the prompt."""
+    response_format = optional_params.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"]["schema"]
+    for message in messages:
+        match = SCHEMA_PATTERN.search(message_text(message))
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except ValueError:
+                pass
+    if response_format.get("type") == "json_object":
+        return {"type": "object"}
+    return None
+
+
+def simulated_text(name: Optional[str], topic: str, rng: random.Random, opening: bool = True) -> str:
+    """A reply in the voice of `name` (a scientist's for unknown names); the PI opens or synthesizes."""
+    if name == "Summary Agent":
+        return "\n".join(s.format(topic=topic) for s in REPLIES[name])
+    sentences = REPLIES.get(name) or REPLIES["scientist"]
+    if name == "Principal Investigator":
+        # The first sentence welcomes, the second synthesizes
+        sentences = sentences[:1] + sentences[2:] if opening else sentences[1:]
+    count = rng.randint(3, len(sentences))
+    picked = [sentences[0]] + rng.sample(sentences[1:], count - 1)
+    return " ".join(s.format(topic=topic, name=name or "scientist") for s in picked)
+
+
+def instance_from_schema(
+    schema: Dict[str, Any],
+    defs: Dict[str, Any],
+    rng: random.Random,
+    text: Callable[[str], str] = lambda name: "simulated value",
+    name: str = "",
+) -> Any:
+    """
+    A value that validates against a (pydantic-generated) JSON schema.
+
+    Args:
+        schema: The (sub)schema
+        defs: The root schema's $defs
+        rng: Chooses enum values
+        text: The value of a free-text field, given its property name
+        name: The property the schema describes
+    """
+    if "$ref" in schema:
+        return instance_from_schema(defs[schema["$ref"].split("/")[-1]], defs, rng, text, name)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "anyOf" in schema:
+        return instance_from_schema(schema["anyOf"][0], defs, rng, text, name)
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            prop: instance_from_schema(sub, defs, rng, text, prop)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        # A list of a union (e.g. one decision per meeting): one item per variant
+        variants = items.get("anyOf") or [items] * 3
+        return [instance_from_schema(variant, defs, rng, text, name) for variant in variants]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    if name in FIELD_VALUES:
+        return rng.choice(FIELD_VALUES[name])
+    return text(name)
+
+
+def parse_model_profiles(spec: str) -> Dict[str, LatencyProfile]:
+    profiles = {}
+    for entry in spec.split(","):
+        model, _, profile = entry.strip().partition("=")
+        if model and profile.strip() in PROFILES:
+            profiles[model.strip()] = PROFILES[profile.strip()]
+        elif model:
+            logger.warning(f"Ignoring simulator profile {entry!r} (profiles: {', '.join(PROFILES)})")
+    return profiles
+
+
+class LLMSimulator(CustomLLM):
+    """litellm handler for "sim/<model>": seeded replies, simulated latency and injected faults."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        seed: int = 0,
+        profile: LatencyProfile = PROFILES["instant"],
+        model_profiles: Optional[Dict[str, LatencyProfile]] = None,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: float = 1.0,
+    ):
+        super().__init__()
+        self.enabled = enabled
+        self.seed = seed
+        self.profile = profile
+        self.model_profiles = model_profiles or {}
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        # Latency and faults come from one seeded sequence (a retried request can succeed);
+        # reply content from the request itself (the same prompt gets the same reply)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "LLMSimulator":
+        profile = PROFILES.get(LLM_SIMULATOR_PROFILE)
+        if profile is None:
+            logger.warning(f"Unknown LLM_SIMULATOR_PROFILE {LLM_SIMULATOR_PROFILE!r}, using 'hosted'")
+            profile = PROFILES["hosted"]
+        profile = LatencyProfile(
+            float(LLM_SIMULATOR_TTFT_MS) if LLM_SIMULATOR_TTFT_MS else profile.ttft_ms,
+            float(LLM_SIMULATOR_TOKENS_PER_SECOND) if LLM_SIMULATOR_TOKENS_PER_SECOND else profile.tokens_per_second,
+            profile.jitter,
+        )
+        return cls(
+            enabled=LLM_SIMULATOR,
+            seed=LLM_SIMULATOR_SEED,
+            profile=profile,
+            model_profiles=parse_model_profiles(LLM_SIMULATOR_MODEL_PROFILES),
+            rate_limit_rate=LLM_SIMULATOR_RATE_LIMIT_RATE,
+            error_rate=LLM_SIMULATOR_ERROR_RATE,
+            retry_after=LLM_SIMULATOR_RETRY_AFTER,
+        )
+
+    def profile_for(self, model: str) -> LatencyProfile:
+        """The model's own profile, else its provider's, else the default."""
+        return self.model_profiles.get(model) or self.model_profiles.get(model.split("/", 1)[0]) or self.profile
+
+    def _plan(self, model: str) -> Tuple[float, float, Optional[str]]:
+        """(time to first token, seconds per token, injected fault) for the next request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+            ttft, per_token = self.profile_for(model).sample(self._rng)
+        if roll < self.rate_limit_rate:
+            return ttft, per_token, "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return ttft, per_token, "error"
+        return ttft, per_token, None
+
+    def _raise(self, fault: Optional[str], model: str) -> None:
+        if fault == "rate_limit":
+            self.rate_limited += 1
+            raise litellm.RateLimitError(
+                message="Simulated rate limit", llm_provider="sim", model=model,
+                response=httpx.Response(429, headers={"retry-after": str(self.retry_after)},
+                                        request=httpx.Request("POST", "http://simulator/v1/chat/completions")),
+            )
+        if fault == "error":
+            self.errors += 1
+            raise litellm.InternalServerError(message="Simulated server error", llm_provider="sim", model=model)
+
+    def reply(self, model: str, messages: List[Dict[str, Any]], optional_params: Dict[str, Any]):
+        """The replies, finish reason and usage for a request (deterministic)."""
+        digest = hashlib.sha256(json.dumps(
+            [self.seed, model, optional_params.get("temperature"), messages], sort_keys=True, default=str
+        ).encode()).hexdigest()
+        topic = conversation_topic(messages)
+        name = persona(messages)
+        schema = requested_schema(messages, optional_params)
+        opening = not any("=== ROUND" in message_text(m) for m in messages)
+        max_tokens = optional_params.get("max_tokens")
+        stops = optional_params.get("stop") or []
+        stops = [stops] if isinstance(stops, str) else stops
+
+        replies, finish_reason = [], "stop"
+        for index in range(optional_params.get("n") or 1):
+            rng = random.Random(int(digest, 16) + index)
+            if schema is not None:
+                text = json.dumps(instance_from_schema(
+                    schema, schema.get("$defs", {}), rng, lambda field: simulated_text(name, topic, rng, opening).split(". ")[0]
+                ))
+            else:
+                text = simulated_text(name, topic, rng, opening)
+                for stop in stops:
+                    if stop and stop in text:
+                        text = text[:text.index(stop)]
+                words = text.split(" ")
+                if max_tokens and len(words) > max_tokens:
+                    text, finish_reason = " ".join(words[:max_tokens]), "length"
+            replies.append(text)
+
+        prompt_tokens = sum(max(1, len(message_text(m)) // 4) for m in messages)
+        completion_tokens = sum(len(r.split(" ")) for r in replies)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return replies, finish_reason, usage
+
+    @staticmethod
+    def _response(model: str, replies: List[str], finish_reason: str, usage: Dict[str, int]) -> ModelResponse:
+        return ModelResponse(
+            model=model,
+            choices=[
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}
+                for i, text in enumerate(replies)
+            ],
+            usage=usage,
+        )
+
+    async def acompletion(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                          encoding, api_key, logging_obj, optional_params, **kwargs) -> ModelResponse:
+        ttft, per_token, fault = self._plan(model)
+        await asyncio.sleep(ttft)
+        self._raise(fault, model)
+        replies, finish_reason, usage = self.reply(model, messages, optional_params)
+        await asyncio.sleep(per_token * usage["completion_tokens"])
+        return self._response(model, replies, finish_reason, usage)
+
+    def completion(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                   encoding, api_key, logging_obj, optional_params, **kwargs) -> ModelResponse:
+        ttft, per_token, fault = self._plan(model)
+        time.sleep(ttft)
+        self._raise(fault, model)
+        replies, finish_reason, usage = self.reply(model, messages, optional_params)
+        time.sleep(per_token * usage["completion_tokens"])
+        return self._response(model, replies, finish_reason, usage)
+
+    async def astreaming(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                         encoding, api_key, logging_obj, optional_params, **kwargs):
+        ttft, per_token, fault = self._plan(model)
+        await asyncio.sleep(ttft)
+        self._raise(fault, model)
+        replies, finish_reason, usage = self.reply(model, messages, {**optional_params, "n": 1})
+        for index, word in enumerate(replies[0].split(" ")):
+            if index:
+                await asyncio.sleep(per_token)
+            yield {"text": word if index == 0 else " " + word, "is_finished": False, "finish_reason": None,
+                   "usage": None, "index": 0, "tool_use": None}
+        yield {"text": "", "is_finished": True, "finish_reason": finish_reason,
+               "usage": usage, "index": 0, "tool_use": None}
+
+
+def simulated_request(full_model: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """litellm arguments sending a call for `full_model` to the simulator."""
+    return {"model": PREFIX + full_model, "max_tokens": max_tokens}
+
+
+def register(simulator: LLMSimulator) -> None:
+    """Serve "sim/..." models with `simulator`."""
+    litellm.custom_provider_map = [
+        item for item in litellm.custom_provider_map if item["provider"] != PREFIX.rstrip("/")
+    ] + [{"provider": PREFIX.rstrip("/"), "custom_handler": simulator}]
+
+
+# Process-wide simulator
+llm_simulator = LLMSimulator.from_env()
+register(llm_simulator)
+if llm_simulator.enabled:
+    logger.info(f"LLM simulator on: every completion is simulated (seed {llm_simulator.seed})")
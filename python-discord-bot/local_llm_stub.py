@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+A stub OpenAI-compatible chat completions server for benchmarks and tests.
+
+It answers /v1/chat/completions (plain and streamed), /v1/models and the
+Batch API (/v1/files, /v1/batches) without running a model: plain requests
+get filler text of a fixed length, and requests with a JSON schema
+`response_format` get an object built from the schema (enum values picked at random, one array item per union variant), so
+structured calls such as speaker selection validate. Latency is simulated as
+a fixed delay plus a per-token delay; a batch completes --batch-delay-ms
+after it is submitted.
+
+Usage:
+    python local_llm_stub.py --port 8001 --latency-ms 20 --tokens-per-second 200
+
+    LOCAL_LLM_BASE_URL=http://localhost:8001/v1 LOCAL_LLM_MODELS=stub LOCAL_LLM_CALL_SITES=selection,keywords python run.py
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("local_llm_stub")
+
+FILLER = (
+    "This is a stub reply from the local endpoint. It stands in for a model's answer "
+    "so that latency and throughput can be measured without running inference."
+).split()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def instance_from_schema(schema: Dict[str, Any], defs: Dict[str, Any], rng: random.Random) -> Any:
+    """A value that validates against a (pydantic-generated) JSON schema."""
+    if "$ref" in schema:
+        return instance_from_schema(defs[schema["$ref"].split("/")[-1]], defs, rng)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "anyOf" in schema:
+        return instance_from_schema(schema["anyOf"][0], defs, rng)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: instance_from_schema(prop, defs, rng) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        items = schema.get("items", {})
+        # A list of a union (e.g. one decision per meeting): one item per variant
+        variants = items.get("anyOf") or [items]
+        return [instance_from_schema(variant, defs, rng) for variant in variants]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return " ".join(FILLER[:8])
+
+
+class StubServer:
+    """The stub's settings and request handlers."""
+
+    def __init__(self, latency_ms: float = 20, tokens_per_second: float = 0, reply_tokens: int = 60,
+                 seed: Optional[int] = None, batch_delay_ms: float = 1000):
+        self.latency = latency_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.rng = random.Random(seed)
+        self.batch_delay = batch_delay_ms / 1000
+        self.requests = 0
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_post("/v1/files", self.create_file)
+        app.router.add_get("/v1/files/{file_id}/content", self.file_content)
+        app.router.add_post("/v1/batches", self.create_batch)
+        app.router.add_get("/v1/batches/{batch_id}", self.retrieve_batch)
+        app.router.add_post("/v1/batches/{batch_id}/cancel", self.cancel_batch)
+        return app
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+    def reply_text(self, body: Dict[str, Any]) -> str:
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            return json.dumps(instance_from_schema(schema, schema.get("$defs", {}), self.rng))
+        if response_format.get("type") == "json_object":
+            return "{}"
+        words = [FILLER[i % len(FILLER)] for i in range(self.reply_tokens)]
+        return " ".join(words)
+
+    def completion(self, body: Dict[str, Any]):
+        """The replies, finish reason and usage for a chat completion request."""
+        self.requests += 1
+        prompt_tokens = sum(estimate_tokens(json.dumps(m.get("content"))) for m in body.get("messages", []))
+        max_tokens = body.get("max_tokens")
+        replies: List[str] = []
+        finish_reason = "stop"
+        for _ in range(body.get("n") or 1):
+            text = self.reply_text(body)
+            words = text.split(" ")
+            if max_tokens and len(words) > max_tokens and not body.get("response_format"):
+                text, finish_reason = " ".join(words[:max_tokens]), "length"
+            replies.append(text)
+        completion_tokens = sum(len(r.split(" ")) for r in replies)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return replies, finish_reason, usage
+
+    def completion_object(self, body: Dict[str, Any], replies: List[str], finish_reason: str, usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}
+                for i, text in enumerate(replies)
+            ],
+            "usage": usage,
+        }
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        replies, finish_reason, usage = self.completion(body)
+        model = body.get("model", "stub")
+        created = int(time.time())
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second else 0
+
+        await asyncio.sleep(self.latency)
+        if not body.get("stream"):
+            await asyncio.sleep(per_token * usage["completion_tokens"])
+            return web.json_response(self.completion_object(body, replies, finish_reason, usage))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(choices, extra=None):
+            chunk = {"id": f"stub-{self.requests}", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": choices, **(extra or {})}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        words = replies[0].split(" ")
+        for index, word in enumerate(words):
+            await asyncio.sleep(per_token)
+            delta = word if index == 0 else " " + word
+            await send([{"index": 0, "delta": {"role": "assistant", "content": delta}, "finish_reason": None}])
+        await send([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await send([], {"usage": usage})
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # Files and batches (the OpenAI Batch API, completed in-process after batch_delay)
+
+    def _file_object(self, file_id: str) -> Dict[str, Any]:
+        stored = self.files[file_id]
+        return {
+            "id": file_id, "object": "file", "bytes": len(stored["content"]), "created_at": stored["created_at"],
+            "filename": stored["filename"], "purpose": stored["purpose"], "status": "processed",
+        }
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> str:
+        file_id = f"file-{len(self.files) + 1}"
+        self.files[file_id] = {"content": content, "filename": filename, "purpose": purpose, "created_at": int(time.time())}
+        return file_id
+
+    async def create_file(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        upload = form["file"]
+        file_id = self._store_file(upload.file.read(), upload.filename, form.get("purpose", "batch"))
+        return web.json_response(self._file_object(file_id))
+
+    async def file_content(self, request: web.Request) -> web.Response:
+        stored = self.files.get(request.match_info["file_id"])
+        if stored is None:
+            return web.json_response({"error": {"message": "No such file"}}, status=404)
+        return web.Response(body=stored["content"], content_type="application/jsonl")
+
+    async def create_batch(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        batch_id = f"batch-{len(self.batches) + 1}"
+        lines = self.files[body["input_file_id"]]["content"].decode().splitlines()
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": body["endpoint"], "errors": None,
+            "input_file_id": body["input_file_id"], "completion_window": body["completion_window"],
+            "status": "in_progress", "output_file_id": None, "error_file_id": None,
+            "created_at": int(time.time()), "metadata": body.get("metadata"),
+            "request_counts": {"total": len([l for l in lines if l.strip()]), "completed": 0, "failed": 0},
+        }
+        asyncio.get_running_loop().call_later(self.batch_delay, self._complete_batch, batch_id, lines)
+        return web.json_response(self.batches[batch_id])
+
+    def _complete_batch(self, batch_id: str, lines: List[str]) -> None:
+        batch = self.batches[batch_id]
+        if batch["status"] != "in_progress":
+            return
+        output = []
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            replies, finish_reason, usage = self.completion(record["body"])
+            output.append(json.dumps({
+                "id": f"batch_req_{record['custom_id']}",
+                "custom_id": record["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": f"stub-{self.requests}",
+                    "body": self.completion_object(record["body"], replies, finish_reason, usage),
+                },
+                "error": None,
+            }))
+        batch["output_file_id"] = self._store_file(("\n".join(output) + "\n").encode(), f"{batch_id}_output.jsonl", "batch_output")
+        batch["request_counts"]["completed"] = len(output)
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    async def retrieve_batch(self, request: web.Request) -> web.Response:
+        batch = self.batches.get(request.match_info["batch_id"])
+        if batch is None:
+            return web.json_response({"error": {"message": "No such batch"}}, status=404)
+        return web.json_response(batch)
+
+    async def cancel_batch(self, request: web.Request) -> web.Response:
+        batch = self.batches.get(request.match_info["batch_id"])
+        if batch is None:
+            return web.json_response({"error": {"message": "No such batch"}}, status=404)
+        if batch["status"] == "in_progress":
+            batch["status"] = "cancelled"
+        return web.json_response(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Output speed (0 = instant)")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="Length of plain-text replies")
+    parser.add_argument("--seed", type=int, help="Seed for the enum choices in JSON replies")
+    parser.add_argument("--batch-delay-ms", type=float, default=1000, help="Time for a submitted batch to complete")
+    args = parser.parse_args()
+    server = StubServer(args.latency_ms, args.tokens_per_second, args.reply_tokens, args.seed, args.batch_delay_ms)
+    logger.info(f"Serving stub completions on http://{args.host}:{args.port}/v1")
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
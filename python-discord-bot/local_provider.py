@@ -0,0 +1,218 @@
+# local_provider.py
+
+"""
+An OpenAI-compatible local endpoint as an LLM provider.
+
+Any server that speaks the OpenAI chat completions API (vLLM, llama.cpp,
+Ollama, LM Studio, or local_llm_stub.py for benchmarks) can serve calls:
+
+    LOCAL_LLM_BASE_URL=http://localhost:8001/v1
+    LOCAL_LLM_MODELS=llama-3.1-8b-instruct,llama-3.1-70b-instruct
+    LOCAL_LLM_CALL_SITES=selection,keywords
+
+Its models are addressed as "local/<name>" everywhere a litellm model string
+is accepted (agent models, LLM_TIER_MODELS, LLM_CALL_SITE_TIERS). The first
+listed model is the "local" provider's fast tier and the last its standard
+and premium tiers. LOCAL_LLM_CALL_SITES pins call sites to the fast model, so
+the high-volume control calls (speaker selection, keyword extraction) run on
+local capacity while agents keep their hosted models.
+
+The endpoint's limits are enforced on the client: at most
+LOCAL_LLM_MAX_CONCURRENCY requests in flight (others wait for a slot),
+max_tokens clamped to LOCAL_LLM_MAX_OUTPUT_TOKENS, and a request timeout.
+With LOCAL_LLM_FALLBACK set, a failing local model fails over to that hosted
+model (see llm_routing.py).
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from llm_simulator import llm_simulator, simulated_request
+from traffic_log import replayed_request, traffic_log
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "local/"
+
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "").strip()
+LOCAL_LLM_MODELS = [m.strip() for m in os.getenv("LOCAL_LLM_MODELS", "").split(",") if m.strip()]
+# Call sites served by the local fast model (see model_routing.CALL_SITES)
+LOCAL_LLM_CALL_SITES = [s.strip() for s in os.getenv("LOCAL_LLM_CALL_SITES", "").split(",") if s.strip()]
+# Hosted model a failing local model fails over to (e.g. openai/gpt-4o-mini)
+LOCAL_LLM_FALLBACK = os.getenv("LOCAL_LLM_FALLBACK", "").strip()
+
+# Limits of the server: concurrent requests (0 = no limit), output tokens per reply
+# (0 = no limit), context window (for logging prompts that will not fit) and timeout
+LOCAL_LLM_MAX_CONCURRENCY = int(os.getenv("LOCAL_LLM_MAX_CONCURRENCY", "0"))
+LOCAL_LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LOCAL_LLM_MAX_OUTPUT_TOKENS", "0"))
+LOCAL_LLM_CONTEXT_WINDOW = int(os.getenv("LOCAL_LLM_CONTEXT_WINDOW", "0"))
+LOCAL_LLM_TIMEOUT = float(os.getenv("LOCAL_LLM_TIMEOUT", "60"))
+
+# What the server supports: "json_schema" (constrained decoding), "json_object" or "none"
+LOCAL_LLM_RESPONSE_FORMAT = os.getenv("LOCAL_LLM_RESPONSE_FORMAT", "json_schema").lower()
+LOCAL_LLM_SUPPORTS_N = os.getenv("LOCAL_LLM_SUPPORTS_N", "false").lower() == "true"
+
+# Sent when no LOCAL_LLM_API_KEY is configured, so litellm never falls back to OPENAI_API_KEY
+PLACEHOLDER_API_KEY = "local"
+
+
+def is_local(full_model: str) -> bool:
+    return bool(full_model) and full_model.startswith(PREFIX)
+
+
+@dataclass
+class LocalEndpoint:
+    """Where the local models are served and what the server can take."""
+    base_url: str = ""
+    models: List[str] = field(default_factory=list)
+    call_sites: List[str] = field(default_factory=list)
+    fallback: str = ""
+    max_concurrency: int = 0
+    max_output_tokens: int = 0
+    context_window: int = 0
+    timeout: float = 60.0
+    response_format: str = "json_schema"
+    supports_n: bool = False
+
+    def __post_init__(self):
+        self._lock = threading.Condition()
+        self._in_flight = 0
+
+    @classmethod
+    def from_env(cls) -> "LocalEndpoint":
+        return cls(
+            base_url=LOCAL_LLM_BASE_URL,
+            models=list(LOCAL_LLM_MODELS),
+            call_sites=list(LOCAL_LLM_CALL_SITES),
+            fallback=LOCAL_LLM_FALLBACK,
+            max_concurrency=LOCAL_LLM_MAX_CONCURRENCY,
+            max_output_tokens=LOCAL_LLM_MAX_OUTPUT_TOKENS,
+            context_window=LOCAL_LLM_CONTEXT_WINDOW,
+            timeout=LOCAL_LLM_TIMEOUT,
+            response_format=LOCAL_LLM_RESPONSE_FORMAT,
+            supports_n=LOCAL_LLM_SUPPORTS_N,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    def tier_models(self) -> Dict[str, str]:
+        """The "local" provider's model per tier: the first model is fast, the last the others."""
+        if not self.models:
+            return {}
+        fast, large = PREFIX + self.models[0], PREFIX + self.models[-1]
+        return {"fast": fast, "standard": large, "premium": large}
+
+    def request_kwargs(self, full_model: str, credential_kwargs: Dict[str, str], max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        litellm arguments for a local model: the OpenAI-compatible route to the server.
+
+        Args:
+            full_model: "local/<name>"
+            credential_kwargs: The pooled key's arguments (see credential_pool.Credential)
+            max_tokens: The requested output limit, clamped to the server's
+
+        Returns:
+            model, api_base, api_key, timeout and max_tokens for litellm
+        """
+        return {
+            "model": "openai/" + full_model[len(PREFIX):],
+            "api_base": self.base_url,
+            "api_key": credential_kwargs.get("api_key") or PLACEHOLDER_API_KEY,
+            "timeout": self.timeout,
+            "max_tokens": self.clamp_max_tokens(max_tokens),
+        }
+
+    def clamp_max_tokens(self, max_tokens: Optional[int]) -> Optional[int]:
+        if not self.max_output_tokens:
+            return max_tokens
+        return min(max_tokens or self.max_output_tokens, self.max_output_tokens)
+
+    def check_prompt(self, full_model: str, prompt_tokens: int) -> None:
+        """Log replies whose prompt nearly filled the context window (the server truncates or rejects them)."""
+        if self.context_window and prompt_tokens > 0.9 * self.context_window:
+            logger.warning(f"{full_model} prompt used {prompt_tokens} of {self.context_window} context tokens")
+
+    def _acquire(self, blocking: bool) -> bool:
+        with self._lock:
+            while self.max_concurrency and self._in_flight >= self.max_concurrency:
+                if not blocking:
+                    return False
+                self._lock.wait()
+            self._in_flight += 1
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._lock.notify()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for one of the server's request slots (shared with worker threads)."""
+        delay = 0.005
+        while not self._acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def sync_slot(self):
+        """Blocking variant of slot()."""
+        self._acquire(blocking=True)
+        try:
+            yield
+        finally:
+            self._release()
+
+
+def litellm_request(full_model: str, credential_kwargs: Dict[str, str], max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """
+    The model, credential and max_tokens arguments for a litellm call to `full_model`.
+
+    Hosted models pass through unchanged; local models are routed to the local endpoint.
+    With LLM_REPLAY_DIR set, every model is answered from recorded traffic (see traffic_log.py),
+    and with LLM_SIMULATOR on, by the simulator (see llm_simulator.py).
+    """
+    if traffic_log.replaying:
+        return replayed_request(full_model, max_tokens)
+    if llm_simulator.enabled:
+        return simulated_request(full_model, max_tokens)
+    if is_local(full_model):
+        return local_endpoint.request_kwargs(full_model, credential_kwargs, max_tokens)
+    return {"model": full_model, "max_tokens": max_tokens, **credential_kwargs}
+
+
+@asynccontextmanager
+async def request_slot(full_model: str):
+    """A concurrency slot on the local endpoint (nothing for hosted models)."""
+    if is_local(full_model):
+        async with local_endpoint.slot():
+            yield
+    else:
+        yield
+
+
+@contextmanager
+def sync_request_slot(full_model: str):
+    """Blocking variant of request_slot()."""
+    if is_local(full_model):
+        with local_endpoint.sync_slot():
+            yield
+    else:
+        yield
+
+
+# Process-wide endpoint
+local_endpoint = LocalEndpoint.from_env()
+if local_endpoint.configured:
+    logger.info(f"Local models {local_endpoint.models} at {local_endpoint.base_url}")
@@ -0,0 +1,121 @@
+# local_rerank.py
+
+"""
+Local lexical reranking of small paper sets.
+
+For the 10-30 abstracts a Tool Agent search returns, embedding every abstract
+through the OpenAI API and building a FAISS index costs more than it saves.
+BM25 over those abstracts runs locally in a few milliseconds, so this module
+scores them against the keywords and the last speaker's turn and keeps the
+top-k for the LLM.
+"""
+
+import re
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Standard Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from has have how i if in into is it its
+let lets me more most my not of on or our so such than that the their them then there these they
+this to us was we were what when which who why will with would you your
+""".split())
+
+# Turns in the conversation history look like "\n[Agent Name]: text"
+TURN_PATTERN = re.compile(r"\n\[([^\]\n]+)\]:\s")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [t for t in TOKEN_PATTERN.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def extract_last_turn(conversation: str) -> str:
+    """Return the text of the last speaker's turn, or the tail of the conversation."""
+    matches = list(TURN_PATTERN.finditer(conversation or ""))
+    if not matches:
+        return (conversation or "")[-2000:]
+    return conversation[matches[-1].end():]
+
+
+class BM25Scorer:
+    """Vectorized BM25 over a small, fixed set of documents."""
+
+    def __init__(self, documents: Sequence[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+
+        tokenized = [tokenize(doc) for doc in documents]
+        self.vocabulary = {}
+        for tokens in tokenized:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        # Term-frequency matrix (documents x vocabulary)
+        self.term_freqs = np.zeros((len(tokenized), max(len(self.vocabulary), 1)), dtype=np.float32)
+        for row, tokens in enumerate(tokenized):
+            if tokens:
+                columns = np.fromiter((self.vocabulary[t] for t in tokens), dtype=np.int64, count=len(tokens))
+                np.add.at(self.term_freqs[row], columns, 1.0)
+
+        doc_lengths = self.term_freqs.sum(axis=1)
+        avg_length = doc_lengths.mean() if len(doc_lengths) and doc_lengths.mean() > 0 else 1.0
+        doc_freqs = (self.term_freqs > 0).sum(axis=0)
+        n_docs = len(tokenized)
+
+        self.idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        # Precompute the saturated, length-normalized term weights once per document set
+        norm = self.k1 * (1.0 - self.b + self.b * doc_lengths / avg_length)
+        self.weights = (self.term_freqs * (self.k1 + 1.0)) / (self.term_freqs + norm[:, None])
+
+    def score(self, query: str) -> np.ndarray:
+        """BM25 score of every document against the query."""
+        query_vector = np.zeros(self.weights.shape[1], dtype=np.float32)
+        for token in tokenize(query):
+            column = self.vocabulary.get(token)
+            if column is not None:
+                query_vector[column] += 1.0
+        return self.weights @ (query_vector * self.idf)
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """
+        Indices of the k best-scoring documents, best first.
+
+        Documents that share no term with the query are dropped. If nothing
+        matches at all, the first k documents are returned in their original
+        order, which is already ranked by the search step.
+        """
+        scores = self.score(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        if not scores.any():
+            return list(range(k))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [int(i) for i in ranked if scores[i] > 0]
+
+
+def build_rerank_query(keywords: Optional[List[str]], conversation: str) -> str:
+    """Query text for reranking: the keywords (weighted twice) plus the last turn."""
+    keyword_text = " ".join(keywords or [])
+    return f"{keyword_text} {keyword_text} {extract_last_turn(conversation)}"
+
+
+def rerank_texts(texts: Sequence[str], keywords: Optional[List[str]], conversation: str, k: int) -> List[int]:
+    """Indices of the k texts most relevant to the keywords and the last speaker's turn."""
+    if not texts:
+        return []
+    scorer = BM25Scorer(texts)
+    indices = scorer.top_k(build_rerank_query(keywords, conversation), k)
+    logger.debug(f"BM25 reranked {len(texts)} texts, kept {indices}")
+    return indices
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Manage the local preprint dumps used by the Tool Agent.
+
+Examples:
+    # Show what is on disk
+    python manage_dumps.py status
+
+    # Pull everything new from bioRxiv since the last ingest
+    python manage_dumps.py ingest --server biorxiv
+
+    # Ingest from a local JSONL feed instead of the upstream server
+    python manage_dumps.py ingest --server medrxiv --feed new_medrxiv.jsonl
+
+    # Embed the records added since the last build into the semantic index
+    python manage_dumps.py build-index --server all
+"""
+
+import sys
+import logging
+import argparse
+
+from preprint_dumps import (
+    DUMP_SERVERS,
+    dump_path,
+    fetch_upstream,
+    ingest_records,
+    load_manifest,
+    read_feed,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("manage_dumps")
+
+
+def cmd_status(args):
+    """Print the dump path, record count and last ingested date per server."""
+    manifest = load_manifest()
+    for server in DUMP_SERVERS:
+        entry = manifest.get(server, {})
+        print(
+            f"{server:>9}: {dump_path(server)} | "
+            f"records: {entry.get('record_count', 'unknown')} | "
+            f"last date: {entry.get('last_date', '-')} | "
+            f"updated: {entry.get('updated_at', '-')}"
+        )
+    return 0
+
+
+def cmd_ingest(args):
+    """Ingest a delta from the upstream server or a local feed."""
+    servers = DUMP_SERVERS if args.server == "all" else [args.server]
+    if args.feed and len(servers) > 1:
+        logger.error("--feed can only be used with a single --server")
+        return 1
+
+    for server in servers:
+        try:
+            if args.feed:
+                records = read_feed(args.feed)
+            else:
+                records = fetch_upstream(server, start_date=args.since, end_date=args.until)
+        except Exception as e:
+            logger.error(f"Could not fetch {server} records: {e}")
+            return 1
+
+        stats = ingest_records(server, records)
+        print(f"{server}: added {stats['added']}, skipped {stats['duplicates']} duplicates "
+              f"and {stats['invalid']} records without DOI")
+    return 0
+
+
+def cmd_build_index(args):
+    """Embed unindexed dump records into each server's vector index."""
+    from corpus_index import CorpusIndex
+
+    servers = DUMP_SERVERS if args.server == "all" else [args.server]
+    for server in servers:
+        index = CorpusIndex(server)
+        try:
+            added = index.build(batch_size=args.batch_size, limit=args.limit)
+        except FileNotFoundError as e:
+            logger.warning(f"Skipping {server}: {e}")
+            continue
+        except Exception as e:
+            logger.error(f"Could not index {server}: {e}")
+            return 1
+        print(f"{server}: indexed {added} new records ({index.store.count} total)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage local preprint dumps")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("status", help="Show the state of each dump")
+
+    ingest = subparsers.add_parser("ingest", help="Append new records to a dump")
+    ingest.add_argument("--server", choices=list(DUMP_SERVERS) + ["all"], required=True)
+    ingest.add_argument("--feed", help="Local JSONL file to ingest instead of querying the server")
+    ingest.add_argument("--since", help="Start date (YYYY-MM-DD); defaults to the last ingested date")
+    ingest.add_argument("--until", help="End date (YYYY-MM-DD); defaults to today")
+
+    build_index = subparsers.add_parser("build-index", help="Embed new records into the semantic index")
+    build_index.add_argument("--server", choices=list(DUMP_SERVERS) + ["all"], default="all")
+    build_index.add_argument("--batch-size", type=int, default=1024, help="Records embedded per step")
+    build_index.add_argument("--limit", type=int, help="Maximum number of records to embed in this run")
+
+    args = parser.parse_args()
+    commands = {"status": cmd_status, "ingest": cmd_ingest, "build-index": cmd_build_index}
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Manage the local full-text paper library used by the Tool Agent.
+
+Examples:
+    # Index new or changed PDFs in PDF_LIBRARY_DIR (default: ./pdf_library)
+    python manage_library.py ingest
+
+    # Index another folder
+    python manage_library.py ingest --dir ~/lab-papers
+
+    # Show what is indexed
+    python manage_library.py status
+
+    # Try a query
+    python manage_library.py search "CAR-T exhaustion markers"
+"""
+
+import sys
+import logging
+import argparse
+
+from pdf_library import PdfLibrary
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("manage_library")
+
+
+def cmd_ingest(library, args):
+    """Index new and changed files, tombstone removed ones."""
+    try:
+        stats = library.ingest()
+    except Exception as e:
+        logger.error(f"Ingest failed: {e}")
+        return 1
+    print(f"added {stats['added']}, updated {stats['updated']}, removed {stats['removed']}, "
+          f"unchanged {stats['unchanged']}, failed {stats['failed']} files; {stats['chunks']} new chunks")
+    return 0
+
+
+def cmd_status(library, args):
+    """Print the indexed files and chunk counts."""
+    files = library.load_manifest()["files"]
+    live = sum(len(entry["rows"]) for entry in files.values())
+    print(f"{library.library_dir}: {len(files)} files, {live} live chunks, "
+          f"{library.store.count - live} tombstoned, model {library.store.meta().get('model')}")
+    for rel_path, entry in sorted(files.items()):
+        print(f"  {rel_path}: {len(entry['rows'])} chunks | {entry['title']}")
+    return 0
+
+
+def cmd_search(library, args):
+    """Print the best-matching chunks for a query."""
+    for hit in library.search(args.query, k=args.k):
+        print(f"[{hit['score']:.3f}] {hit['file']} (chunk {hit['chunk']}): {hit['text'][:200]!r}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local paper library")
+    parser.add_argument("--dir", help="Library folder (default: PDF_LIBRARY_DIR)")
+    parser.add_argument("--index-dir", help="Index folder (default: <library>/.index)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("ingest", help="Index new or changed files")
+    subparsers.add_parser("status", help="Show the indexed files")
+    search = subparsers.add_parser("search", help="Search the library")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+
+    args = parser.parse_args()
+    library = PdfLibrary(args.dir, args.index_dir)
+    commands = {"ingest": cmd_ingest, "status": cmd_status, "search": cmd_search}
+    return commands[args.command](library, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# model_routing.py
+
+"""
+Which model serves which call.
+
+Every LLM call in a meeting belongs to a call site (speaker selection,
+persona generation, agent turns, PI synthesis, final summary, Tool Agent
+keyword extraction). Call sites map to tiers, and tiers map to a model per
+provider, so cheap fast models handle the control calls and premium models
+the content.
+
+An agent's stored model is honoured: a full model string ("anthropic/...")
+is used as is, a provider name ("anthropic") picks that provider's model for
+the call site's tier.
+
+The policy is configured per deployment through environment variables and
+can be overridden per meeting, with a named profile or an explicit mapping
+(see ModelRoutingPolicy.with_overrides).
+"""
+
+import os
+import json
+import logging
+from typing import Dict, Optional, Union
+
+from local_provider import local_endpoint
+
+logger = logging.getLogger(__name__)
+
+FAST, STANDARD, PREMIUM = "fast", "standard", "premium"
+
+CALL_SITES = ("selection", "persona", "turn", "synthesis", "summary", "keywords")
+
+DEFAULT_CALL_SITE_TIERS = {
+    "selection": FAST,
+    "persona": FAST,
+    "keywords": FAST,
+    "turn": STANDARD,
+    "synthesis": PREMIUM,
+    "summary": PREMIUM,
+}
+
+# Model per tier for each provider (litellm model strings)
+DEFAULT_TIER_MODELS = {
+    "openai": {
+        FAST: "openai/gpt-4o-mini",
+        STANDARD: "openai/gpt-4o",
+        PREMIUM: "openai/gpt-4o",
+    },
+    "anthropic": {
+        FAST: "anthropic/claude-3-haiku-20240307",
+        STANDARD: "anthropic/claude-3-5-sonnet-20240620",
+        PREMIUM: "anthropic/claude-3-5-sonnet-20240620",
+    },
+    "mistral": {
+        FAST: "mistral/mistral-small-latest",
+        STANDARD: "mistral/mistral-large-latest",
+        PREMIUM: "mistral/mistral-large-latest",
+    },
+}
+# The OpenAI-compatible local endpoint's models, when configured (see local_provider.py)
+if local_endpoint.configured and local_endpoint.models:
+    DEFAULT_TIER_MODELS["local"] = local_endpoint.tier_models()
+
+# Provider used for call sites without an agent (selection, summary, ...)
+DEFAULT_PROVIDER = os.getenv("DEFAULT_LLM_PROVIDER", "openai").lower()
+DEFAULT_PROVIDER_FALLBACK = "openai"
+
+# Per-meeting presets (call site -> tier), selectable with /lab team_meeting model_profile
+MEETING_PROFILES = {
+    "balanced": {},
+    "economy": {"turn": FAST, "synthesis": STANDARD, "summary": STANDARD},
+    "premium": {"selection": STANDARD, "turn": PREMIUM},
+}
+
+# Deployment overrides, e.g.
+#   LLM_CALL_SITE_TIERS='{"turn": "premium"}'
+#   LLM_TIER_MODELS='{"openai": {"fast": "openai/gpt-3.5-turbo"}}'
+#   LOCAL_LLM_CALL_SITES=selection,keywords (pins them to the local endpoint's fast model)
+LOCAL_CALL_SITE_TIERS = {
+    site: DEFAULT_TIER_MODELS["local"][FAST] for site in local_endpoint.call_sites
+} if "local" in DEFAULT_TIER_MODELS else {}
+CALL_SITE_TIERS = {
+    **DEFAULT_CALL_SITE_TIERS,
+    **LOCAL_CALL_SITE_TIERS,
+    **json.loads(os.getenv("LLM_CALL_SITE_TIERS", "{}") or "{}"),
+}
+TIER_MODELS = {
+    provider: {**models, **json.loads(os.getenv("LLM_TIER_MODELS", "{}") or "{}").get(provider, {})}
+    for provider, models in DEFAULT_TIER_MODELS.items()
+}
+
+
+class ModelRoutingPolicy:
+    """Maps call sites to models, honouring agents' stored models."""
+
+    def __init__(
+        self,
+        call_site_tiers: Optional[Dict[str, str]] = None,
+        tier_models: Optional[Dict[str, Dict[str, str]]] = None,
+        default_provider: str = DEFAULT_PROVIDER,
+    ):
+        """
+        Args:
+            call_site_tiers: Call site -> tier name, or a full model string to pin it
+            tier_models: Provider -> {tier -> full model string}
+            default_provider: Provider for calls that have no agent model
+        """
+        self.call_site_tiers = dict(call_site_tiers or CALL_SITE_TIERS)
+        self.tier_models = {p: dict(m) for p, m in (tier_models or TIER_MODELS).items()}
+        self.default_provider = default_provider
+
+    def with_overrides(self, overrides: Optional[Union[str, Dict]]) -> "ModelRoutingPolicy":
+        """
+        A copy of this policy with per-meeting overrides applied.
+
+        Args:
+            overrides: A MEETING_PROFILES name, {"call_sites": {...}, "tiers": {...},
+                "provider": ...}, or just a call site -> tier/model mapping
+
+        Returns:
+            The overridden policy (self when there is nothing to override)
+        """
+        if isinstance(overrides, str):
+            if overrides not in MEETING_PROFILES:
+                logger.warning(f"Unknown model profile {overrides}, using the deployment policy")
+            overrides = MEETING_PROFILES.get(overrides)
+        if not overrides:
+            return self
+        if not {"call_sites", "tiers", "provider"} & set(overrides):
+            overrides = {"call_sites": overrides}
+        tier_models = {p: dict(m) for p, m in self.tier_models.items()}
+        for provider, models in overrides.get("tiers", {}).items():
+            tier_models.setdefault(provider, {}).update(models)
+        return ModelRoutingPolicy(
+            call_site_tiers={**self.call_site_tiers, **overrides.get("call_sites", {})},
+            tier_models=tier_models,
+            default_provider=overrides.get("provider", self.default_provider),
+        )
+
+    def model_for(self, call_site: str, agent: Optional[Dict] = None, tier: Optional[str] = None) -> str:
+        """
+        The litellm model string for a call.
+
+        Args:
+            call_site: One of CALL_SITES
+            agent: The speaking agent's record (its "model" field is honoured)
+            tier: Force a tier (e.g. FAST when a budget runs low); agents' pinned
+                models are then replaced by their provider's model for that tier,
+                call sites pinned to a model (e.g. the local endpoint) keep it
+
+        Returns:
+            Full model string, e.g. "openai/gpt-4o-mini"
+        """
+        if call_site not in self.call_site_tiers:
+            logger.warning(f"Unknown call site {call_site}, using the {STANDARD} tier")
+        stored = ((agent or {}).get("model") or "").strip()
+        site_tier = self.call_site_tiers.get(call_site, STANDARD)
+        if tier is not None:
+            stored = stored.split("/", 1)[0]
+        if tier is None or "/" in site_tier:
+            tier = site_tier
+
+        # An agent pinned to a specific model keeps it
+        if "/" in stored:
+            return stored
+        # A call site pinned to a specific model
+        if "/" in tier:
+            return tier
+
+        provider = stored.lower() if stored.lower() in self.tier_models else self.default_provider
+        models = self.tier_models.get(provider) or self.tier_models[DEFAULT_PROVIDER_FALLBACK]
+        return models.get(tier) or models.get(STANDARD) or next(iter(models.values()))
+
+
+# Deployment-wide policy; meetings derive their own with with_overrides
+model_policy = ModelRoutingPolicy()
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 class LLMProvider(str, Enum):
@@ -7,6 +7,7 @@ class LLMProvider(str, Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     MISTRAL = "mistral"
+    LOCAL = "local"  # OpenAI-compatible local endpoint (see local_provider.py)
 
 @dataclass
 class LLMMessage:
@@ -14,6 +15,7 @@ class LLMMessage:
     role: str  # "system", "user", or "assistant"
     content: str
     name: Optional[str] = None  # For multi-agent conversations
+    cache: bool = False  # Ends a stable prompt prefix (see prompt_cache.py)
 
 @dataclass
 class LLMResponse:
@@ -22,6 +24,9 @@ class LLMResponse:
     provider: LLMProvider
     model: str
     usage: Dict[str, int]  # Token usage statistics
+    latency_ms: Optional[float] = None  # Wall time of the request
+    time_to_first_token_ms: Optional[float] = None  # Streaming only
+    samples: Optional[List[str]] = None  # Every completion when n > 1 (content is the first)
 
 class ModelConfig:
     """Configuration for LLM models."""
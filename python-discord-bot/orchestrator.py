@@ -1,19 +1,83 @@
+import os
 import logging
 import asyncio
-import json
-from typing import List, Dict, Optional, Any, Set
+from typing import List, Dict, Optional, Any, Set, Literal
 from models import LLMProvider, LLMMessage
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, create_model
 import discord
 from datetime import datetime
+from discord_streaming import StreamingMessageRenderer
+from model_routing import model_policy, FAST
+from structured_output import StructuredOutputError
+from prompt_cache import conversation_messages, join_conversation, split_history
+from credential_pool import credential_pools
+from usage_ledger import Budget, BUDGET_OK, BUDGET_EXHAUSTED, bind_usage_scope, usage_scope, usage_ledger
+from selection_batcher import SelectionBatcher, SELECTION_BATCHING
+from fused_turn import select_and_speak
+from batch_api import BatchExecutor, LLM_BATCH_MODE, bind_batch_executor
+from traffic_log import traffic_log
 
 logger = logging.getLogger(__name__)
 
+# Start the Tool Agent's literature search in the background at meeting start
+# (from the agenda) and refresh it after each PI synthesis. Opt-in: the searches
+# (and their keyword and embedding calls) are paid for even if the Tool Agent never speaks
+LITERATURE_PREFETCH = os.getenv("TOOL_AGENT_PREFETCH", "false").lower() == "true"
+
+# Run Tool Agent turns as background tasks: the round continues with other speakers
+# and the literature result is injected once ready (at the latest before the PI synthesis)
+TOOL_AGENT_NONBLOCKING = os.getenv("TOOL_AGENT_NONBLOCKING", "false").lower() == "true"
+
+# In live mode, show agent replies token by token (a placeholder message that is edited as text arrives)
+STREAM_REPLIES = os.getenv("DISCORD_STREAM_REPLIES", "true").lower() == "true"
+
+# Sampling temperature of agent replies. With temperature_variation, parallel runs are
+# spread over PARALLEL_TEMPERATURE_LEVELS levels from AGENT_TEMPERATURE - SPREAD up to
+# AGENT_TEMPERATURE; runs on the same level share one n>1 request for the PI opening.
+AGENT_TEMPERATURE = 1.0
+PARALLEL_TEMPERATURE_SPREAD = float(os.getenv("PARALLEL_TEMPERATURE_SPREAD", "0.5"))
+PARALLEL_TEMPERATURE_LEVELS = int(os.getenv("PARALLEL_TEMPERATURE_LEVELS", "3"))
+
+# Choose the next speaker and draft their reply in one call instead of a selection
+# call followed by the agent's call (see fused_turn.py); per meeting with fused_turns
+FUSED_TURNS = os.getenv("FUSED_TURNS", "false").lower() == "true"
+
 class OrchestratorResponse(BaseModel):
     """Pydantic model for the orchestrator's agent selection response."""
     agent: str
     rationale: str
 
+def speaker_choice_schema(agent_names):
+    """OrchestratorResponse restricted to the agents who may speak next (an enum in the JSON schema)."""
+    return create_model(
+        "SpeakerChoice",
+        __base__=OrchestratorResponse,
+        agent=(Literal[tuple(agent_names)], ...),
+    )
+
+def agent_key_for_role(agent_role):
+    """The AGENTS template for a meeting agent's role."""
+    # Map agent roles to valid agent_keys that exist in the AGENTS dictionary
+    if "Scientist" in agent_role or "specialist" in agent_role.lower() or "expert" in agent_role.lower():
+        # Use the generic scientist template for all scientist types
+        return "scientist"
+    elif "Critic" in agent_role or "reviewer" in agent_role.lower():
+        return "scientific_critic"
+    elif "Lead" in agent_role or "PI" in agent_role or "Principal" in agent_role:
+        return "principal_investigator"
+    elif "Tool" in agent_role:
+        return "tool_agent"
+    # Default to scientist for unknown roles
+    return "scientist"
+
+def run_temperature(parallel_index, total_parallel_meetings, temperature_variation):
+    """The agent temperature for one of several parallel runs."""
+    levels = min(PARALLEL_TEMPERATURE_LEVELS, total_parallel_meetings)
+    if not temperature_variation or levels <= 1:
+        return AGENT_TEMPERATURE
+    level = parallel_index * levels // total_parallel_meetings
+    return round(AGENT_TEMPERATURE - PARALLEL_TEMPERATURE_SPREAD * (levels - 1 - level) / (levels - 1), 2)
+
 class AgentOrchestrator:
     """Orchestrates agent interactions in meetings."""
     
@@ -22,9 +86,15 @@ class AgentOrchestrator:
         self.llm_client = llm_client
         self.active_meetings = {}
         self.parallel_groups = {}
+        self.shared_openings = {}  # In-flight PI opening samples, per parallel group
+        # Speaker selections of concurrent meetings decided in shared calls (SELECTION_BATCHING)
+        self.selection_batcher = SelectionBatcher(llm_client) if SELECTION_BATCHING else None
+        # Provider batches for the calls of non-live meetings in batch mode (see batch_api.py)
+        self.batch_executor = BatchExecutor()
         logger.info("Initialized AgentOrchestrator")
     
-    async def initialize_meeting(self, meeting_id, session_id, agents, agenda, round_count, parallel_index=0, total_parallel_meetings=1):
+    async def initialize_meeting(self, meeting_id, session_id, agents, agenda, round_count, parallel_index=0, total_parallel_meetings=1, model_policy=None, budget=None,
+                                 temperature_variation=False, parallel_group=None, fused_turns=None, batch_mode=None):
         """Initialize a meeting.
         
         Args:
@@ -35,6 +105,12 @@ class AgentOrchestrator:
             round_count: Number of rounds for the meeting
             parallel_index: Index of this meeting in parallel meetings (0-based)
             total_parallel_meetings: Total number of parallel meetings
+            model_policy: Per-meeting model routing overrides (a profile name or mapping, see model_routing.py)
+            budget: Per-meeting cost limit in USD, or a usage_ledger.Budget (default: the deployment's)
+            temperature_variation: Spread agent temperatures across the parallel runs
+            parallel_group: ID shared by the parallel runs started together (enables the shared PI opening)
+            fused_turns: Select the speaker and draft their reply in one call (default: FUSED_TURNS)
+            batch_mode: Send the calls of a non-live run through provider batches (default: LLM_BATCH_MODE)
         """
         logger.info(f"Initializing meeting {meeting_id} with {len(agents)} agents, parallel_index={parallel_index}, total_parallel_meetings={total_parallel_meetings}")
         
@@ -55,7 +131,15 @@ class AgentOrchestrator:
             "start_time": datetime.now().isoformat(),
             "messages": [],
             "summary": None,
-            "conversation_history": f"The user wants to discuss: {agenda}\n\n"
+            "conversation_history": f"The user wants to discuss: {agenda}\n\n",
+            "history_checkpoints": [],  # Round boundaries in conversation_history (prompt cache prefix)
+            "model_policy": model_policy,
+            "budget": Budget(max_cost_usd=budget) if isinstance(budget, (int, float)) else budget,
+            "temperature": run_temperature(parallel_index, total_parallel_meetings, temperature_variation),
+            "temperature_variation": temperature_variation,
+            "parallel_group": parallel_group,
+            "fused_turns": FUSED_TURNS if fused_turns is None else fused_turns,
+            "batch_mode": LLM_BATCH_MODE if batch_mode is None else batch_mode
         }
         
         # Create a unique opening for the meeting based on the agenda
@@ -84,6 +168,10 @@ class AgentOrchestrator:
             self.parallel_groups[session_id] = set()
         self.parallel_groups[session_id].add(meeting_id)
         
+        # Warm up the Tool Agent's literature search while the meeting gets going
+        with usage_scope(meeting_id=meeting_id, session_id=session_id):
+            self._schedule_literature_prefetch(meeting_id, f"The user wants to discuss: {agenda}")
+        
         logger.info("Initialized meeting " + str(meeting_id) + " (parallel index " + str(parallel_index) + ") for session " + str(session_id))
         return True
     
@@ -106,6 +194,35 @@ class AgentOrchestrator:
         # Store live_mode in meeting data to ensure it's consistent
         meeting_data["live_mode"] = live_mode
         
+        # Bill every LLM call made for this conversation (including background tasks) to the meeting
+        meeting_data["usage_scope"] = bind_usage_scope(
+            meeting_id=meeting_id,
+            session_id=meeting_data.get("session_id"),
+            user_id=getattr(getattr(interaction, "user", None), "id", None)
+        )
+        # Nobody watches a non-live run: its calls can wait for provider batches (throughput mode)
+        if not live_mode and meeting_data.get("batch_mode"):
+            bind_batch_executor(self.batch_executor)
+        # Opt-in traffic recording (LLM_RECORD_DIR): what replay_meetings.py needs to rerun the meeting
+        budget = meeting_data.get("budget")
+        traffic_log.record_meeting(meeting_id, {
+            "meeting_id": meeting_id,
+            "session_id": meeting_data.get("session_id"),
+            "agents": meeting_data.get("agents"),
+            "agenda": meeting_data.get("agenda"),
+            "round_count": meeting_data.get("round_count"),
+            "parallel_index": meeting_data.get("parallel_index"),
+            "total_parallel_meetings": meeting_data.get("total_parallel_meetings"),
+            "model_policy": meeting_data.get("model_policy"),
+            "budget": vars(budget) if budget else None,
+            "temperature_variation": meeting_data.get("temperature_variation"),
+            "parallel_group": meeting_data.get("parallel_group"),
+            "fused_turns": meeting_data.get("fused_turns"),
+            "batch_mode": meeting_data.get("batch_mode"),
+            "live_mode": live_mode,
+            "conversation_length": conversation_length,
+        })
+        
         # Log key information for debugging
         logger.info(f"Starting conversation for meeting {meeting_id} with live_mode={live_mode}")
         logger.info(f"Number of agents: {len(meeting_data.get('agents', []))}")
@@ -136,6 +253,9 @@ class AgentOrchestrator:
                 
             meeting_data["conversation_history"] = conversation_history
         
+        # The agenda opens the stable prompt prefix shared by every call in the meeting
+        self._mark_history_checkpoint(meeting_data)
+        
         # Get agents
         agents = meeting_data.get("agents", [])
         if not agents:
@@ -304,12 +424,8 @@ class AgentOrchestrator:
             # Get the agenda and any existing context
             agenda = meeting_data.get('agenda', 'No agenda specified')
             
-            # Include the agenda and supplementary information in the conversation history
-            pi_context = f"Lab Meeting Topic: {agenda}\n\n"
-            
-            # Add any existing conversation history if available
-            if conversation_history:
-                pi_context += f"Prior discussion: {conversation_history}\n\n"
+            # The topic goes after the conversation so far, keeping the prompt prefix stable
+            pi_context = f"\n\nLab Meeting Topic: {agenda}\n\n"
                 
             # Construct a special prompt for the PI to start the meeting
             pi_instructions = f"""You are the Principal Investigator leading this lab meeting.
@@ -321,21 +437,35 @@ class AgentOrchestrator:
             
             Keep your response focused and concise."""
             
-            # Combine context and instructions
-            pi_full_prompt = pi_context + pi_instructions
+            # The conversation so far as stable segments, then context and instructions
+            pi_full_prompt = self._history_segments(meeting_data, conversation_history, pi_context + pi_instructions)
             
             # Call the PI with this special opening prompt
-            pi_opening = await self.llm_client.call_agent(
+            opening_kwargs = dict(
                 agent_key="principal_investigator",
                 conversation_history=pi_full_prompt,
                 expertise=pi_agent.get("expertise"),
                 goal=pi_agent.get("goal"),
-                agent_role=None  # Let call_agent use the default role
+                agent_role=None,  # Let call_agent use the default role
+                model=self._model_for(meeting_data, "turn", pi_agent),
+                temperature=meeting_data["temperature"]
             )
+            streamed = self._should_stream(live_mode, "principal_investigator")
+            if meeting_data.get("parallel_group") and total_parallel_meetings > 1:
+                # Every run of the group gets the same opening prompt: sample it once for all of them
+                streamed = False
+                pi_opening = await self._shared_opening(meeting_data, opening_kwargs)
+            elif streamed:
+                pi_opening = await self._stream_agent_reply(
+                    meeting_data, interaction, "**[Principal Investigator (Opening)]**: ", **opening_kwargs
+                )
+            else:
+                pi_opening = await self.llm_client.call_agent(**opening_kwargs)
             
             # Update conversation history with the PI's opening
             conversation_history += f"\n\n[Principal Investigator (Opening)]: {pi_opening}"
             meeting_data["conversation_history"] = conversation_history
+            self._mark_history_checkpoint(meeting_data)
             
             # Create a transcript entry for the PI's opening
             await self.create_transcript(
@@ -345,22 +475,11 @@ class AgentOrchestrator:
                 content=pi_opening
             )
             
-            # Send the PI's opening in Discord
-            if live_mode:
-                use_simple_mode = meeting_data.get("total_parallel_meetings", 1) <= 1
-                
-                # Check if we have a thread to use (for parallel meetings only)
-                thread = meeting_data.get("thread") if not use_simple_mode else None
-                if thread and hasattr(thread, "send"):
-                    try:
-                        await thread.send(f"**[Principal Investigator (Opening)]**: {pi_opening}")
-                    except Exception as e:
-                        logger.error(f"Error sending to thread: {e}")
-                        # Fallback to regular channel
-                        await interaction.followup.send(f"**[Principal Investigator (Opening)]**: {pi_opening}", ephemeral=False)
-                else:
-                    # Use regular channel
-                    await interaction.followup.send(f"**[Principal Investigator (Opening)]**: {pi_opening}", ephemeral=False)
+            # Send the PI's opening in Discord (a streamed reply is already there)
+            if live_mode and not streamed:
+                await self._send_meeting_message(
+                    meeting_data, interaction, f"**[Principal Investigator (Opening)]**: {pi_opening}"
+                )
             
         except Exception as e:
             logger.error(f"Error getting PI opening statement: {e}")
@@ -370,6 +489,10 @@ class AgentOrchestrator:
             if not meeting_data["is_active"]:
                 logger.info(f"Meeting {meeting_id} was deactivated, stopping conversation")
                 return False
+            
+            # Out of budget: skip the remaining rounds and go straight to the summary
+            if await self._budget_exhausted(meeting_data, interaction):
+                break
                 
             # Add round indicator to conversation history
             conversation_history += f"\n\n=== ROUND {round_index} of {round_count} ==="
@@ -404,11 +527,29 @@ class AgentOrchestrator:
                 if not meeting_data["is_active"]:
                     logger.info(f"Meeting {meeting_id} was deactivated, stopping conversation")
                     return False
+                if await self._budget_exhausted(meeting_data, interaction):
+                    break
+                
+                # Inject any deferred Tool Agent results that have arrived
+                conversation_history = await self._flush_deferred_tool_turns(
+                    meeting_id, interaction, conversation_history, live_mode, wait=False
+                )
                     
                 # Ask the orchestrator who should speak next
                 try:
                     # Get available agent keys from the agents in the meeting (excluding PI and summary)
-                    agent_keys = [a["name"] for a in meeting_data["agents"] if a["name"] != "Principal Investigator"]
+                    # An agent whose deferred turn is still running can't be picked again yet
+                    pending_speakers = {turn["agent_name"] for turn in meeting_data.get("deferred_tool_turns", [])}
+                    agent_keys = [
+                        a["name"] for a in meeting_data["agents"]
+                        if a["name"] != "Principal Investigator" and a["name"] not in pending_speakers
+                    ]
+                    if not agent_keys and pending_speakers:
+                        # Nobody else can speak: wait for the deferred turn instead
+                        conversation_history = await self._flush_deferred_tool_turns(
+                            meeting_id, interaction, conversation_history, live_mode, wait=True
+                        )
+                        continue
                     agent_keys_str = ", ".join(agent_keys)
                     
                     # Build orchestrator prompt
@@ -424,35 +565,48 @@ Output your choice in a JSON format, for example:
 Only output valid JSON and nothing else.
 """
                     
-                    # Call orchestrator
-                    orch_resp = await self.llm_client.generate_response(
-                        provider=LLMProvider.OPENAI,
-                        messages=[
-                            LLMMessage(role="system", content=orchestrator_prompt),
-                            LLMMessage(role="user", content=conversation_history)
-                        ],
-                        temperature=1,
-                        max_tokens=300
-                    )
-                    
-                    orch_json_str = orch_resp.content
-                    
-                    # Parse orchestrator response
+                    # Call orchestrator: schema-validated JSON whose "agent" must be one of agent_keys
+                    selection_model = self._model_for(meeting_data, "selection")
+                    history_segments = self._history_segments(meeting_data, conversation_history)
+
+                    async def select_alone():
+                        return await self.llm_client.generate_structured(
+                            provider=LLMProvider.OPENAI,
+                            messages=[LLMMessage(role="system", content=orchestrator_prompt)] + conversation_messages(
+                                history_segments
+                            ),
+                            schema=speaker_choice_schema(agent_keys),
+                            model=selection_model,
+                            temperature=1,
+                            reply_kind="selection"
+                        )
+
+                    # In fused mode the same call also drafts the chosen agent's reply
+                    fused = None
+                    if meeting_data.get("fused_turns"):
+                        fused = await self._fused_turn(meeting_data, agent_keys, history_segments)
+
                     try:
-                        orch_data = json.loads(orch_json_str)
-                        chosen_agent = orch_data.get("agent")
-                        rationale = orch_data.get("rationale", "No rationale provided")
-                        
-                        if not chosen_agent:
-                            raise ValueError("No agent specified in orchestrator response")
-                            
-                    except (json.JSONDecodeError, ValidationError) as e:
-                        logger.error(f"Error parsing orchestrator response: {e}")
-                        # Default to a random agent if orchestrator fails
-                        import random
-                        chosen_agent = random.choice(agent_keys)
+                        if fused is not None:
+                            orch_choice = fused
+                        elif self.selection_batcher is not None:
+                            orch_choice = await self.selection_batcher.select(
+                                meeting_id, selection_model, agent_keys, history_segments, select_alone
+                            )
+                        else:
+                            orch_choice = await select_alone()
+                        chosen_agent = orch_choice.agent
+                        rationale = orch_choice.rationale
+                    except StructuredOutputError as e:
+                        # Still invalid after the repair attempt: take the next eligible agent in order
+                        logger.error(f"Orchestrator returned no valid selection, defaulting to {agent_keys[0]}: {e}")
+                        chosen_agent = agent_keys[0]
                         rationale = "Orchestrator failed to select an agent"
                         
+                    if chosen_agent in pending_speakers and agent_keys:
+                        logger.info(f"{chosen_agent} still has a turn in progress, picking {agent_keys[0]} instead")
+                        chosen_agent = agent_keys[0]
+                    
                     # Find the agent in our list
                     agent = next((a for a in meeting_data["agents"] if a["name"] == chosen_agent), None)
                     if not agent:
@@ -464,37 +618,54 @@ Only output valid JSON and nothing else.
                     # Determine the appropriate agent_key based on the agent's role
                     agent_role = agent["role"] if agent else "Unknown"
                     
-                    # Map agent roles to valid agent_keys that exist in the AGENTS dictionary
-                    if "Scientist" in agent_role or "specialist" in agent_role.lower() or "expert" in agent_role.lower():
-                        # Use the generic scientist template for all scientist types
-                        agent_key = "scientist"
-                    elif "Critic" in agent_role or "reviewer" in agent_role.lower():
-                        agent_key = "scientific_critic"
-                    elif "Lead" in agent_role or "PI" in agent_role or "Principal" in agent_role:
-                        agent_key = "principal_investigator"
-                    elif "Tool" in agent_role:
-                        agent_key = "tool_agent"
-                    else:
-                        # Default to scientist for unknown roles
-                        agent_key = "scientist"
+                    agent_key = agent_key_for_role(agent_role)
                     
                     # Log the agent mapping decision
                     logger.info(f"Mapping agent '{chosen_agent}' with role '{agent_role}' to agent_key '{agent_key}'")
                     
+                    if agent_key == "tool_agent" and TOOL_AGENT_NONBLOCKING:
+                        # Launch the literature search in the background and move on to the next speaker
+                        self._start_deferred_tool_turn(meeting_id, agent, chosen_agent, conversation_history, round_index)
+                        calls_this_round += 1
+                        continue
+                    
+                    # A reply drafted by the fused call (the Tool Agent still searches)
+                    drafted_reply = ""
+                    if fused is not None and fused.agent == chosen_agent and agent_key != "tool_agent":
+                        drafted_reply = fused.reply.strip()
+                    
+                    streamed = self._should_stream(live_mode, agent_key) and not drafted_reply
                     try:
+                        # The Tool Agent answers from prefetched search results when they are warm
+                        literature_context = None
+                        if agent_key == "tool_agent":
+                            literature_context = await self._get_literature_context(meeting_id)
+                        
                         # Call the chosen agent
-                        agent_reply = await self.llm_client.call_agent(
+                        agent_kwargs = dict(
                             agent_key=agent_key,
-                            conversation_history=conversation_history,
+                            conversation_history=self._history_segments(meeting_data, conversation_history),
                             expertise=agent.get("expertise") if agent else None,
                             goal=agent.get("goal") if agent else None,
                             agent_role=None,  # Let call_agent use the appropriate default role
-                            agent_name=chosen_agent
+                            agent_name=chosen_agent,
+                            model=self._model_for(meeting_data, "turn", agent),
+                            literature_context=literature_context,
+                            temperature=meeting_data["temperature"]
                         )
+                        if drafted_reply:
+                            agent_reply = drafted_reply
+                        elif streamed:
+                            agent_reply = await self._stream_agent_reply(
+                                meeting_data, interaction, f"**[{chosen_agent}]**: ", **agent_kwargs
+                            )
+                        else:
+                            agent_reply = await self.llm_client.call_agent(**agent_kwargs)
                     except Exception as e:
                         logger.error(f"Error calling agent {chosen_agent} with agent_key {agent_key}: {e}")
                         # Provide a fallback response rather than failing completely
                         agent_reply = f"[System: Unable to get a response from {chosen_agent} due to an error. The conversation will continue with other agents.]"
+                        streamed = False
                     
                     # Update conversation history
                     conversation_history += f"\n[{chosen_agent}]: {agent_reply}"
@@ -508,24 +679,11 @@ Only output valid JSON and nothing else.
                         content=agent_reply
                     )
                     
-                    # Send a new message for the agent's response instead of editing
-                    if live_mode:
+                    # Send a new message for the agent's response (a streamed reply is already there)
+                    if live_mode and not streamed:
                         try:
                             logger.info(f"Sending message from {chosen_agent} to Discord (live_mode={live_mode})")
-                            use_simple_mode = meeting_data.get("total_parallel_meetings", 1) <= 1
-                            
-                            # Check if we have a thread to use (for parallel meetings only)
-                            thread = meeting_data.get("thread") if not use_simple_mode else None
-                            if thread and hasattr(thread, "send"):
-                                try:
-                                    await thread.send(f"**[{chosen_agent}]**: {agent_reply}")
-                                except Exception as e:
-                                    logger.error(f"Error sending to thread: {e}")
-                                    # Fallback to regular channel
-                                    await interaction.followup.send(f"**[{chosen_agent}]**: {agent_reply}", ephemeral=False)
-                            else:
-                                # Use regular channel
-                                await interaction.followup.send(f"**[{chosen_agent}]**: {agent_reply}", ephemeral=False)
+                            await self._send_meeting_message(meeting_data, interaction, f"**[{chosen_agent}]**: {agent_reply}")
                         except Exception as discord_error:
                             logger.error(f"Error sending message to Discord: {discord_error}")
                         
@@ -535,21 +693,49 @@ Only output valid JSON and nothing else.
                     logger.error(f"Error in conversation round {round_index}, call {calls_this_round}: {e}")
                     calls_this_round += 1  # Still increment to prevent infinite loops
                     
+            # Deferred Tool Agent results must land before the PI synthesizes the round
+            conversation_history = await self._flush_deferred_tool_turns(
+                meeting_id, interaction, conversation_history, live_mode, wait=True
+            )
+            if await self._budget_exhausted(meeting_data, interaction):
+                break
+                    
             # End of round: PI synthesizes what's been said
             try:
-                pi_synthesis_prompt = conversation_history + "\nNow please synthesize this round's points concisely, and ask a couple focused follow-up questions for the next round."
+                pi_synthesis_prompt = self._history_segments(
+                    meeting_data, conversation_history,
+                    "\nNow please synthesize this round's points concisely, and ask a couple focused follow-up questions for the next round."
+                )
                 
-                pi_synthesis = await self.llm_client.call_agent(
+                synthesis_kwargs = dict(
                     agent_key="principal_investigator",
                     conversation_history=pi_synthesis_prompt,
                     expertise=pi_agent.get("expertise"),
                     goal=pi_agent.get("goal"),
-                    agent_role=None  # Let call_agent use the default role
+                    agent_role=None,  # Let call_agent use the default role
+                    model=self._model_for(meeting_data, "synthesis", pi_agent),
+                    temperature=meeting_data["temperature"]
                 )
+                streamed = self._should_stream(live_mode, "principal_investigator")
+                if streamed:
+                    pi_synthesis = await self._stream_agent_reply(
+                        meeting_data, interaction, "**[Principal Investigator (synthesis)]**: ", **synthesis_kwargs
+                    )
+                else:
+                    pi_synthesis = await self.llm_client.call_agent(**synthesis_kwargs)
                 
                 # Update conversation history
                 conversation_history += f"\n\n[Principal Investigator (round synthesis)]: {pi_synthesis}"
                 meeting_data["conversation_history"] = conversation_history
+                # The completed round joins the stable prompt prefix
+                self._mark_history_checkpoint(meeting_data)
+                
+                # Refresh the literature prefetch with the direction the discussion is taking
+                if round_index < round_count:
+                    self._schedule_literature_prefetch(
+                        meeting_id,
+                        f"The user wants to discuss: {agenda}\n\n[Principal Investigator (round synthesis)]: {pi_synthesis}"
+                    )
                 
                 # Create a transcript entry
                 await self.create_transcript(
@@ -559,24 +745,13 @@ Only output valid JSON and nothing else.
                     content=pi_synthesis
                 )
                 
-                # Send a new message for the PI's synthesis
-                if live_mode:
+                # Send a new message for the PI's synthesis (a streamed reply is already there)
+                if live_mode and not streamed:
                     try:
                         logger.info("Sending PI synthesis to Discord")
-                        use_simple_mode = meeting_data.get("total_parallel_meetings", 1) <= 1
-                        
-                        # Check if we have a thread to use (for parallel meetings only)
-                        thread = meeting_data.get("thread") if not use_simple_mode else None
-                        if thread and hasattr(thread, "send"):
-                            try:
-                                await thread.send(f"**[Principal Investigator (synthesis)]**: {pi_synthesis}")
-                            except Exception as e:
-                                logger.error(f"Error sending to thread: {e}")
-                                # Fallback to regular channel
-                                await interaction.followup.send(f"**[Principal Investigator (synthesis)]**: {pi_synthesis}", ephemeral=False)
-                        else:
-                            # Use regular channel
-                            await interaction.followup.send(f"**[Principal Investigator (synthesis)]**: {pi_synthesis}", ephemeral=False)
+                        await self._send_meeting_message(
+                            meeting_data, interaction, f"**[Principal Investigator (synthesis)]**: {pi_synthesis}"
+                        )
                     except Exception as discord_error:
                         logger.error(f"Error sending PI synthesis to Discord: {discord_error}")
                     
@@ -585,10 +760,20 @@ Only output valid JSON and nothing else.
                 
         # Final summary after all rounds
         try:
-            final_summary = await self.llm_client.call_agent(
-                agent_key="summary_agent",
-                conversation_history=conversation_history
-            )
+            streamed = self._should_stream(live_mode, "summary_agent")
+            if streamed:
+                final_summary = await self._stream_agent_reply(
+                    meeting_data, interaction, "**=== FINAL SUMMARY ===**\n",
+                    agent_key="summary_agent",
+                    conversation_history=self._history_segments(meeting_data, conversation_history),
+                    model=self._model_for(meeting_data, "summary")
+                )
+            else:
+                final_summary = await self.llm_client.call_agent(
+                    agent_key="summary_agent",
+                    conversation_history=self._history_segments(meeting_data, conversation_history),
+                    model=self._model_for(meeting_data, "summary")
+                )
             
             # Update conversation history
             conversation_history += f"\n\n=== FINAL SUMMARY ===\n{final_summary}"
@@ -603,24 +788,13 @@ Only output valid JSON and nothing else.
                 content=final_summary
             )
             
-            # Send a new message for the final summary
-            if live_mode:
+            # Send a new message for the final summary (a streamed reply is already there)
+            if live_mode and not streamed:
                 try:
                     logger.info("Sending final summary to Discord")
-                    use_simple_mode = meeting_data.get("total_parallel_meetings", 1) <= 1
-                    
-                    # Check if we have a thread to use (for parallel meetings only)
-                    thread = meeting_data.get("thread") if not use_simple_mode else None
-                    if thread and hasattr(thread, "send"):
-                        try:
-                            await thread.send(f"**=== FINAL SUMMARY ===**\n{final_summary}")
-                        except Exception as e:
-                            logger.error(f"Error sending to thread: {e}")
-                            # Fallback to regular channel
-                            await interaction.followup.send(f"**=== FINAL SUMMARY ===**\n{final_summary}", ephemeral=False)
-                    else:
-                        # Use regular channel
-                        await interaction.followup.send(f"**=== FINAL SUMMARY ===**\n{final_summary}", ephemeral=False)
+                    await self._send_meeting_message(
+                        meeting_data, interaction, f"**=== FINAL SUMMARY ===**\n{final_summary}"
+                    )
                 except Exception as discord_error:
                     logger.error(f"Error sending final summary to Discord: {discord_error}")
                 
@@ -629,6 +803,7 @@ Only output valid JSON and nothing else.
             
         # Mark meeting as completed
         meeting_data["is_active"] = False
+        await self._save_usage(meeting_id)
         
         return True
         
@@ -645,6 +820,16 @@ Only output valid JSON and nothing else.
         # Mark the meeting as inactive 
         meeting_data["is_active"] = False
         logger.info(f"Marked meeting {meeting_id} as inactive")
+        
+        # Stop any literature search still running for this meeting
+        prefetch_task = meeting_data.get("literature_prefetch_task")
+        if prefetch_task and not prefetch_task.done():
+            prefetch_task.cancel()
+        for turn in meeting_data.get("deferred_tool_turns", []):
+            turn["task"].cancel()
+        
+        # Store what the meeting used so far with its record
+        await self._save_usage(meeting_id)
             
         # If meeting is part of a parallel group, check if it's the last one to finish
         # and generate a combined summary if it is
@@ -734,6 +919,333 @@ Only output valid JSON and nothing else.
             
         return True
         
+    def _has_tool_agent(self, agents) -> bool:
+        """Whether any agent in the meeting is a Tool Agent."""
+        return any("Tool" in (agent.get("role") or "") for agent in agents)
+    
+    def _schedule_literature_prefetch(self, meeting_id, query_text):
+        """Start a background literature search for the meeting's Tool Agent.
+        
+        Only one prefetch runs per meeting at a time; a refresh requested while
+        one is still in flight is skipped.
+        """
+        meeting_data = self.active_meetings.get(meeting_id)
+        if not LITERATURE_PREFETCH or not meeting_data or not self._has_tool_agent(meeting_data.get("agents", [])):
+            return
+        
+        pending = meeting_data.get("literature_prefetch_task")
+        if pending and not pending.done():
+            logger.debug(f"Literature prefetch already running for meeting {meeting_id}")
+            return
+        
+        meeting_data["literature_prefetch_task"] = asyncio.create_task(
+            self._prefetch_literature(meeting_id, query_text)
+        )
+    
+    async def _prefetch_literature(self, meeting_id, query_text):
+        """Run the Tool Agent's search pipeline in a worker thread and keep the results."""
+        try:
+            from tool_agent_file import prefetch_literature
+            literature_context = await asyncio.to_thread(prefetch_literature, query_text)
+        except Exception as e:
+            logger.error(f"Error prefetching literature for meeting {meeting_id}: {e}")
+            return None
+        
+        meeting_data = self.active_meetings.get(meeting_id)
+        if meeting_data and literature_context:
+            meeting_data["literature_context"] = literature_context
+            logger.info(f"Prefetched {len(literature_context.docs)} abstracts for meeting {meeting_id}")
+        return literature_context
+    
+    async def _get_literature_context(self, meeting_id):
+        """Warm search results for the Tool Agent, or None to search inline.
+        
+        If no results are cached yet but a prefetch is in flight, wait for it
+        rather than starting the same search again from scratch.
+        """
+        meeting_data = self.active_meetings.get(meeting_id)
+        if not meeting_data:
+            return None
+        
+        literature_context = meeting_data.get("literature_context")
+        pending = meeting_data.get("literature_prefetch_task")
+        if literature_context is None and pending and not pending.done():
+            try:
+                await asyncio.shield(pending)
+            except Exception as e:
+                logger.error(f"Literature prefetch failed for meeting {meeting_id}: {e}")
+            literature_context = meeting_data.get("literature_context")
+        return literature_context
+    
+    async def _send_meeting_message(self, meeting_data, interaction, content):
+        """Send a message to the meeting's thread (parallel runs) or the interaction channel.
+        
+        Returns:
+            The sent message, so callers can edit it later
+        """
+        use_simple_mode = meeting_data.get("total_parallel_meetings", 1) <= 1
+        
+        # Check if we have a thread to use (for parallel meetings only)
+        thread = meeting_data.get("thread") if not use_simple_mode else None
+        if thread and hasattr(thread, "send"):
+            try:
+                return await thread.send(content)
+            except Exception as e:
+                logger.error(f"Error sending to thread: {e}")
+                # Fallback to regular channel
+                return await interaction.followup.send(content, ephemeral=False)
+        
+        # Use regular channel
+        return await interaction.followup.send(content, ephemeral=False)
+    
+    def _mark_history_checkpoint(self, meeting_data):
+        """Record the end of the transcript as a boundary of the stable prompt prefix."""
+        checkpoints = meeting_data.setdefault("history_checkpoints", [])
+        offset = len(meeting_data.get("conversation_history", ""))
+        if not checkpoints or checkpoints[-1] < offset:
+            checkpoints.append(offset)
+    
+    def _history_segments(self, meeting_data, conversation_history, suffix=""):
+        """The transcript cut at round boundaries (stable) plus the current round and `suffix` (volatile)."""
+        return split_history(conversation_history, meeting_data.get("history_checkpoints", []), suffix)
+    
+    def _model_for(self, meeting_data, call_site, agent=None):
+        """The model for a call site in this meeting (see model_routing.py).
+        
+        Once the meeting nears its budget, every call is downgraded to the fast tier.
+        """
+        tier = FAST if self._budget_status(meeting_data) != BUDGET_OK else None
+        return model_policy.with_overrides(meeting_data.get("model_policy")).model_for(call_site, agent, tier=tier)
+    
+    async def _fused_turn(self, meeting_data, agent_keys, history_segments):
+        """The next speaker and their drafted reply from one select-and-speak call.
+        
+        Only used when every candidate replies with the same turn model.
+        
+        Returns:
+            A FusedTurnResponse (its reply is not used when the Tool Agent is chosen), or None to
+            run the selection call and the agent's call instead
+        """
+        candidates = [a for a in meeting_data["agents"] if a["name"] in agent_keys]
+        models = {self._model_for(meeting_data, "turn", agent) for agent in candidates}
+        if len(models) != 1:
+            return None
+        personas, tool_agents = {}, []
+        for agent in candidates:
+            agent_key = agent_key_for_role(agent.get("role", "Unknown"))
+            if agent_key == "tool_agent":
+                tool_agents.append(agent["name"])
+            personas[agent["name"]] = self.llm_client.agent_system_prompt(
+                agent_key, agent.get("expertise"), agent.get("goal"), None, agent["name"]
+            )
+        return await select_and_speak(
+            self.llm_client, personas, history_segments, models.pop(),
+            temperature=meeting_data["temperature"], tool_agents=tool_agents,
+        )
+    
+    def _budget_status(self, meeting_data):
+        """BUDGET_OK, BUDGET_DOWNGRADE or BUDGET_EXHAUSTED for this meeting, its session and user."""
+        scope = meeting_data.get("usage_scope")
+        if scope is None:
+            return BUDGET_OK
+        return usage_ledger.budget_status(scope, meeting_data.get("budget"))
+    
+    async def _budget_exhausted(self, meeting_data, interaction):
+        """Whether the meeting's budget is spent; announces it once in live mode."""
+        if self._budget_status(meeting_data) != BUDGET_EXHAUSTED:
+            return False
+        if not meeting_data.get("budget_exhausted"):
+            meeting_data["budget_exhausted"] = True
+            totals = usage_ledger.totals_for("meeting", meeting_data["id"])
+            logger.warning(
+                f"Budget exhausted for meeting {meeting_data['id']} "
+                f"({totals.total_tokens} tokens, ${totals.cost_usd:.4f}); ending the discussion"
+            )
+            if meeting_data.get("live_mode"):
+                try:
+                    await self._send_meeting_message(
+                        meeting_data, interaction, "⚠️ **Budget reached. Skipping to the final summary.**"
+                    )
+                except Exception as e:
+                    logger.error(f"Error announcing exhausted budget: {e}")
+        return True
+    
+    async def _save_usage(self, meeting_id):
+        """Store the meeting's token/cost totals with its record."""
+        from db_client import db_client
+        
+        totals = usage_ledger.totals_for("meeting", meeting_id)
+        logger.info(f"Meeting {meeting_id} used {totals.total_tokens} tokens (${totals.cost_usd:.4f}) in {totals.calls} calls")
+        logger.info(f"API key usage: {credential_pools.report()}")
+        try:
+            result = await db_client.update_meeting_usage(meeting_id, totals.to_record())
+            if not result.get("isSuccess"):
+                logger.error(f"Failed to save usage for meeting {meeting_id}: {result.get('message')}")
+        except Exception as e:
+            logger.error(f"Error saving usage for meeting {meeting_id}: {e}")
+    
+    async def _shared_opening(self, meeting_data, opening_kwargs):
+        """This run's PI opening, from one set of samples taken for the whole parallel group.
+        
+        The first run to get here starts sample_agent for every run of the group that
+        is still active, at each run's temperature; the others take their sample from
+        it, whether they arrive while it runs or after (it is handed to their meeting
+        data). A run whose prompt or model differ (e.g. a model downgraded by the
+        budget) makes its own single call. The samples are billed to the group and
+        then split evenly between the meetings of its runs.
+        """
+        group = meeting_data["parallel_group"]
+        prompt_kwargs = {k: v for k, v in opening_kwargs.items() if k != "temperature"}
+        key = (prompt_kwargs["model"], hash(join_conversation(prompt_kwargs["conversation_history"])))
+        entry = self.shared_openings.get(group)
+        if entry is None and "shared_opening" not in meeting_data:
+            runs = [m for m in self.active_meetings.values() if m.get("parallel_group") == group and m is not meeting_data]
+            runs.insert(0, meeting_data)
+            temperatures = [opening_kwargs["temperature"]] + [run["temperature"] for run in runs[1:]]
+            logger.info(f"Sampling {len(runs)} PI openings for parallel group {group} at {temperatures}")
+            opening_scope = f"{group}:opening"
+            with usage_scope(meeting_id=opening_scope):
+                task = asyncio.create_task(self.llm_client.sample_agent(temperatures=temperatures, **prompt_kwargs))
+            entry = {"key": key, "task": task, "runs": [run["id"] for run in runs]}
+            self.shared_openings[group] = entry
+            
+            def hand_out(task):
+                # Runs that get here later take their sample from their meeting data (or make their own call)
+                self.shared_openings.pop(group, None)
+                usage_ledger.split("meeting", opening_scope, [run["id"] for run in runs])
+                failed = task.cancelled() or task.exception() is not None
+                for index, run in enumerate(runs):
+                    run["shared_opening"] = None if failed else (key, task.result()[index])
+            task.add_done_callback(hand_out)
+        
+        if entry is None or entry["key"] != key or meeting_data["id"] not in entry["runs"]:
+            shared = meeting_data.pop("shared_opening", None)
+            if shared and shared[0] == key:
+                return shared[1]
+            return await self.llm_client.call_agent(**opening_kwargs)
+        try:
+            samples = await asyncio.shield(entry["task"])
+            meeting_data.pop("shared_opening", None)
+            return samples[entry["runs"].index(meeting_data["id"])]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Shared PI opening failed, generating this run's own: {e}")
+            return await self.llm_client.call_agent(**opening_kwargs)
+    
+    def _should_stream(self, live_mode, agent_key):
+        """Whether a reply should be streamed into Discord as it is generated.
+        
+        Tool Agent answers come from retrieval rather than token generation, so
+        they are always posted whole.
+        """
+        return live_mode and STREAM_REPLIES and agent_key != "tool_agent"
+    
+    async def _stream_agent_reply(self, meeting_data, interaction, prefix, **agent_kwargs):
+        """Stream an agent's reply into a Discord message that is edited as tokens arrive.
+        
+        Args:
+            meeting_data: The meeting's state (decides thread vs. channel)
+            interaction: The Discord interaction
+            prefix: Text shown before the reply, e.g. "**[Biologist]**: "
+            **agent_kwargs: Arguments for llm_client.stream_agent
+            
+        Returns:
+            The complete reply text
+        """
+        renderer = StreamingMessageRenderer(
+            lambda content: self._send_meeting_message(meeting_data, interaction, content),
+            prefix=prefix,
+        )
+        try:
+            await renderer.start()
+            async for delta in self.llm_client.stream_agent(**agent_kwargs):
+                renderer.feed(delta)
+        except Exception:
+            # Remove the partial reply; the caller decides what to post instead
+            await renderer.discard()
+            raise
+        
+        reply = renderer.text.strip()
+        try:
+            await renderer.finish(reply)
+        except Exception as discord_error:
+            logger.error(f"Error finishing streamed message: {discord_error}")
+        return reply
+    
+    def _start_deferred_tool_turn(self, meeting_id, agent, agent_name, conversation_history, round_number):
+        """Run a Tool Agent turn as a background task; its result is injected later."""
+        meeting_data = self.active_meetings[meeting_id]
+        
+        async def run_tool_turn():
+            literature_context = await self._get_literature_context(meeting_id)
+            return await self.llm_client.call_agent(
+                agent_key="tool_agent",
+                conversation_history=conversation_history,
+                expertise=agent.get("expertise") if agent else None,
+                goal=agent.get("goal") if agent else None,
+                agent_role=None,
+                agent_name=agent_name,
+                literature_context=literature_context
+            )
+        
+        meeting_data.setdefault("deferred_tool_turns", []).append({
+            "task": asyncio.create_task(run_tool_turn()),
+            "agent_name": agent_name,
+            "round_number": round_number,
+        })
+        logger.info(f"Started deferred turn for {agent_name} in meeting {meeting_id}, round {round_number}")
+    
+    async def _flush_deferred_tool_turns(self, meeting_id, interaction, conversation_history, live_mode, wait=False):
+        """Inject finished deferred Tool Agent turns into the conversation.
+        
+        Args:
+            meeting_id: ID of the meeting
+            interaction: Discord interaction object
+            conversation_history: The conversation so far
+            live_mode: Whether to post the results to Discord
+            wait: Wait for turns that are still running (used before the PI synthesis)
+            
+        Returns:
+            The updated conversation history
+        """
+        meeting_data = self.active_meetings.get(meeting_id)
+        if not meeting_data or not meeting_data.get("deferred_tool_turns"):
+            return conversation_history
+        
+        turns = meeting_data["deferred_tool_turns"]
+        if wait:
+            await asyncio.wait([turn["task"] for turn in turns])
+        
+        finished = [turn for turn in turns if turn["task"].done()]
+        meeting_data["deferred_tool_turns"] = [turn for turn in turns if not turn["task"].done()]
+        
+        for turn in finished:
+            agent_name = turn["agent_name"]
+            try:
+                agent_reply = turn["task"].result()
+            except Exception as e:
+                logger.error(f"Error in deferred turn for {agent_name}: {e}")
+                agent_reply = f"[System: Unable to get a response from {agent_name} due to an error. The conversation will continue with other agents.]"
+            
+            conversation_history += f"\n[{agent_name}]: {agent_reply}"
+            meeting_data["conversation_history"] = conversation_history
+            
+            await self.create_transcript(
+                meeting_id=meeting_id,
+                agent_name=agent_name,
+                round_number=turn["round_number"],
+                content=agent_reply
+            )
+            
+            if live_mode:
+                try:
+                    await self._send_meeting_message(meeting_data, interaction, f"**[{agent_name}]**: {agent_reply}")
+                except Exception as discord_error:
+                    logger.error(f"Error sending deferred reply to Discord: {discord_error}")
+        
+        return conversation_history
+    
     async def run_conversation(self, meeting_id):
         """
         DEPRECATED: This method is deprecated. Use start_conversation() instead.
@@ -950,8 +1462,9 @@ Only output valid JSON and nothing else.
             response = await self.llm_client.generate_response(
                 provider=LLMProvider.OPENAI,
                 messages=messages,
+                model=model_policy.model_for("summary"),
                 temperature=0.7,
-                max_tokens=2000  # Ensure we get a substantial response
+                reply_kind="combined_summary"
             )
             
             logger.info(f"Generated combined summary of length {len(response.content)}")
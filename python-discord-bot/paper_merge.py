@@ -0,0 +1,221 @@
+# paper_merge.py
+
+"""
+Cross-source deduplication and merging of paper search results.
+
+PubMed, ArXiv and Semantic Scholar frequently return the same paper with
+slightly different metadata. The helpers here collapse those duplicates into
+a single record (keeping the richest metadata) so each paper is embedded and
+placed in the prompt only once.
+"""
+
+import re
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the DOIs that arXiv mints for its own preprints (10.48550/arXiv.<id>)
+ARXIV_DOI_PREFIX = "10.48550/arxiv."
+
+# New-style (2101.00001) and old-style (hep-th/9901001) arXiv identifiers
+ARXIV_ID_PATTERN = re.compile(
+    r"(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?",
+    re.IGNORECASE
+)
+
+# Fields that are merged field-by-field across duplicates
+MERGE_FIELDS = ["title", "authors", "date", "abstract", "doi", "journal"]
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    """Lowercase a DOI and strip resolver prefixes such as https://doi.org/."""
+    if not doi or not isinstance(doi, str):
+        return None
+    doi = doi.strip().lower()
+    doi = re.sub(r"^(https?://)?(dx\.)?doi\.org/", "", doi)
+    doi = re.sub(r"^doi:\s*", "", doi)
+    return doi or None
+
+
+def extract_arxiv_id(paper: Dict) -> Optional[str]:
+    """Find the arXiv identifier of a paper, without version suffix, if it has one."""
+    external_ids = paper.get("externalIds") or {}
+    candidates = [
+        external_ids.get("ArXiv"),
+        paper.get("arxiv_id"),
+        paper.get("entry_id"),
+        paper.get("url"),
+    ]
+
+    doi = normalize_doi(paper.get("doi"))
+    if doi and doi.startswith(ARXIV_DOI_PREFIX):
+        candidates.append(doi[len(ARXIV_DOI_PREFIX):])
+
+    for candidate in candidates:
+        if not candidate or not isinstance(candidate, str):
+            continue
+        match = ARXIV_ID_PATTERN.search(candidate)
+        if match:
+            return match.group(1).lower()
+    return None
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Reduce a title to lowercase alphanumeric words for fuzzy matching."""
+    if not title or not isinstance(title, str):
+        return ""
+    title = unicodedata.normalize("NFKD", title)
+    title = title.encode("ascii", "ignore").decode("ascii").lower()
+    title = re.sub(r"[^a-z0-9]+", " ", title)
+    return " ".join(title.split())
+
+
+def title_hash(title: Optional[str]) -> Optional[str]:
+    """Stable hash of the normalized title, or None for empty titles."""
+    normalized = normalize_title(title)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def paper_keys(paper: Dict) -> List[str]:
+    """All identity keys for a paper (DOI, arXiv ID and title hash)."""
+    keys = []
+
+    doi = normalize_doi(paper.get("doi"))
+    if not doi:
+        doi = normalize_doi((paper.get("externalIds") or {}).get("DOI"))
+    if doi and not doi.startswith(ARXIV_DOI_PREFIX):
+        keys.append(f"doi:{doi}")
+
+    arxiv_id = extract_arxiv_id(paper)
+    if arxiv_id:
+        keys.append(f"arxiv:{arxiv_id}")
+
+    t_hash = title_hash(paper.get("title"))
+    if t_hash:
+        keys.append(f"title:{t_hash}")
+
+    return keys
+
+
+def _field_richness(value) -> int:
+    """Rough measure of how much information a metadata value carries."""
+    if value is None:
+        return 0
+    if isinstance(value, float) and value != value:  # NaN from pandas records
+        return 0
+    if isinstance(value, (list, tuple, set)):
+        return len(value)
+    return len(str(value).strip())
+
+
+def _is_arxiv_doi(doi) -> bool:
+    """Whether a DOI is one of arXiv's own (10.48550/arXiv.*) DOIs."""
+    normalized = normalize_doi(doi)
+    return bool(normalized and normalized.startswith(ARXIV_DOI_PREFIX))
+
+
+def _merge_into(merged: Dict, paper: Dict, source: str) -> None:
+    """Merge one paper into an existing merged record, keeping the richest fields."""
+    for field in MERGE_FIELDS:
+        if field == "doi" and merged.get("doi") and paper.get("doi"):
+            # A publisher DOI is more useful than arXiv's own DOI, whatever its length
+            if _is_arxiv_doi(merged["doi"]) and not _is_arxiv_doi(paper["doi"]):
+                merged["doi"] = paper["doi"]
+            continue
+        if _field_richness(paper.get(field)) > _field_richness(merged.get(field)):
+            merged[field] = paper.get(field)
+
+    external_ids = dict(merged.get("externalIds") or {})
+    for key, value in (paper.get("externalIds") or {}).items():
+        if value and not external_ids.get(key):
+            external_ids[key] = value
+    if external_ids:
+        merged["externalIds"] = external_ids
+
+    if external_ids.get("DOI") and (not merged.get("doi") or _is_arxiv_doi(merged["doi"])):
+        merged["doi"] = external_ids["DOI"]
+
+    if source not in merged["sources"]:
+        merged["sources"].append(source)
+
+
+def merge_papers(papers_by_source: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Deduplicate papers returned by several sources.
+
+    Two records are considered the same paper when they share a DOI, an arXiv
+    ID or a normalized-title hash. Matching is transitive, so a PubMed record
+    (DOI + title) and an arXiv record (arXiv ID + title) collapse together with
+    a Semantic Scholar record that carries both IDs.
+
+    Args:
+        papers_by_source: Mapping of source name to the papers it returned.
+
+    Returns:
+        Merged papers in first-seen order. Each carries a `sources` list naming
+        every source that returned it.
+    """
+    merged_papers: List[Dict] = []
+    key_to_index: Dict[str, int] = {}
+
+    for source, papers in papers_by_source.items():
+        for paper in papers or []:
+            if not isinstance(paper, dict):
+                continue
+            keys = paper_keys(paper)
+            matches = sorted({key_to_index[k] for k in keys if k in key_to_index})
+
+            if not matches:
+                index = len(merged_papers)
+                merged_papers.append({"sources": []})
+            else:
+                # Keep the earliest record and fold any other matches into it
+                index = matches[0]
+                for other in matches[1:]:
+                    absorbed = merged_papers[other]
+                    if absorbed is None:
+                        continue
+                    for absorbed_source in absorbed["sources"]:
+                        _merge_into(merged_papers[index], absorbed, absorbed_source)
+                    merged_papers[other] = None
+                    for k, i in key_to_index.items():
+                        if i == other:
+                            key_to_index[k] = index
+
+            _merge_into(merged_papers[index], paper, source)
+            for k in paper_keys(merged_papers[index]) + keys:
+                key_to_index[k] = index
+
+    result = [paper for paper in merged_papers if paper is not None]
+    total = sum(len(papers or []) for papers in papers_by_source.values())
+    logger.info(f"Merged {total} papers from {len(papers_by_source)} source(s) into {len(result)} unique papers")
+    return result
+
+
+def rank_papers(papers: List[Dict], keywords: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Rank merged papers by cross-source agreement and keyword coverage.
+
+    Papers returned by more sources come first, then papers whose title and
+    abstract mention more of the keywords, then papers with an abstract.
+    The sort is stable so ties keep the original source order.
+    """
+    keyword_terms = [normalize_title(k) for k in (keywords or []) if normalize_title(k)]
+
+    def score(paper: Dict):
+        text = f" {normalize_title(paper.get('title'))} {normalize_title(paper.get('abstract'))} "
+        keyword_hits = sum(1 for term in keyword_terms if f" {term} " in text)
+        has_abstract = 1 if _field_richness(paper.get("abstract")) else 0
+        return (len(paper.get("sources", [])), keyword_hits, has_abstract)
+
+    return sorted(papers, key=score, reverse=True)
+
+
+def merge_and_rank(papers_by_source: Dict[str, List[Dict]], keywords: Optional[List[str]] = None) -> List[Dict]:
+    """Convenience wrapper: deduplicate across sources, then rank the merged set."""
+    return rank_papers(merge_papers(papers_by_source), keywords)
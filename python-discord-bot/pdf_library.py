@@ -0,0 +1,355 @@
+# pdf_library.py
+
+"""
+Local full-text library for the Tool Agent.
+
+A folder of lab-internal papers (PDF, or plain text/markdown) is extracted,
+split into overlapping chunks with LangChain's CharacterTextSplitter, and
+embedded into an on-disk chunk index:
+
+    <index dir>/chunks.jsonl       one chunk per line (row order = vector order)
+    <index dir>/chunks.vec.*       append-only float16 vectors (see corpus_index.VectorStore)
+    <index dir>/manifest.json      per file: content hash, size, mtime and chunk rows
+
+Ingest is incremental. Files whose size and mtime are unchanged are skipped
+without reading them, and files whose content hash is unchanged are never
+re-embedded. When a file changes or disappears, its old rows become
+tombstones: they stay on disk but are masked out of searches. The index is
+compacted once dead rows outnumber live ones.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from corpus_index import VectorStore
+from embedding_backends import EMBEDDING_BACKEND, get_embedding_backend
+
+logger = logging.getLogger(__name__)
+
+PDF_LIBRARY_DIR = os.getenv("PDF_LIBRARY_DIR", "pdf_library")
+PDF_LIBRARY_INDEX_DIR = os.getenv("PDF_LIBRARY_INDEX_DIR", "")  # defaults to <library>/.index
+LIBRARY_EMBEDDING_BACKEND = os.getenv("LIBRARY_EMBEDDING_BACKEND", EMBEDDING_BACKEND)
+
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+LIBRARY_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+# =============================================================================
+# Extraction and chunking
+# =============================================================================
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_text(path: str) -> str:
+    """Extract the text of a PDF (with pypdf) or read a text/markdown file."""
+    if not path.lower().endswith(".pdf"):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("PDF ingest needs: pip install pypdf") from e
+
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception as e:  # pypdf raises a variety of errors on malformed pages
+            logger.warning(f"Could not extract a page of {path}: {e}")
+    return "\n\n".join(pages)
+
+
+def document_title(path: str, text: str) -> str:
+    """PDF metadata title if present, else the first substantial line, else the file name."""
+    if path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+            title = (PdfReader(path).metadata or {}).get("/Title")
+            if title and str(title).strip():
+                return str(title).strip()
+        except Exception:
+            pass
+    for line in text.splitlines():
+        line = line.strip().lstrip("#").strip()
+        if 15 <= len(line) <= 200:
+            return line
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split text into overlapping chunks."""
+    from langchain.text_splitter import CharacterTextSplitter
+
+    splitter = CharacterTextSplitter(separator="\n", chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+
+
+# =============================================================================
+# Chunk index
+# =============================================================================
+
+class PdfLibrary:
+    """Incremental chunk index over a folder of papers."""
+
+    def __init__(self, library_dir: str = None, index_dir: str = None):
+        self.library_dir = library_dir or PDF_LIBRARY_DIR
+        self.index_dir = index_dir or PDF_LIBRARY_INDEX_DIR or os.path.join(self.library_dir, ".index")
+        self.manifest_path = os.path.join(self.index_dir, "manifest.json")
+        self.chunks_path = os.path.join(self.index_dir, "chunks.jsonl")
+        self.store = VectorStore(os.path.join(self.index_dir, "chunks.vec"))
+        self._lock = threading.Lock()
+        self._loaded_manifest_mtime = None
+        self._chunks: List[Dict] = []
+        self._live_mask = np.zeros(0, dtype=bool)
+
+    @property
+    def backend(self):
+        return get_embedding_backend(LIBRARY_EMBEDDING_BACKEND)
+
+    # ---------------------------------------------------------------- manifest
+
+    def load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"files": {}}
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _library_files(self) -> Dict[str, str]:
+        """Relative path -> absolute path of every supported file in the library."""
+        files = {}
+        for root, dirs, names in os.walk(self.library_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                if name.lower().endswith(LIBRARY_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, self.library_dir)] = path
+        return files
+
+    # ------------------------------------------------------------------ ingest
+
+    def ingest(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the library folder.
+
+        Returns:
+            Counts of added, updated, removed, unchanged and failed files, and new chunks
+        """
+        if not os.path.isdir(self.library_dir):
+            raise FileNotFoundError(f"Library folder not found: {self.library_dir}")
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        backend = self.backend
+        self.store.check_model(backend.model_id)
+        # Drop any chunk lines past the committed vector count (an interrupted ingest)
+        self._truncate_chunks(self.store.count)
+        manifest = self.load_manifest()
+        known = manifest["files"]
+        current = self._library_files()
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "failed": 0, "chunks": 0}
+
+        for rel_path in sorted(set(known) - set(current)):
+            del known[rel_path]  # its rows become tombstones
+            stats["removed"] += 1
+
+        for rel_path, path in sorted(current.items()):
+            stat = os.stat(path)
+            entry = known.get(rel_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                stats["unchanged"] += 1
+                continue
+
+            sha256 = file_sha256(path)
+            if entry and entry["sha256"] == sha256:
+                # Touched or copied, same content: nothing to re-embed
+                entry["mtime"] = stat.st_mtime
+                stats["unchanged"] += 1
+                continue
+
+            try:
+                text = extract_text(path)
+                chunks = chunk_text(text)
+            except Exception as e:
+                logger.error(f"Could not extract {path}: {e}")
+                stats["failed"] += 1
+                continue
+            if not chunks:
+                logger.warning(f"No text extracted from {path} (scanned PDF?)")
+
+            title = document_title(path, text)
+            rows = self._append_chunks(rel_path, title, sha256, chunks, backend)
+            stats["updated" if entry else "added"] += 1
+            stats["chunks"] += len(rows)
+            known[rel_path] = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime,
+                               "title": title, "rows": rows}
+            # Save after every file so an interrupted ingest keeps its progress
+            manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save_manifest(manifest)
+
+        manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self._save_manifest(manifest)
+
+        live_rows = sum(len(entry["rows"]) for entry in known.values())
+        if self.store.count - live_rows > max(live_rows, 100):
+            self.compact()
+
+        logger.info(f"Library ingest of {self.library_dir}: {stats}")
+        return stats
+
+    def _append_chunks(self, rel_path: str, title: str, sha256: str, chunks: List[str], backend) -> List[int]:
+        """Embed and append chunks; returns their row numbers."""
+        if not chunks:
+            return []
+        vectors = backend.embed_array(chunks)
+        start = self.store.count
+        lines = [
+            json.dumps({"file": rel_path, "title": title, "sha256": sha256, "chunk": i, "text": chunk}) + "\n"
+            for i, chunk in enumerate(chunks)
+        ]
+        with open(self.chunks_path, "a") as f:
+            f.writelines(lines)
+        self.store.append(vectors, model=backend.model_id)
+        return list(range(start, start + len(chunks)))
+
+    def _truncate_chunks(self, rows: int) -> None:
+        if not os.path.exists(self.chunks_path):
+            return
+        with open(self.chunks_path, "rb+") as f:
+            for _ in range(rows):
+                if not f.readline():
+                    return
+            f.truncate()
+
+    def compact(self) -> None:
+        """Rewrite the index without tombstoned rows."""
+        manifest = self.load_manifest()
+        matrix = self.store.matrix()
+        chunks = self._read_chunks()
+        new_store = VectorStore(os.path.join(self.index_dir, "chunks.compact.vec"))
+        for path in (new_store.vectors_path, new_store.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        new_lines, new_vectors = [], []
+        for entry in manifest["files"].values():
+            new_rows = []
+            for row in entry["rows"]:
+                new_rows.append(len(new_lines))
+                new_lines.append(json.dumps(chunks[row]) + "\n")
+                new_vectors.append(np.asarray(matrix[row], dtype=np.float32))
+            entry["rows"] = new_rows
+        if new_vectors:
+            new_store.append(np.vstack(new_vectors), model=self.store.meta().get("model"))
+
+        tmp_chunks = self.chunks_path + ".compact"
+        with open(tmp_chunks, "w") as f:
+            f.writelines(new_lines)
+        if new_vectors:
+            os.replace(new_store.vectors_path, self.store.vectors_path)
+            os.replace(new_store.meta_path, self.store.meta_path)
+        else:
+            for path in (self.store.vectors_path, self.store.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        os.replace(tmp_chunks, self.chunks_path)
+        self._save_manifest(manifest)
+        self.store = VectorStore(self.store.base_path)
+        logger.info(f"Compacted library index to {len(new_lines)} chunks")
+
+    # ------------------------------------------------------------------ search
+
+    def _read_chunks(self) -> List[Dict]:
+        chunks = []
+        if os.path.exists(self.chunks_path):
+            with open(self.chunks_path, "r") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    chunks.append(json.loads(line))
+        return chunks
+
+    def _refresh(self) -> None:
+        """Reload chunks and the live-row mask when the manifest has changed."""
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._loaded_manifest_mtime:
+            return
+        manifest = self.load_manifest()
+        self.store = VectorStore(self.store.base_path)
+        count = self.store.count
+        self._chunks = self._read_chunks()[:count]
+        self._live_mask = np.zeros(count, dtype=bool)
+        for entry in manifest["files"].values():
+            rows = [row for row in entry["rows"] if row < count]
+            self._live_mask[rows] = True
+        self._loaded_manifest_mtime = mtime
+
+    def search(self, query: str, k: int = 5) -> List[Dict]:
+        """Best-matching live chunks, each with `file`, `title`, `text` and `score`."""
+        with self._lock:
+            self._refresh()
+            if not self._live_mask.any():
+                return []
+            backend = self.backend
+            self.store.check_model(backend.model_id)
+            query_vector = backend.embed_array([query])[0]
+            hits = self.store.search(query_vector, k, mask=self._live_mask)
+            return [dict(self._chunks[row], score=score) for row, score in hits]
+
+
+_library: Optional[PdfLibrary] = None
+
+
+def get_library() -> PdfLibrary:
+    """Shared PdfLibrary for the configured folder."""
+    global _library
+    if _library is None:
+        _library = PdfLibrary()
+    return _library
+
+
+def search_library(query: str, k: int = 10, chunks_per_file: int = 2) -> List[Dict]:
+    """
+    Search the library and return one paper-like record per file.
+
+    The best chunks of each file are joined into its `abstract`, so the
+    results flow through the same merge/RAG path as search results.
+    """
+    hits = get_library().search(query, k=k * chunks_per_file)
+    papers: Dict[str, Dict] = {}
+    for hit in hits:
+        paper = papers.setdefault(hit["file"], {"title": hit["title"], "file": hit["file"], "chunks": []})
+        if len(paper["chunks"]) < chunks_per_file:
+            paper["chunks"].append(hit)
+    results = []
+    for paper in list(papers.values())[:k]:
+        chunks = sorted(paper.pop("chunks"), key=lambda c: c["chunk"])
+        paper["abstract"] = "\n...\n".join(c["text"] for c in chunks)
+        paper["score"] = max(c["score"] for c in chunks)
+        results.append(paper)
+    return results
@@ -0,0 +1,296 @@
+# preprint_dumps.py
+
+"""
+Management of the local bioRxiv / medRxiv / chemRxiv dumps.
+
+The dumps are append-only JSONL files (one paper per line, the format written
+by paperscraper). New records are ingested as deltas: they are deduplicated by
+DOI against a sidecar index, appended to the dump, and picked up in place by
+any DumpIndex that is already loaded, so the corpus stays current without
+re-downloading or re-reading multi-GB files.
+"""
+
+import io
+import os
+import glob
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from paper_merge import normalize_doi
+
+logger = logging.getLogger(__name__)
+
+SERVER_DUMPS_DIR = os.getenv("SERVER_DUMPS_DIR", "server_dumps")
+DUMP_SERVERS = ("biorxiv", "medrxiv", "chemrxiv")
+MANIFEST_FILENAME = "manifest.json"
+
+# Same default fields as paperscraper's XRXivQuery
+DUMP_FIELDS = ["title", "doi", "authors", "abstract", "date", "journal"]
+
+
+# =============================================================================
+# Paths and manifest
+# =============================================================================
+
+def manifest_path() -> str:
+    return os.path.join(SERVER_DUMPS_DIR, MANIFEST_FILENAME)
+
+
+def load_manifest() -> Dict[str, Dict]:
+    """Load the manifest describing each server's dump (path, record count, last date)."""
+    try:
+        with open(manifest_path(), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Corrupt dump manifest {manifest_path()}: {e}")
+        return {}
+
+
+def save_manifest(manifest: Dict[str, Dict]) -> None:
+    """Atomically write the manifest."""
+    os.makedirs(SERVER_DUMPS_DIR, exist_ok=True)
+    tmp_path = manifest_path() + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path())
+
+
+def dump_path(server: str) -> str:
+    """
+    Path of the dump for a server.
+
+    Resolution order: the {SERVER}_DUMP_PATH environment variable, the path
+    recorded in the manifest, the newest dated snapshot (e.g.
+    biorxiv_2025-03-11.jsonl), and finally {SERVER_DUMPS_DIR}/{server}.jsonl.
+    """
+    if server not in DUMP_SERVERS:
+        raise ValueError(f"Unknown preprint server: {server}")
+
+    env_path = os.getenv(f"{server.upper()}_DUMP_PATH")
+    if env_path:
+        return env_path
+
+    recorded = load_manifest().get(server, {}).get("path")
+    if recorded:
+        return recorded
+
+    snapshots = sorted(glob.glob(os.path.join(SERVER_DUMPS_DIR, f"{server}_*.jsonl")))
+    if snapshots:
+        return snapshots[-1]
+
+    return os.path.join(SERVER_DUMPS_DIR, f"{server}.jsonl")
+
+
+def doi_index_path(path: str) -> str:
+    """Sidecar file listing the normalized DOI of every record in a dump."""
+    return path + ".dois"
+
+
+def load_doi_index(path: str) -> set:
+    """
+    Load the set of DOIs already in a dump.
+
+    The sidecar index is built from the dump on first use and then kept in
+    sync by ingest_records().
+    """
+    index_path = doi_index_path(path)
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    dois = set()
+    if os.path.exists(path):
+        logger.info(f"Building DOI index for {path}")
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    doi = normalize_doi(json.loads(line).get("doi"))
+                except json.JSONDecodeError:
+                    continue
+                if doi:
+                    dois.add(doi)
+        with open(index_path, "w") as f:
+            f.writelines(f"{doi}\n" for doi in sorted(dois))
+    return dois
+
+
+# =============================================================================
+# Delta ingest
+# =============================================================================
+
+def ingest_records(server: str, records: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Append new records to a server's dump, skipping DOIs it already contains.
+
+    Args:
+        server: One of DUMP_SERVERS
+        records: Paper records in the dump format (title, doi, authors, abstract, date, journal)
+
+    Returns:
+        Counts of added, duplicate and invalid (no DOI) records
+    """
+    path = dump_path(server)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    known_dois = load_doi_index(path)
+
+    new_lines = []
+    new_dois = []
+    stats = {"added": 0, "duplicates": 0, "invalid": 0}
+    last_date = None
+
+    for record in records:
+        doi = normalize_doi(record.get("doi"))
+        if not doi:
+            stats["invalid"] += 1
+            continue
+        if doi in known_dois:
+            stats["duplicates"] += 1
+            continue
+        known_dois.add(doi)
+        new_dois.append(doi)
+        new_lines.append(json.dumps({field: record.get(field) for field in DUMP_FIELDS}) + "\n")
+        if record.get("date") and (last_date is None or str(record["date"]) > last_date):
+            last_date = str(record["date"])
+
+    if new_lines:
+        # Dump first, then the DOI index: a crash in between only costs a re-check next time
+        with open(path, "a") as f:
+            f.writelines(new_lines)
+        with open(doi_index_path(path), "a") as f:
+            f.writelines(f"{doi}\n" for doi in new_dois)
+    stats["added"] = len(new_lines)
+
+    manifest = load_manifest()
+    entry = manifest.setdefault(server, {})
+    entry["path"] = path
+    entry["record_count"] = len(known_dois)
+    if last_date and last_date > entry.get("last_date", ""):
+        entry["last_date"] = last_date
+    entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    save_manifest(manifest)
+
+    logger.info(f"Ingested {server} delta into {path}: {stats}")
+    return stats
+
+
+def read_feed(feed_path: str) -> List[Dict]:
+    """Read records from a local JSONL feed (a stand-in for the upstream server)."""
+    records = []
+    with open(feed_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed line {line_number} in {feed_path}: {e}")
+    return records
+
+
+def fetch_upstream(server: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+    """
+    Fetch records published between start_date and end_date from the upstream server.
+
+    Uses paperscraper's dump functions to write the delta to a temporary file,
+    then reads it back. When start_date is omitted, the manifest's last_date
+    is used (minus one day of overlap, which deduplication absorbs).
+    """
+    from paperscraper.get_dumps import biorxiv, medrxiv, chemrxiv
+
+    fetchers = {"biorxiv": biorxiv, "medrxiv": medrxiv, "chemrxiv": chemrxiv}
+
+    if start_date is None:
+        last_date = load_manifest().get(server, {}).get("last_date")
+        if last_date:
+            start_date = (datetime.strptime(last_date[:10], "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        else:
+            raise ValueError(f"No previous ingest recorded for {server}; pass a start date")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        delta_path = os.path.join(tmp_dir, f"{server}_delta.jsonl")
+        logger.info(f"Fetching {server} records from {start_date} to {end_date or 'today'}")
+        fetchers[server](start_date=start_date, end_date=end_date, save_path=delta_path)
+        if not os.path.exists(delta_path):
+            return []
+        return read_feed(delta_path)
+
+
+# =============================================================================
+# In-place search index
+# =============================================================================
+
+class DumpIndex:
+    """
+    Keyword search over a dump that follows appends instead of reloading.
+
+    Wraps paperscraper's XRXivQuery. On every search the dump file is checked
+    for growth and only the newly appended lines are parsed and added to the
+    in-memory frame.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.querier = None
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """Load any records appended since the last call. Returns the number of new rows."""
+        import pandas as pd
+        from paperscraper.xrxiv.xrxiv_query import XRXivQuery
+
+        with self._lock:
+            if not os.path.exists(self.path):
+                return 0
+            size = os.path.getsize(self.path)
+            if self.querier is not None and size == self.offset:
+                return 0
+
+            if self.querier is None or size < self.offset:
+                # First load, or the file was replaced: read it whole
+                self.querier = XRXivQuery(self.path)
+                self.offset = size
+                return 0 if self.querier.errored else len(self.querier.df)
+
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+            # Only consume complete lines; a concurrent ingest may be mid-write
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            if not complete:
+                return 0
+            self.offset += len(complete)
+
+            new_rows = pd.read_json(io.StringIO(complete.decode("utf-8")), lines=True)
+            new_rows["date"] = [
+                date.strftime("%Y-%m-%d") if hasattr(date, "strftime") else str(date)
+                for date in new_rows["date"]
+            ]
+            self.querier.df = pd.concat([self.querier.df, new_rows], ignore_index=True)
+            logger.info(f"Added {len(new_rows)} new records to the index for {self.path}")
+            return len(new_rows)
+
+    def search_keywords(self, keywords, fields: Optional[List[str]] = None):
+        """Search the dump (see XRXivQuery.search_keywords)."""
+        self.refresh()
+        if self.querier is None or self.querier.errored:
+            raise FileNotFoundError(f"Dump not available: {self.path}")
+        return self.querier.search_keywords(keywords, fields=fields)
+
+
+_dump_indexes: Dict[str, DumpIndex] = {}
+
+
+def get_dump_index(server: str) -> DumpIndex:
+    """Shared DumpIndex for a server, so the dump is only loaded once per process."""
+    path = dump_path(server)
+    index = _dump_indexes.get(path)
+    if index is None:
+        index = _dump_indexes[path] = DumpIndex(path)
+    return index
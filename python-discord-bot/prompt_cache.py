@@ -0,0 +1,118 @@
+# prompt_cache.py
+
+"""
+Prompt layout for provider-side prefix caching.
+
+Providers cache the longest previously seen prompt prefix (OpenAI does it
+automatically, Anthropic for prefixes marked with `cache_control`). A meeting
+prompt is therefore laid out as a stable prefix followed by a volatile
+suffix:
+
+    system prompt                      stable per agent
+    agenda / opening                   stable for the meeting
+    completed rounds, one message each grows append-only
+    current round + instruction        volatile
+
+The orchestrator records checkpoints in the transcript at round boundaries;
+split_history cuts the transcript there, so every earlier message is
+byte-identical from call to call and only the last one changes.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from models import LLMMessage
+
+logger = logging.getLogger(__name__)
+
+# Providers that need explicit cache breakpoints (litellm model prefixes)
+EXPLICIT_CACHE_PROVIDERS = ("anthropic/",)
+
+Conversation = Union[str, Sequence[str]]
+
+
+def split_history(text: str, checkpoints: Sequence[int], suffix: str = "") -> List[str]:
+    """
+    Cut a transcript into segments at checkpoint offsets.
+
+    Args:
+        text: The transcript so far
+        checkpoints: Character offsets of completed-round boundaries
+        suffix: Volatile text (e.g. an instruction) appended to the last segment
+
+    Returns:
+        Segments whose concatenation is text + suffix; all but the last are stable
+    """
+    segments, start = [], 0
+    for offset in sorted(set(checkpoints)):
+        if start < offset < len(text):
+            segments.append(text[start:offset])
+            start = offset
+    segments.append(text[start:] + suffix)
+    return segments
+
+
+def join_conversation(conversation: Conversation) -> str:
+    """The conversation as a single string."""
+    return conversation if isinstance(conversation, str) else "".join(conversation)
+
+
+def conversation_messages(conversation: Conversation) -> List[LLMMessage]:
+    """
+    User messages for a conversation, the end of the stable prefix marked for caching.
+
+    Args:
+        conversation: A string, or segments from split_history
+    """
+    if isinstance(conversation, str):
+        return [LLMMessage(role="user", content=conversation)]
+    segments = [s for s in conversation if s] or [""]
+    messages = [LLMMessage(role="user", content=s) for s in segments]
+    if len(messages) > 1:
+        messages[-2].cache = True
+    return messages
+
+
+def to_litellm_messages(messages: Sequence[LLMMessage], model: str) -> List[Dict[str, Any]]:
+    """
+    Convert messages to litellm's format for `model`.
+
+    For providers that need explicit breakpoints, the system prompt and every
+    message flagged with `cache` get an ephemeral `cache_control` marker;
+    elsewhere the flag is dropped (OpenAI caches prefixes on its own).
+    """
+    explicit = model.startswith(EXPLICIT_CACHE_PROVIDERS)
+    converted = []
+    for index, msg in enumerate(messages):
+        mark = explicit and (msg.cache or (index == 0 and msg.role == "system"))
+        if mark:
+            content = [{"type": "text", "text": msg.content, "cache_control": {"type": "ephemeral"}}]
+        else:
+            content = msg.content
+        converted.append({"role": msg.role, "content": content})
+    return converted
+
+
+def usage_dict(usage: Any) -> Dict[str, int]:
+    """
+    Token usage from a litellm response, including prompt-cache hits.
+
+    Returns:
+        prompt_tokens, completion_tokens, total_tokens, cached_tokens (prompt
+        tokens read from the cache) and cache_creation_tokens (written to it)
+    """
+    def read(obj: Any, key: str) -> Optional[Any]:
+        if obj is None:
+            return None
+        if isinstance(obj, dict):
+            return obj.get(key)
+        return getattr(obj, key, None)
+
+    details = read(usage, "prompt_tokens_details")
+    return {
+        "prompt_tokens": read(usage, "prompt_tokens") or 0,
+        "completion_tokens": read(usage, "completion_tokens") or 0,
+        "total_tokens": read(usage, "total_tokens") or 0,
+        "cached_tokens": read(details, "cached_tokens") or read(usage, "cache_read_input_tokens") or 0,
+        "cache_creation_tokens": read(usage, "cache_creation_input_tokens") or 0,
+    }
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Rerun recorded meetings offline against their recorded LLM traffic.
+
+Meetings recorded with LLM_RECORD_DIR (see traffic_log.py) are run again
+through the orchestrator, with every LLM call and Tool Agent step answered
+from the recording, at the recorded latencies (or scaled). Meetings that were
+started together (same session) are rerun concurrently. For each meeting the
+script reports:
+  1. Wall time of the rerun vs. the recorded latency of its calls
+  2. Replayed calls (hits) and calls that were not in the recording (misses)
+
+Misses mean the rerun took a different path than production (a changed
+prompt, a different speaker): they are simulated, or fail with
+--on-miss error.
+
+Transcripts and meeting updates go to the configured API (API_BASE_URL):
+point it at a development deployment.
+
+Usage:
+    python replay_meetings.py traffic/
+    python replay_meetings.py traffic/ --latency-scale 0
+    python replay_meetings.py traffic/m-123.jsonl --on-miss error
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import logging
+from collections import defaultdict
+from pathlib import Path
+
+from llm_client import LLMClient
+from orchestrator import AgentOrchestrator
+from usage_ledger import Budget
+from traffic_log import load_meetings, meeting_file, traffic_log
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("replay_meetings")
+
+
+class ReplayMessage:
+    """A sent Discord message (content only)."""
+
+    def __init__(self, content=None):
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+    async def delete(self):
+        pass
+
+
+class ReplayFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = ReplayMessage(content)
+        self.sent.append(message)
+        return message
+
+
+class ReplayInteraction:
+    """Stands in for the Discord interaction that started the meeting: messages are collected, not posted."""
+
+    def __init__(self):
+        self.followup = ReplayFollowup()
+        self.channel = None
+        self.user = None
+
+
+def recorded_latency(path):
+    """Total recorded latency (seconds) of the calls in a meeting's log."""
+    total = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            total += entry.get("ms") or 0
+    return total / 1000
+
+
+async def rerun(orchestrator, meeting, log_dir):
+    """Run one recorded meeting again under a new ID; returns its report."""
+    meeting_id = f"replay-{uuid.uuid4().hex[:8]}"
+    await orchestrator.initialize_meeting(
+        meeting_id, meeting["session_id"], meeting["agents"], meeting["agenda"], meeting["round_count"],
+        parallel_index=meeting["parallel_index"], total_parallel_meetings=meeting["total_parallel_meetings"],
+        model_policy=meeting["model_policy"], budget=Budget(**meeting["budget"]) if meeting["budget"] else None,
+        temperature_variation=meeting["temperature_variation"], parallel_group=meeting["parallel_group"],
+        fused_turns=meeting["fused_turns"], batch_mode=meeting["batch_mode"],
+    )
+    interaction = ReplayInteraction()
+    start = time.perf_counter()
+    ok = await orchestrator.start_conversation(
+        meeting_id, interaction, live_mode=meeting["live_mode"], conversation_length=meeting["conversation_length"]
+    )
+    log = Path(log_dir) / meeting_file(meeting["meeting_id"]) if Path(log_dir).is_dir() else Path(log_dir)
+    return {
+        "meeting_id": meeting["meeting_id"],
+        "ok": ok,
+        "wall_s": time.perf_counter() - start,
+        "recorded_s": recorded_latency(log),
+        "messages": len(interaction.followup.sent),
+    }
+
+
+async def run(args):
+    traffic_log.latency_scale = args.latency_scale
+    traffic_log.on_miss = args.on_miss
+    traffic_log.load(args.log)
+    meetings = load_meetings(args.log)
+    if not meetings:
+        print(f"No recorded meetings in {args.log}")
+        return
+
+    sessions = defaultdict(list)
+    for meeting in meetings:
+        sessions[meeting["session_id"]].append(meeting)
+
+    orchestrator = AgentOrchestrator(LLMClient())
+    reports = []
+    start = time.perf_counter()
+    for session_id, session_meetings in sessions.items():
+        hits, misses = traffic_log.hits, traffic_log.misses
+        session_reports = await asyncio.gather(*(rerun(orchestrator, m, args.log) for m in session_meetings))
+        for report in session_reports:
+            report["session_id"] = session_id
+            report["hits"] = traffic_log.hits - hits
+            report["misses"] = traffic_log.misses - misses
+        reports.extend(session_reports)
+    total = time.perf_counter() - start
+
+    print("\n=== MEETING REPLAY ===")
+    print(f"log: {args.log} | latency scale: {args.latency_scale} | on miss: {args.on_miss}")
+    for r in reports:
+        print(
+            f"{r['meeting_id']:>24}: {'ok' if r['ok'] else 'FAILED':>6} | wall {r['wall_s']:7.2f} s | "
+            f"recorded calls {r['recorded_s']:7.2f} s | messages {r['messages']:3d} | "
+            f"session hits {r['hits']} misses {r['misses']}"
+        )
+    print(f"total: {len(reports)} meetings in {total:.2f} s | hits {traffic_log.hits} | misses {traffic_log.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun recorded meetings against their recorded LLM traffic")
+    parser.add_argument("log", help="A recording directory (LLM_RECORD_DIR) or one meeting's .jsonl")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for the recorded latencies (0 for instant replies)")
+    parser.add_argument("--on-miss", choices=("simulate", "error"), default="simulate",
+                        help="What to do with calls that are not in the recording")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
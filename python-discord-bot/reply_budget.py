@@ -0,0 +1,162 @@
+# reply_budget.py
+
+"""
+Output-token limits learned from observed reply lengths.
+
+Every call that generates text belongs to a reply kind: an agent's turn (by
+agent key), the speaker selection JSON, a fused select-and-speak turn, the
+Tool Agent's keyword extraction and answer, or the combined summary of
+parallel runs. For each kind the
+client keeps a window of recent completion lengths and requests max_tokens
+at a high percentile of that distribution plus some headroom, within a
+floor and a per-kind cap. Until enough replies have been seen, the kind's
+fixed default is used.
+
+A reply cut off at its limit only shows that the real length was at least
+the limit, so it is recorded as longer than that; repeated truncation raises
+the limit quickly.
+
+Smaller limits mean less reserved output capacity, faster replies on
+providers that pace by max_tokens, and less tokens-per-minute quota spent.
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_MAX_TOKENS = os.getenv("ADAPTIVE_MAX_TOKENS", "true").lower() == "true"
+REPLY_TOKEN_PERCENTILE = float(os.getenv("REPLY_TOKEN_PERCENTILE", "0.95"))
+REPLY_TOKEN_HEADROOM = float(os.getenv("REPLY_TOKEN_HEADROOM", "1.2"))
+REPLY_TOKEN_FLOOR = int(os.getenv("REPLY_TOKEN_FLOOR", "64"))
+MIN_SAMPLES = int(os.getenv("REPLY_TOKEN_MIN_SAMPLES", "20"))
+WINDOW = 200
+
+# Limits used until a kind has MIN_SAMPLES observations (the previous fixed values,
+# except for the Tool Agent's calls, which reserved 10000 tokens for a short JSON or answer)
+DEFAULT_MAX_TOKENS = {
+    "principal_investigator": 500,
+    "scientist": 500,
+    "scientific_critic": 500,
+    "summary_agent": 500,
+    "selection": 300,
+    "keywords": 300,
+    "tool_agent": 2000,
+    "combined_summary": 2000,
+    "fused_turn": 700,
+}
+FALLBACK_MAX_TOKENS = 500
+
+# Hard caps per kind; learned limits never exceed them. Override with e.g.
+#   REPLY_TOKEN_CAPS='{"summary_agent": 1500}'
+DEFAULT_CAPS = {
+    "principal_investigator": 1000,
+    "scientist": 1000,
+    "scientific_critic": 1000,
+    "summary_agent": 1500,
+    "selection": 300,
+    "keywords": 300,
+    "tool_agent": 4000,
+    "combined_summary": 4000,
+    "fused_turn": 1300,
+}
+REPLY_TOKEN_CAPS = {**DEFAULT_CAPS, **json.loads(os.getenv("REPLY_TOKEN_CAPS", "{}") or "{}")}
+
+# A meeting reply that goes on to write the next transcript heading has finished
+TRANSCRIPT_STOP_SEQUENCES = ["\n=== ROUND", "\n=== FINAL SUMMARY"]
+STOP_SEQUENCES = {
+    "principal_investigator": TRANSCRIPT_STOP_SEQUENCES,
+    "scientist": TRANSCRIPT_STOP_SEQUENCES,
+    "scientific_critic": TRANSCRIPT_STOP_SEQUENCES,
+}
+
+
+def supports_stop(model: str) -> bool:
+    """Whether `model` accepts stop sequences (reasoning models do not)."""
+    from local_provider import is_local
+
+    if is_local(model):
+        # OpenAI-compatible servers take `stop`
+        return True
+    try:
+        import litellm
+
+        return "stop" in (litellm.get_supported_openai_params(model=model) or [])
+    except Exception as e:
+        logger.debug(f"Could not look up stop support for {model}: {e}")
+        return False
+
+
+class ReplyBudgets:
+    """Recent completion lengths per reply kind and the max_tokens they imply."""
+
+    def __init__(
+        self,
+        percentile: float = REPLY_TOKEN_PERCENTILE,
+        headroom: float = REPLY_TOKEN_HEADROOM,
+        min_samples: int = MIN_SAMPLES,
+        caps: Optional[Dict[str, int]] = None,
+        enabled: bool = ADAPTIVE_MAX_TOKENS,
+    ):
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.caps = dict(caps or REPLY_TOKEN_CAPS)
+        self.enabled = enabled
+        self.samples: Dict[str, Deque[int]] = {}
+        # Observations arrive from the event loop and from worker threads
+        self._lock = threading.Lock()
+
+    def cap(self, kind: str) -> int:
+        return self.caps.get(kind) or 2 * DEFAULT_MAX_TOKENS.get(kind, FALLBACK_MAX_TOKENS)
+
+    def max_tokens(self, kind: str) -> int:
+        """The max_tokens to request for a reply of this kind."""
+        default = min(DEFAULT_MAX_TOKENS.get(kind, FALLBACK_MAX_TOKENS), self.cap(kind))
+        if not self.enabled:
+            return default
+        with self._lock:
+            lengths = sorted(self.samples.get(kind, ()))
+        if len(lengths) < self.min_samples:
+            return default
+        index = min(len(lengths) - 1, math.ceil(self.percentile * len(lengths)) - 1)
+        limit = math.ceil(lengths[index] * self.headroom)
+        return max(REPLY_TOKEN_FLOOR, min(limit, self.cap(kind)))
+
+    def stop_sequences(self, kind: str) -> Optional[List[str]]:
+        return STOP_SEQUENCES.get(kind)
+
+    def observe(self, kind: str, completion_tokens: int, limit: Optional[int] = None,
+                finish_reason: Optional[str] = None) -> None:
+        """
+        Record a reply's length.
+
+        Args:
+            kind: Reply kind
+            completion_tokens: Tokens the reply used
+            limit: The max_tokens it was given
+            finish_reason: "length" when the reply was cut off at the limit
+        """
+        if not completion_tokens:
+            return
+        if finish_reason == "length" and limit:
+            # Censored: the reply wanted more than it got
+            completion_tokens = max(completion_tokens, math.ceil(limit * 1.5))
+            logger.info(f"{kind} reply truncated at {limit} tokens")
+        with self._lock:
+            self.samples.setdefault(kind, deque(maxlen=WINDOW)).append(completion_tokens)
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Samples and current limit per kind."""
+        with self._lock:
+            kinds = list(self.samples)
+        return {kind: {"samples": len(self.samples[kind]), "maxTokens": self.max_tokens(kind)} for kind in kinds}
+
+
+# Process-wide budgets
+reply_budgets = ReplyBudgets()
@@ -0,0 +1,183 @@
+# selection_batcher.py
+
+"""
+Micro-batching of speaker selection across concurrent meetings.
+
+Every meeting asks a small model who should speak next before each turn.
+With many meetings in flight those calls compete for the same rate limit,
+so the batcher holds each request for a few milliseconds, and requests for
+the same model that arrive in that window are decided in one structured
+call: the prompt lists each meeting's agents and conversation, and the
+reply is an array of decisions tagged with meeting IDs (the JSON schema
+restricts each meeting's choice to its own agents). The decisions are then
+handed back to the waiting meetings.
+
+A request that ends up alone in its window, a meeting missing from the
+reply, or a failed batch call falls back to the meeting's own selection call.
+
+Batched prompts do not reuse a meeting's cached transcript prefix; batching
+trades that for fewer requests per minute and is off by default.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Sequence, Union
+
+from pydantic import BaseModel, create_model
+
+from models import LLMMessage
+from prompt_cache import Conversation, join_conversation
+from llm_client import provider_for_model
+from reply_budget import reply_budgets
+
+logger = logging.getLogger(__name__)
+
+SELECTION_BATCHING = os.getenv("SELECTION_BATCHING", "false").lower() == "true"
+SELECTION_BATCH_WINDOW_MS = float(os.getenv("SELECTION_BATCH_WINDOW_MS", "25"))
+SELECTION_BATCH_MAX = int(os.getenv("SELECTION_BATCH_MAX", "8"))
+
+BATCH_INSTRUCTIONS = """You are the Orchestrator for several independent lab meetings.
+For each meeting below, read its conversation and decide which agent should speak next,
+choosing only from that meeting's possible agents. Return one decision per meeting,
+tagged with its meeting ID, with a short rationale."""
+
+
+class SpeakerDecision(BaseModel):
+    """Who speaks next in one meeting of a batch."""
+    meeting_id: str
+    agent: str
+    rationale: str
+
+
+def batch_decision_schema(choices: Dict[str, Sequence[str]]):
+    """
+    The reply schema for a batch: {"decisions": [...]}, each decision's agent restricted
+    to its meeting's agents (one variant per meeting, told apart by meeting_id).
+    """
+    variants = [
+        create_model(
+            f"Decision{index}",
+            __base__=SpeakerDecision,
+            meeting_id=(Literal[meeting_id], ...),
+            agent=(Literal[tuple(agent_keys)], ...),
+        )
+        for index, (meeting_id, agent_keys) in enumerate(choices.items())
+    ]
+    decision = variants[0] if len(variants) == 1 else Union[tuple(variants)]
+    return create_model("SpeakerDecisions", decisions=(List[decision], ...))
+
+
+def batch_prompt(requests: List["SelectionRequest"]) -> str:
+    """The conversations of every meeting in a batch, one section each."""
+    sections = [
+        f"### Meeting {request.meeting_id}\n"
+        f"Possible agents: {', '.join(request.agent_keys)}\n"
+        f"Conversation:\n{join_conversation(request.conversation)}"
+        for request in requests
+    ]
+    return "\n\n".join(sections)
+
+
+class SelectionRequest:
+    """One meeting waiting for its speaker decision."""
+
+    def __init__(self, meeting_id: str, agent_keys: List[str], conversation: Conversation,
+                 select_alone: Callable[[], Awaitable[Any]]):
+        self.meeting_id = meeting_id
+        self.agent_keys = agent_keys
+        self.conversation = conversation
+        self.select_alone = select_alone
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class SelectionBatcher:
+    """Collects selection requests per model and resolves each window with one call."""
+
+    def __init__(self, llm_client, window_ms: float = SELECTION_BATCH_WINDOW_MS, max_batch: int = SELECTION_BATCH_MAX):
+        self.llm_client = llm_client
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.pending: Dict[str, List[SelectionRequest]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.batched_requests = 0
+
+    async def select(self, meeting_id: str, model: str, agent_keys: List[str], conversation: Conversation,
+                     select_alone: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        The next speaker for a meeting, decided together with other meetings' requests.
+
+        Args:
+            meeting_id: ID of the meeting
+            model: Selection model (only requests for the same model are batched)
+            agent_keys: Agents that may speak next
+            conversation: The meeting's conversation (string or segments)
+            select_alone: The meeting's own selection call, used when it cannot be batched
+
+        Returns:
+            An object with `agent` and `rationale` (from the batch or from select_alone)
+        """
+        request = SelectionRequest(meeting_id, list(agent_keys), conversation, select_alone)
+        queue = self.pending.setdefault(model, [])
+        # A meeting has at most one decision in flight, but guard against duplicate IDs in one batch
+        if any(r.meeting_id == meeting_id for r in queue):
+            return await select_alone()
+        queue.append(request)
+        if len(queue) >= self.max_batch:
+            self._flush(model)
+        elif model not in self._timers:
+            self._timers[model] = asyncio.get_running_loop().call_later(self.window, self._flush, model)
+        return await request.future
+
+    def _flush(self, model: str) -> None:
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self.pending.pop(model, [])
+        if requests:
+            asyncio.create_task(self._resolve(model, requests))
+
+    async def _resolve(self, model: str, requests: List[SelectionRequest]) -> None:
+        if len(requests) == 1:
+            await self._resolve_alone(requests[0])
+            return
+
+        decisions: Dict[str, Any] = {}
+        try:
+            schema = batch_decision_schema({r.meeting_id: r.agent_keys for r in requests})
+            reply = await self.llm_client.generate_structured(
+                provider=provider_for_model(model),
+                messages=[
+                    LLMMessage(role="system", content=BATCH_INSTRUCTIONS),
+                    LLMMessage(role="user", content=batch_prompt(requests)),
+                ],
+                schema=schema,
+                model=model,
+                temperature=1,
+                # Room for every meeting's decision
+                max_tokens=reply_budgets.max_tokens("selection") * len(requests),
+            )
+            decisions = {decision.meeting_id: decision for decision in reply.decisions}
+            self.batches += 1
+            self.batched_requests += len(requests)
+            logger.info(f"Selected speakers for {len(decisions)} of {len(requests)} meetings in one call to {model}")
+        except Exception as e:
+            logger.error(f"Batched speaker selection failed, selecting per meeting: {e}")
+
+        for request in requests:
+            decision = decisions.get(request.meeting_id)
+            if decision is not None and not request.future.done():
+                request.future.set_result(decision)
+        await asyncio.gather(*(
+            self._resolve_alone(request) for request in requests if request.meeting_id not in decisions
+        ))
+
+    async def _resolve_alone(self, request: SelectionRequest) -> None:
+        if request.future.done():
+            return
+        try:
+            request.future.set_result(await request.select_alone())
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
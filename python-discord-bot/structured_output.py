@@ -0,0 +1,188 @@
+# structured_output.py
+
+"""
+Schema-validated JSON output from LLM calls.
+
+Calls that must produce JSON describe it with a pydantic model. The provider
+is asked for schema-constrained output where the model supports it (JSON
+mode otherwise), the reply is validated against the model, and a reply that
+does not validate gets exactly one repair attempt that shows the model its
+validation error.
+
+LLMClient.generate_structured is the async entry point; complete_structured
+is the blocking equivalent for code that calls litellm directly (the Tool
+Agent pipeline runs in a worker thread).
+"""
+
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from credential_pool import credential_pools
+from local_provider import is_local, litellm_request, local_endpoint, sync_request_slot
+from prompt_cache import usage_dict
+from usage_ledger import record_usage
+from traffic_log import traffic_log
+from reply_budget import reply_budgets
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+REPAIR_TEMPERATURE = 0
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a reply still fails validation after the repair attempt."""
+
+    def __init__(self, message: str, raw_output: str = ""):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+def response_format_for(model: str, schema: Type[BaseModel]) -> Optional[Dict[str, Any]]:
+    """
+    The `response_format` to request from `model`.
+
+    Returns:
+        A strict JSON schema when the model supports one, JSON mode when it
+        supports `response_format` at all, otherwise None (the schema is then
+        only described in the prompt)
+    """
+    import litellm
+    from litellm.utils import type_to_response_format_param
+
+    if is_local(model):
+        # Whatever the local server is configured to support
+        if local_endpoint.response_format == "json_schema":
+            return type_to_response_format_param(schema)
+        if local_endpoint.response_format == "json_object":
+            return {"type": "json_object"}
+        return None
+    try:
+        if litellm.supports_response_schema(model=model):
+            return type_to_response_format_param(schema)
+        if "response_format" in (litellm.get_supported_openai_params(model=model) or []):
+            return {"type": "json_object"}
+    except Exception as e:
+        logger.debug(f"Could not look up response_format support for {model}: {e}")
+    return None
+
+
+def schema_instructions(schema: Type[BaseModel]) -> str:
+    """Prompt text describing the expected JSON (for models without native schema support)."""
+    return (
+        "Reply with only a JSON object that matches this JSON schema, with no markdown or extra text:\n"
+        + json.dumps(schema.model_json_schema(), separators=(",", ":"))
+    )
+
+
+def extract_json(text: str) -> str:
+    """The JSON object in a reply, tolerating code fences and surrounding prose."""
+    text = (text or "").strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        return text[start:end + 1]
+    return text
+
+
+def parse_structured(text: str, schema: Type[T]) -> T:
+    """
+    Validate a reply against `schema`.
+
+    Raises:
+        ValidationError: If the reply is not valid JSON or does not match the schema
+    """
+    return schema.model_validate_json(extract_json(text))
+
+
+def repair_prompt(error: Exception) -> str:
+    """The follow-up message asking the model to fix an invalid reply."""
+    if isinstance(error, ValidationError):
+        details = "; ".join(f"{'.'.join(map(str, e['loc'])) or 'reply'}: {e['msg']}" for e in error.errors())
+    else:
+        details = str(error)
+    return (
+        f"Your previous reply was not valid: {details}. "
+        "Reply again with only the corrected JSON object."
+    )
+
+
+def complete_structured(
+    model: str,
+    messages: List[Dict[str, str]],
+    schema: Type[T],
+    reply_kind: Optional[str] = None,
+    **kwargs,
+) -> T:
+    """
+    Blocking structured completion through litellm.
+
+    Args:
+        model: Full litellm model string
+        messages: Chat messages as dicts
+        schema: Pydantic model the reply must validate against
+        reply_kind: Learn max_tokens for this kind of reply (see reply_budget.py) unless max_tokens is given
+        **kwargs: Passed to litellm.completion (temperature, max_tokens, ...)
+
+    Returns:
+        The validated schema instance
+
+    Raises:
+        StructuredOutputError: If the reply is still invalid after one repair
+    """
+    from litellm import completion
+
+    messages = [{"role": "system", "content": schema_instructions(schema)}] + list(messages)
+    response_format = response_format_for(model, schema)
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    if reply_kind is not None and kwargs.get("max_tokens") is None:
+        kwargs["max_tokens"] = reply_budgets.max_tokens(reply_kind)
+
+    pool = credential_pools.for_model(model)
+
+    def request(credential):
+        request_kwargs = {**kwargs, **litellm_request(model, credential.request_kwargs(), kwargs.get("max_tokens"))}
+        with sync_request_slot(model):
+            # Recorded with LLM_RECORD_DIR (see traffic_log.py)
+            return traffic_log.observe_sync(
+                "structured", model, {**kwargs, "messages": messages},
+                lambda: completion(messages=messages, **request_kwargs),
+            )
+
+    def complete():
+        response = pool.call_sync(request)
+        usage = usage_dict(getattr(response, "usage", None))
+        record_usage(model, usage)
+        if reply_kind is not None:
+            reply_budgets.observe(
+                reply_kind, usage["completion_tokens"], kwargs.get("max_tokens"),
+                getattr(response.choices[0], "finish_reason", None),
+            )
+        return response
+
+    response = complete()
+    content = response.choices[0].message.content or ""
+    try:
+        return parse_structured(content, schema)
+    except ValidationError as e:
+        logger.warning(f"Invalid {schema.__name__} from {model}, repairing: {e.errors()[:3]}")
+        messages += [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": repair_prompt(e)},
+        ]
+
+    kwargs["temperature"] = REPAIR_TEMPERATURE
+    response = complete()
+    content = response.choices[0].message.content or ""
+    try:
+        return parse_structured(content, schema)
+    except ValidationError as e:
+        raise StructuredOutputError(f"Invalid {schema.__name__} after repair: {e}", content) from e
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for Batch API execution of non-live meetings (batch_api.py), against local_llm_stub.py.
+"""
+
+import json
+import asyncio
+import logging
+
+from aiohttp import web
+
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from local_provider import local_endpoint
+from local_llm_stub import StubServer
+from batch_api import BatchError, BatchExecutor, bind_batch_executor, parse_result_line
+from usage_ledger import UsageLedger, UsageScope
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def with_stub(body, batch_delay_ms=50):
+    """Run `body(client, stub)` against a stub server on a free port."""
+    stub = StubServer(latency_ms=5, seed=1, batch_delay_ms=batch_delay_ms)
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    saved = dict(local_endpoint.__dict__)
+    local_endpoint.base_url = f"http://127.0.0.1:{port}/v1"
+    local_endpoint.models = ["stub"]
+    try:
+        return await body(LLMClient(), stub)
+    finally:
+        local_endpoint.__dict__.update(saved)
+        await runner.cleanup()
+
+
+def ask(client, text, max_tokens=None):
+    return client.generate_response(
+        LLMProvider.LOCAL, [LLMMessage(role="user", content=text)], model="local/stub", max_tokens=max_tokens
+    )
+
+
+def test_parse_result_line():
+    """Output lines become responses, failed requests become errors."""
+    ok = {"custom_id": "req-1", "error": None, "response": {"status_code": 200, "body": {
+        "id": "x", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hi"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+    }}}
+    custom_id, response = parse_result_line(json.dumps(ok))
+    assert custom_id == "req-1" and response.choices[0].message.content == "Hi"
+
+    failed = {"custom_id": "req-2", "response": {"status_code": 400, "body": {"error": {"message": "bad"}}}}
+    custom_id, error = parse_result_line(json.dumps(failed))
+    assert custom_id == "req-2" and isinstance(error, BatchError)
+
+
+def test_wave_is_one_batch():
+    """Concurrent calls of bound meetings are answered by a single batch."""
+    async def body(client, stub):
+        executor = BatchExecutor(window=0.05, poll_interval=0.02)
+        bind_batch_executor(executor)
+        responses = await asyncio.gather(*(ask(client, f"Run {i}", max_tokens=5) for i in range(3)))
+        assert executor.batches == 1 and len(stub.batches) == 1
+        assert stub.batches["batch-1"]["request_counts"] == {"total": 3, "completed": 3, "failed": 0}
+        assert all(r.content and r.usage["completion_tokens"] == 5 for r in responses)
+        assert stub.requests == 3
+
+    asyncio.run(with_stub(body))
+
+
+def test_expired_batch_falls_back():
+    """A batch that outlasts max_wait is cancelled and its calls are made interactively."""
+    async def body(client, stub):
+        bind_batch_executor(BatchExecutor(window=0.01, poll_interval=0.02, max_wait=0.05))
+        responses = await asyncio.gather(ask(client, "a"), ask(client, "b"))
+        assert stub.batches["batch-1"]["status"] == "cancelled"
+        assert all(r.content for r in responses)
+        assert stub.requests == 2
+
+    asyncio.run(with_stub(body, batch_delay_ms=10_000))
+
+
+def test_batch_cost_discount():
+    """Batched calls are billed at BATCH_COST_FACTOR."""
+    ledger = UsageLedger()
+    usage = {"prompt_tokens": 1000, "completion_tokens": 500, "total_tokens": 1500}
+    interactive = ledger.record("openai/gpt-4o", usage, UsageScope(meeting_id="m1"))
+    batched = ledger.record("openai/gpt-4o", usage, UsageScope(meeting_id="m2"), batch=True)
+    assert interactive > 0 and abs(batched - interactive / 2) < 1e-9
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_parse_result_line,
+        test_wave_is_one_batch,
+        test_expired_batch_falls_back,
+        test_batch_cost_discount,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
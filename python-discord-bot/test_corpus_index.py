@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped corpus index (corpus_index.py).
+"""
+
+import os
+import logging
+import tempfile
+
+import numpy as np
+
+import corpus_index
+import preprint_dumps
+from corpus_index import CorpusIndex, VectorStore
+from embedding_backends import normalize_rows
+from preprint_dumps import ingest_records
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def fake_embed_texts(texts):
+    """Deterministic bag-of-words embedding, so the tests need no API."""
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, sum(map(ord, word)) % 64] += 1.0
+    return normalize_rows(vectors)
+
+
+def test_blocked_search_matches_full_sort():
+    """Blocked top-k search returns the same rows as a full argsort."""
+    rng = np.random.default_rng(0)
+    vectors = normalize_rows(rng.standard_normal((1000, 32)).astype(np.float32))
+    query = vectors[123]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = VectorStore(os.path.join(tmp_dir, "test.vec"))
+        store.append(vectors[:600])
+        store.append(vectors[600:])
+        assert store.count == 1000
+
+        original_block_rows = corpus_index.SEARCH_BLOCK_ROWS
+        corpus_index.SEARCH_BLOCK_ROWS = 128
+        try:
+            hits = store.search(query, k=5)
+        finally:
+            corpus_index.SEARCH_BLOCK_ROWS = original_block_rows
+
+        expected = np.argsort(-(store.matrix().astype(np.float32) @ query))[:5]
+        assert [row for row, _ in hits] == [int(i) for i in expected]
+        assert hits[0][0] == 123
+
+
+def test_incremental_build():
+    """Building again only embeds records appended to the dump since the last build."""
+    original_embed = corpus_index.embed_texts
+    original_dumps_dir = preprint_dumps.SERVER_DUMPS_DIR
+    corpus_index.embed_texts = fake_embed_texts
+    corpus_index._query_cache.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            preprint_dumps.SERVER_DUMPS_DIR = tmp_dir
+            ingest_records("biorxiv", [
+                {"doi": "10.1101/1", "title": "CRISPR screens in T cells", "abstract": "gene editing"},
+                {"doi": "10.1101/2", "title": "Protein folding", "abstract": "structure prediction"},
+            ])
+            index = CorpusIndex("biorxiv")
+            assert index.build() == 2
+
+            ingest_records("biorxiv", [
+                {"doi": "10.1101/3", "title": "Single-cell atlas of the gut", "abstract": "sequencing"},
+            ])
+            assert index.build() == 1
+            assert index.build() == 0
+            assert index.store.count == 3
+
+            results = index.search("protein folding structure prediction", k=1)
+            assert results[0]["doi"] == "10.1101/2"
+    finally:
+        corpus_index.embed_texts = original_embed
+        corpus_index._query_cache.clear()
+        preprint_dumps.SERVER_DUMPS_DIR = original_dumps_dir
+
+
+def main():
+    """Run all tests."""
+    for test in (test_blocked_search_matches_full_sort, test_incremental_build):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
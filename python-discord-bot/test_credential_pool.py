@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for per-provider API key pools (credential_pool.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from credential_pool import Credential, CredentialPool, credential_pools, parse_duration
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after="60"):
+        super().__init__("rate limited")
+        self.litellm_response_headers = {"retry-after": retry_after}
+
+
+def make_pool(*keys):
+    return CredentialPool("openai", [Credential(label=key, api_key=key) for key in keys])
+
+
+def fake_response(remaining_requests, total_tokens=10):
+    response = SimpleNamespace(usage={"total_tokens": total_tokens})
+    response._hidden_params = {"additional_headers": {"x-ratelimit-remaining-requests": str(remaining_requests)}}
+    return response
+
+
+def test_spreads_by_remaining_quota():
+    """Requests go to the key with the most quota left, counting requests in flight."""
+    pool = make_pool("a", "b")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.label, second.label} == {"a", "b"}
+    pool.release(first, fake_response(5))
+    pool.release(second, fake_response(50))
+    assert pool.acquire().label == "b"
+    assert [c["tokens"] for c in pool.report()] == [10, 10]
+
+
+def test_rate_limited_key_goes_cold_and_recovers():
+    """A 429 moves the request to another key; the cold key is skipped until it recovers."""
+    pool = make_pool("a", "b")
+    used = []
+
+    async def request(credential):
+        used.append(credential.api_key)
+        if credential.api_key == "a":
+            raise RateLimitError()
+        return fake_response(100)
+
+    pool.credentials[1].remaining_requests = 1  # "a" is tried first
+    asyncio.run(pool.call(request))
+    assert used == ["a", "b"]
+    a = pool.credentials[0]
+    assert a.is_cold and a.rate_limited == 1
+    assert pool.acquire().label == "b"
+
+    a.cold_until = 0
+    a.remaining_requests = 500
+    assert pool.acquire().label == "a"
+
+
+def test_all_keys_cold_raises():
+    """With every key rate limited the 429 reaches the caller (and its retry logic)."""
+    pool = make_pool("a")
+
+    async def request(credential):
+        raise RateLimitError()
+
+    try:
+        asyncio.run(pool.call(request))
+        assert False, "expected a rate limit error"
+    except RateLimitError:
+        pass
+    assert parse_duration("6m0s") == 360 and parse_duration("20ms") == 0.02
+
+
+def test_cancelled_request_releases_its_key():
+    """A cancelled request (a hedge that lost) gives its key back without counting an error."""
+    pool = make_pool("a")
+    started = asyncio.Event()
+
+    async def request(credential):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def cancel_pending():
+        task = asyncio.create_task(pool.call(request))
+        await started.wait()
+        assert pool.credentials[0].in_flight == 1
+        task.cancel()
+        try:
+            await task
+            assert False, "expected the request to be cancelled"
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_pending())
+    assert pool.credentials[0].in_flight == 0 and pool.credentials[0].errors == 0
+
+
+def test_client_sends_pooled_keys():
+    """LLMClient passes the chosen key to litellm."""
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    seen = []
+
+    async def fake_acompletion(model, messages, **kwargs):
+        seen.append(kwargs.get("api_key"))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))],
+            usage={"total_tokens": 3},
+        )
+
+    original_pool = credential_pools.pools["openai"]
+    original = llm_client_module.acompletion
+    credential_pools.pools["openai"] = make_pool("key-1", "key-2")
+    llm_client_module.acompletion = fake_acompletion
+    try:
+        for _ in range(2):
+            asyncio.run(client.generate_response(
+                LLMProvider.OPENAI, [LLMMessage(role="user", content="hi")], model="openai/gpt-4o-mini"
+            ))
+    finally:
+        llm_client_module.acompletion = original
+        credential_pools.pools["openai"] = original_pool
+    assert sorted(seen) == ["key-1", "key-2"]
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_spreads_by_remaining_quota,
+        test_rate_limited_key_goes_cold_and_recovers,
+        test_all_keys_cold_raises,
+        test_cancelled_request_releases_its_key,
+        test_client_sends_pooled_keys,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for non-blocking Tool Agent turns (TOOL_AGENT_NONBLOCKING in orchestrator.py).
+"""
+
+import asyncio
+import logging
+import typing
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from db_client import db_client
+from orchestrator import AgentOrchestrator
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+AGENTS = [
+    {"name": "Principal Investigator", "role": "Lead", "expertise": "immunology", "goal": "lead the meeting"},
+    {"name": "Immunologist", "role": "Scientist", "expertise": "T-cell biology", "goal": "find targets"},
+    {"name": "Tool Agent", "role": "Tool Agent", "expertise": "literature search", "goal": "find papers"},
+]
+
+
+class ScriptedLLM:
+    """Picks the scripted speakers in order; the Tool Agent takes `tool_delay`, everyone else 10 ms."""
+
+    def __init__(self, picks, tool_delay):
+        self.picks = list(picks)
+        self.tool_delay = tool_delay
+        self.allowed = []
+        self.events = []
+        self.synthesis_history = None
+        self.tool_histories = []
+
+    async def generate_structured(self, provider, messages, schema, **kwargs):
+        allowed = typing.get_args(schema.model_fields["agent"].annotation)
+        self.allowed.append(allowed)
+        pick = self.picks.pop(0) if self.picks else allowed[0]
+        return schema(agent=pick if pick in allowed else allowed[0], rationale="next")
+
+    async def call_agent(self, agent_key, conversation_history, **kwargs):
+        name = kwargs.get("agent_name") or agent_key
+        if "synthesize this round" in "".join(conversation_history):
+            name = "synthesis"
+            self.synthesis_history = "".join(conversation_history)
+        elif agent_key == "tool_agent":
+            self.tool_histories.append(conversation_history)
+        self.events.append(("start", name))
+        await asyncio.sleep(self.tool_delay if agent_key == "tool_agent" else 0.01)
+        self.events.append(("end", name))
+        return f"{name} speaking"
+
+
+class Followup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+        return SimpleNamespace(content=content)
+
+
+def run_meeting(llm, conversation_length):
+    """Run a one-round live meeting with deferred Tool Agent turns; returns the posted messages."""
+    orchestrator = AgentOrchestrator(llm)
+    interaction = SimpleNamespace(followup=Followup(), channel=None, user=None)
+
+    async def body():
+        await orchestrator.initialize_meeting("m1", "s1", AGENTS, "CAR-T therapy", 1)
+        assert await orchestrator.start_conversation(
+            "m1", interaction, live_mode=True, conversation_length=conversation_length
+        )
+
+    patches = (
+        patch("orchestrator.TOOL_AGENT_NONBLOCKING", True),
+        patch("orchestrator.LITERATURE_PREFETCH", False),
+        patch("orchestrator.STREAM_REPLIES", False),
+        patch.object(db_client, "create_transcript", AsyncMock(return_value={"isSuccess": True})),
+        patch.object(db_client, "update_meeting_usage", AsyncMock(return_value={"isSuccess": True})),
+    )
+    for p in patches:
+        p.start()
+    try:
+        asyncio.run(body())
+    finally:
+        for p in patches:
+            p.stop()
+    return interaction.followup.sent
+
+
+def posted(messages, prefix):
+    return next(i for i, content in enumerate(messages) if content and content.startswith(prefix))
+
+
+def test_round_carries_on_without_the_tool_agent():
+    """A slow Tool Agent turn runs while others speak, and lands before the PI synthesis."""
+    llm = ScriptedLLM(["Tool Agent", "Tool Agent", "Immunologist"], tool_delay=0.2)
+    sent = run_meeting(llm, conversation_length=3)
+
+    # The Immunologist spoke twice while the search was running
+    tool_end = llm.events.index(("end", "Tool Agent"))
+    assert llm.events[:tool_end].count(("start", "Tool Agent")) == 1
+    assert llm.events[:tool_end].count(("end", "Immunologist")) == 2
+    # The Tool Agent can't be picked again while its turn is pending
+    assert llm.allowed == [("Immunologist", "Tool Agent"), ("Immunologist",), ("Immunologist",)]
+    # Its result was injected and posted before the synthesis
+    assert tool_end < llm.events.index(("start", "synthesis"))
+    assert "[Tool Agent]: Tool Agent speaking" in llm.synthesis_history
+    assert posted(sent, "**[Tool Agent]**: Tool Agent speaking") < posted(sent, "**[Principal Investigator (synthesis)]**")
+
+
+def test_finished_turn_is_injected_before_the_next_pick():
+    """A Tool Agent turn that finished during another reply joins the conversation and frees its speaker."""
+    llm = ScriptedLLM(["Tool Agent", "Immunologist", "Tool Agent"], tool_delay=0)
+    sent = run_meeting(llm, conversation_length=3)
+
+    assert llm.allowed == [("Immunologist", "Tool Agent"), ("Immunologist",), ("Immunologist", "Tool Agent")]
+    # The second Tool Agent turn already sees the first one's reply
+    assert len(llm.tool_histories) == 2
+    assert "[Tool Agent]: Tool Agent speaking" not in llm.tool_histories[0]
+    assert "[Tool Agent]: Tool Agent speaking" in llm.tool_histories[1]
+    replies = [content[:16] for content in sent if content and content.startswith("**[")][1:]
+    assert replies == ["**[Immunologist]", "**[Tool Agent]**", "**[Tool Agent]**", "**[Principal Inv"]
+    assert llm.synthesis_history.count("[Tool Agent]: Tool Agent speaking") == 2
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_round_carries_on_without_the_tool_agent,
+        test_finished_turn_is_injected_before_the_next_pick,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
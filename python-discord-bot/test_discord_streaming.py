@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for progressive Discord rendering of streamed replies (discord_streaming.py).
+"""
+
+import asyncio
+import logging
+
+from discord_streaming import DISCORD_MESSAGE_LIMIT, StreamingMessageRenderer, split_message
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.edits = 0
+        self.deleted = False
+
+    async def edit(self, content):
+        assert len(content) <= DISCORD_MESSAGE_LIMIT
+        self.content = content
+        self.edits += 1
+
+    async def delete(self):
+        self.deleted = True
+
+
+class FakeChannel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content):
+        assert len(content) <= DISCORD_MESSAGE_LIMIT
+        message = FakeMessage(content)
+        self.messages.append(message)
+        return message
+
+
+def test_split_message():
+    """Pages respect the limit and break on whitespace."""
+    text = ("word " * 1000).strip()
+    pages = split_message(text, 2000)
+    assert all(len(page) <= 2000 for page in pages)
+    assert " ".join(pages).split() == text.split()
+
+
+def test_debounced_edits():
+    """Many deltas are coalesced into a few edits; the final text has no cursor."""
+    channel = FakeChannel()
+
+    async def run():
+        renderer = StreamingMessageRenderer(channel.send, prefix="**[PI]**: ", edit_interval=0.05)
+        await renderer.start()
+        assert channel.messages[0].content == "**[PI]**: …"
+        for i in range(100):
+            renderer.feed(f"tok{i} ")
+            await asyncio.sleep(0.001)
+        await renderer.finish(renderer.text.strip())
+
+    asyncio.run(run())
+    message = channel.messages[0]
+    assert len(channel.messages) == 1
+    assert message.content == "**[PI]**: " + " ".join(f"tok{i}" for i in range(100))
+    assert 1 <= message.edits < 20
+
+
+def test_rollover():
+    """Replies longer than one message continue in new messages."""
+    channel = FakeChannel()
+    text = "A sentence about T cells. " * 200  # ~5200 characters
+
+    async def run():
+        renderer = StreamingMessageRenderer(channel.send, prefix="**[Biologist]**: ", edit_interval=0)
+        await renderer.start()
+        for start in range(0, len(text), 50):
+            renderer.feed(text[start:start + 50])
+            await asyncio.sleep(0)
+        await renderer.finish(renderer.text.strip())
+
+    asyncio.run(run())
+    assert len(channel.messages) == 3
+    combined = " ".join(m.content for m in channel.messages)
+    assert combined.split() == ("**[Biologist]**: " + text).split()
+
+
+def test_discard():
+    """A failed stream removes its placeholder."""
+    channel = FakeChannel()
+
+    async def run():
+        renderer = StreamingMessageRenderer(channel.send, prefix="**[PI]**: ")
+        await renderer.start()
+        renderer.feed("partial")
+        await renderer.discard()
+
+    asyncio.run(run())
+    assert channel.messages[0].deleted
+
+
+def main():
+    """Run all tests."""
+    for test in (test_split_message, test_debounced_edits, test_rollover, test_discard):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
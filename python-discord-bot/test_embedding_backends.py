@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the local embedding backends (embedding_backends.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+
+import litellm
+import embedding_backends
+from credential_pool import credential_pools
+from embedding_backends import HashingEmbeddingBackend, OpenAIEmbeddingBackend, get_embedding_backend
+from usage_ledger import usage_ledger, usage_scope
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ABSTRACTS = [
+    "CAR-T cell therapy for solid tumors using engineered T cells.",
+    "Protein structure prediction with deep learning.",
+    "Gut microbiome composition in inflammatory bowel disease.",
+]
+
+
+def test_hashing_is_deterministic_and_normalized():
+    """The same text always maps to the same unit-length vector."""
+    backend = HashingEmbeddingBackend(dimensions=256)
+    first = backend.embed_array(ABSTRACTS)
+    second = HashingEmbeddingBackend(dimensions=256).embed_array(ABSTRACTS)
+    assert first.shape == (3, 256)
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0, atol=1e-5)
+
+
+def test_hashing_retrieval_with_faiss():
+    """The backend plugs into FAISS and ranks the lexically closest abstract first."""
+    backend = get_embedding_backend("hashing")
+    vectorstore = FAISS.from_documents([Document(page_content=a) for a in ABSTRACTS], backend)
+    results = vectorstore.as_retriever(search_kwargs={"k": 1}).invoke("engineered T cells for tumors")
+    assert results[0].page_content == ABSTRACTS[0]
+
+
+def test_async_embedding():
+    """aembed_documents runs off the event loop and matches the sync result."""
+    backend = get_embedding_backend("hashing")
+    vectors = asyncio.run(backend.aembed_documents(ABSTRACTS))
+    assert np.allclose(vectors, backend.embed_documents(ABSTRACTS))
+
+
+def test_openai_embeddings_are_billed():
+    """API embeddings take a key from the credential pool and are billed to the meeting, batch by batch."""
+    calls = []
+
+    def fake_embedding(model, input, **kwargs):
+        calls.append((model, len(input)))
+        return SimpleNamespace(
+            data=[{"embedding": [1.0, float(i)]} for i in range(len(input))],
+            usage={"prompt_tokens": 10 * len(input), "total_tokens": 10 * len(input)},
+        )
+
+    pool = credential_pools.for_model("openai/text-embedding-3-small")
+    requests = sum(c.requests for c in pool.credentials)
+    original_embedding, original_batch_size = litellm.embedding, embedding_backends.EMBEDDING_BATCH_SIZE
+    litellm.embedding, embedding_backends.EMBEDDING_BATCH_SIZE = fake_embedding, 2
+    try:
+        with usage_scope(meeting_id="embedding-meeting"):
+            vectors = OpenAIEmbeddingBackend().embed_array(ABSTRACTS)
+    finally:
+        litellm.embedding, embedding_backends.EMBEDDING_BATCH_SIZE = original_embedding, original_batch_size
+
+    assert vectors.shape == (3, 2) and sorted(calls) == [("text-embedding-3-small", 1), ("text-embedding-3-small", 2)]
+    totals = usage_ledger.totals_for("meeting", "embedding-meeting")
+    assert totals.calls == 2 and totals.prompt_tokens == 30 and totals.cost_usd > 0
+    assert sum(c.requests for c in pool.credentials) == requests + 2
+
+
+def main():
+    """Run all tests."""
+    for test in (test_hashing_is_deterministic_and_normalized, test_hashing_retrieval_with_faiss,
+                 test_async_embedding, test_openai_embeddings_are_billed):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
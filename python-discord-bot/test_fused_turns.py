@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for fused select-and-speak turns (fused_turn.py).
+"""
+
+import json
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMProvider
+from fused_turn import fused_turn_prompt, select_and_speak
+from orchestrator import AgentOrchestrator, agent_key_for_role
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+AGENTS = [
+    {"name": "Principal Investigator", "role": "Lead", "expertise": "immunology", "goal": "lead"},
+    {"name": "Immunologist", "role": "Scientist", "expertise": "T-cell biology", "goal": "find targets", "model": "openai"},
+    {"name": "Scientific Critic", "role": "Critical Reviewer", "expertise": "critique", "goal": "rigor", "model": "openai"},
+    {"name": "Tool Agent", "role": "Tool", "expertise": "literature search", "goal": "find papers", "model": "openai"},
+]
+
+
+def fake_completion(replies, requests):
+    async def fake_acompletion(model, messages, **kwargs):
+        requests.append((model, messages))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=replies.pop(0)), finish_reason="stop")],
+            usage={"prompt_tokens": 400, "completion_tokens": 120, "total_tokens": 520},
+        )
+    return fake_acompletion
+
+
+def run_with(replies, coroutine_factory):
+    requests = []
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = fake_completion(list(replies), requests)
+    try:
+        return asyncio.run(coroutine_factory()), requests
+    finally:
+        llm_client_module.acompletion = original
+
+
+def make_client():
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    return client
+
+
+def test_prompt_lists_personas():
+    """Every candidate's persona is in the prompt; literature-search agents are told apart."""
+    client = make_client()
+    personas = {
+        a["name"]: client.agent_system_prompt(agent_key_for_role(a["role"]), a["expertise"], a["goal"], None, a["name"])
+        for a in AGENTS[1:]
+    }
+    prompt = fused_turn_prompt(personas, ["Tool Agent"])
+    assert "### Immunologist\nYou are a Immunologist." in prompt
+    assert "Your expertise is in T-cell biology." in prompt
+    assert "If you choose Tool Agent, leave \"reply\" empty" in prompt
+    assert "leave \"reply\" empty" not in fused_turn_prompt(personas)
+
+
+def test_one_call_selects_and_speaks():
+    """A valid reply gives the speaker and their contribution from a single request."""
+    client = make_client()
+    reply = json.dumps({"agent": "Immunologist", "rationale": "targets first", "reply": "IL-12 armored CAR-Ts."})
+    choice, requests = run_with([reply], lambda: select_and_speak(
+        client, {"Immunologist": "You are an Immunologist.", "Scientific Critic": "You are a critic."},
+        "The user wants to discuss: CAR-T", "openai/gpt-4o",
+    ))
+    assert len(requests) == 1
+    assert (choice.agent, choice.reply) == ("Immunologist", "IL-12 armored CAR-Ts.")
+
+
+def test_invalid_reply_falls_back():
+    """An agent outside the roster, still invalid after the repair attempt, gives None."""
+    client = make_client()
+    invalid = json.dumps({"agent": "Nobody", "rationale": "", "reply": "..."})
+    choice, requests = run_with([invalid, invalid], lambda: select_and_speak(
+        client, {"Immunologist": "You are an Immunologist."}, "conversation", "openai/gpt-4o",
+    ))
+    assert choice is None and len(requests) == 2
+
+
+def test_orchestrator_skips_mixed_models():
+    """Candidates replying with different models are not fused."""
+    orchestrator = AgentOrchestrator(make_client())
+    meeting_data = {"agents": AGENTS[:2] + [dict(AGENTS[2], model="anthropic/claude-3-5-sonnet-20240620")], "temperature": 1.0}
+    fused, requests = run_with([], lambda: orchestrator._fused_turn(
+        meeting_data, ["Immunologist", "Scientific Critic"], "conversation"
+    ))
+    assert fused is None and requests == []
+
+    meeting_data["agents"] = AGENTS
+    reply = json.dumps({"agent": "Tool Agent", "rationale": "need papers", "reply": ""})
+    fused, requests = run_with([reply], lambda: orchestrator._fused_turn(
+        meeting_data, ["Immunologist", "Scientific Critic", "Tool Agent"], "conversation"
+    ))
+    assert fused.agent == "Tool Agent" and len(requests) == 1
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_prompt_lists_personas,
+        test_one_call_selects_and_speaks,
+        test_invalid_reply_falls_back,
+        test_orchestrator_skips_mixed_models,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
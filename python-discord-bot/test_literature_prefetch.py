@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test script for the Tool Agent's background literature prefetch (orchestrator.py).
+"""
+
+import time
+import asyncio
+import logging
+import typing
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from db_client import db_client
+from orchestrator import AgentOrchestrator
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+AGENTS = [
+    {"name": "Principal Investigator", "role": "Lead", "expertise": "immunology", "goal": "lead the meeting"},
+    {"name": "Immunologist", "role": "Scientist", "expertise": "T-cell biology", "goal": "find targets"},
+    {"name": "Tool Agent", "role": "Tool Agent", "expertise": "literature search", "goal": "find papers"},
+]
+
+
+class ScriptedLLM:
+    """Picks the scripted speakers in order; agent calls take 10 ms."""
+
+    def __init__(self, picks):
+        self.picks = list(picks)
+        self.agent_calls = []
+
+    async def generate_structured(self, provider, messages, schema, **kwargs):
+        allowed = typing.get_args(schema.model_fields["agent"].annotation)
+        pick = self.picks.pop(0) if self.picks else allowed[0]
+        return schema(agent=pick if pick in allowed else allowed[0], rationale="next")
+
+    async def call_agent(self, agent_key, conversation_history, **kwargs):
+        self.agent_calls.append((agent_key, kwargs.get("literature_context")))
+        await asyncio.sleep(0.01)
+        return f"{kwargs.get('agent_name') or agent_key} speaking"
+
+
+class FakePrefetch:
+    """Stands in for tool_agent_file.prefetch_literature (runs in a worker thread)."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+
+    def __call__(self, query_text):
+        self.queries.append(query_text)
+        time.sleep(self.delay)
+        return SimpleNamespace(query=query_text, docs=["abstract"])
+
+
+class Followup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+        return SimpleNamespace(content=content)
+
+
+def run_meeting(body, prefetch):
+    """Run `body()` with the prefetch faked and the database calls stubbed out."""
+    patches = (
+        patch("tool_agent_file.prefetch_literature", prefetch),
+        patch("orchestrator.LITERATURE_PREFETCH", True),
+        patch("orchestrator.STREAM_REPLIES", False),
+        patch.object(db_client, "create_transcript", AsyncMock(return_value={"isSuccess": True})),
+        patch.object(db_client, "update_meeting_usage", AsyncMock(return_value={"isSuccess": True})),
+    )
+    for p in patches:
+        p.start()
+    try:
+        return asyncio.run(body())
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_prefetch_starts_with_the_meeting():
+    """initialize_meeting starts one search on the agenda; meetings without a Tool Agent get none."""
+    prefetch = FakePrefetch(delay=0.05)
+    orchestrator = AgentOrchestrator(ScriptedLLM([]))
+
+    async def body():
+        await orchestrator.initialize_meeting("m1", "s1", AGENTS, "CAR-T therapy", 1)
+        task = orchestrator.active_meetings["m1"]["literature_prefetch_task"]
+        orchestrator._schedule_literature_prefetch("m1", "another query")
+        assert orchestrator.active_meetings["m1"]["literature_prefetch_task"] is task
+        await task
+        await orchestrator.initialize_meeting("m2", "s1", AGENTS[:2], "CAR-T therapy", 1)
+        assert "literature_prefetch_task" not in orchestrator.active_meetings["m2"]
+
+    run_meeting(body, prefetch)
+    assert prefetch.queries == ["The user wants to discuss: CAR-T therapy"]
+    assert orchestrator.active_meetings["m1"]["literature_context"].query == prefetch.queries[0]
+
+
+def test_prefetch_is_opt_in():
+    """Without TOOL_AGENT_PREFETCH nothing is searched ahead of the Tool Agent's turn."""
+    prefetch = FakePrefetch()
+    orchestrator = AgentOrchestrator(ScriptedLLM([]))
+
+    async def body():
+        with patch("orchestrator.LITERATURE_PREFETCH", False):
+            await orchestrator.initialize_meeting("m1", "s1", AGENTS, "CAR-T therapy", 1)
+
+    run_meeting(body, prefetch)
+    assert prefetch.queries == []
+    assert "literature_prefetch_task" not in orchestrator.active_meetings["m1"]
+
+
+def test_prefetch_refreshes_after_synthesis():
+    """After each round but the last, the PI synthesis starts a new search that replaces the finished one."""
+    prefetch = FakePrefetch()
+    orchestrator = AgentOrchestrator(ScriptedLLM(["Immunologist"] * 4))
+
+    async def body():
+        await orchestrator.initialize_meeting("m1", "s1", AGENTS, "CAR-T therapy", 2)
+        first = orchestrator.active_meetings["m1"]["literature_prefetch_task"]
+        interaction = SimpleNamespace(followup=Followup(), channel=None, user=None)
+        assert await orchestrator.start_conversation("m1", interaction, live_mode=False, conversation_length=1)
+        refreshed = orchestrator.active_meetings["m1"]["literature_prefetch_task"]
+        await refreshed
+        return first, refreshed
+
+    first, refreshed = run_meeting(body, prefetch)
+    assert refreshed is not first
+    assert len(prefetch.queries) == 2
+    assert prefetch.queries[1].startswith("The user wants to discuss: CAR-T therapy\n\n[Principal Investigator (round synthesis)]: ")
+    assert orchestrator.active_meetings["m1"]["literature_context"].query == prefetch.queries[1]
+
+
+def test_tool_turn_uses_the_prefetch():
+    """A Tool Agent turn waits for the search in flight instead of searching again, and reuses it later."""
+    prefetch = FakePrefetch(delay=0.1)
+    llm = ScriptedLLM(["Tool Agent", "Immunologist", "Tool Agent"])
+    orchestrator = AgentOrchestrator(llm)
+
+    async def body():
+        await orchestrator.initialize_meeting("m1", "s1", AGENTS, "CAR-T therapy", 1)
+        interaction = SimpleNamespace(followup=Followup(), channel=None, user=None)
+        assert await orchestrator.start_conversation("m1", interaction, live_mode=False, conversation_length=3)
+
+    run_meeting(body, prefetch)
+    tool_contexts = [context for key, context in llm.agent_calls if key == "tool_agent"]
+    assert len(tool_contexts) == 2
+    assert all(context is not None and context.query == prefetch.queries[0] for context in tool_contexts)
+    assert tool_contexts[0] is tool_contexts[1]
+    assert len(prefetch.queries) == 1
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_prefetch_starts_with_the_meeting,
+        test_prefetch_is_opt_in,
+        test_prefetch_refreshes_after_synthesis,
+        test_tool_turn_uses_the_prefetch,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
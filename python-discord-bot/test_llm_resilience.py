@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for LLM retries and circuit breaking (llm_resilience.py).
+"""
+
+import asyncio
+import logging
+
+import httpx
+import litellm
+
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, is_retryable, retry_after_seconds
+from llm_routing import LatencyRouter
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def rate_limit_error(headers=None):
+    response = httpx.Response(429, headers=headers or {}, request=httpx.Request("POST", "https://example.com"))
+    return litellm.RateLimitError("rate limited", llm_provider="openai", model="gpt-4o", response=response)
+
+
+def test_classification_and_retry_after():
+    """Transient errors are retryable, request errors are not; Retry-After is read from headers."""
+    assert is_retryable(rate_limit_error())
+    assert is_retryable(litellm.Timeout("timed out", model="gpt-4o", llm_provider="openai"))
+    assert not is_retryable(litellm.AuthenticationError("bad key", llm_provider="openai", model="gpt-4o"))
+    assert not is_retryable(litellm.ContextWindowExceededError("too long", model="gpt-4o", llm_provider="openai"))
+    assert not is_retryable(ValueError("nope"))
+
+    assert retry_after_seconds(rate_limit_error({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(rate_limit_error({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(rate_limit_error()) is None
+
+
+def test_retries_transient_errors():
+    """A blip is retried (honouring Retry-After) instead of failing the call."""
+    caller = ResilientCaller(max_retries=2)
+    attempts = []
+
+    async def call(model):
+        attempts.append(model)
+        if len(attempts) < 3:
+            raise rate_limit_error({"retry-after-ms": "10"})
+        return "ok"
+
+    assert asyncio.run(caller.call("openai/gpt-4o", call)) == "ok"
+    assert len(attempts) == 3
+    assert caller.breaker("openai/gpt-4o").state == CircuitBreaker.CLOSED
+
+
+def test_retry_budget_limits_retries():
+    """With the budget spent, errors propagate without retrying."""
+    caller = ResilientCaller(max_retries=5)
+    caller.budget.tokens = 0
+    attempts = []
+
+    async def call(model):
+        attempts.append(model)
+        raise rate_limit_error({"retry-after-ms": "1"})
+
+    try:
+        asyncio.run(caller.call("openai/gpt-4o", call))
+        assert False, "expected the error to propagate"
+    except litellm.RateLimitError:
+        pass
+    assert len(attempts) == 1
+
+
+def test_circuit_opens_and_probes_half_open():
+    """Repeated failures open the circuit; after the cooldown one probe decides."""
+    breaker = CircuitBreaker("m", threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()          # the probe
+    assert not breaker.allow()      # only one at a time
+    breaker.record_failure()        # probe failed: open again, longer
+    assert breaker.is_open and breaker.cooldown == 0.1
+
+    asyncio.run(asyncio.sleep(0.11))
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_router_fails_fast_past_open_circuit():
+    """A model with an open circuit is not called and ranks behind healthy equivalents."""
+    router = LatencyRouter()
+    router.resilience.max_retries = 0
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        if model == "down/model":
+            raise litellm.InternalServerError("503", llm_provider="openai", model="down/model")
+        return model
+
+    async def trip():
+        for _ in range(router.resilience.breaker("down/model").threshold):
+            try:
+                await router.resilience.call("down/model", call)
+            except litellm.InternalServerError:
+                pass
+
+    asyncio.run(trip())
+    assert router.rank(["down/model", "up/model"]) == ["up/model", "down/model"]
+    try:
+        asyncio.run(router.resilience.call("down/model", call))
+        assert False, "expected the open circuit to fail fast"
+    except CircuitOpenError:
+        pass
+
+    calls.clear()
+    served, _ = asyncio.run(router.execute(["down/model", "up/model"], call, hedge=False))
+    assert served == "up/model" and calls == ["up/model"]
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_classification_and_retry_after,
+        test_retries_transient_errors,
+        test_retry_budget_limits_retries,
+        test_circuit_opens_and_probes_half_open,
+        test_router_fails_fast_past_open_circuit,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
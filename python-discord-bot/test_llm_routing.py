@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for latency-aware failover and hedging (llm_routing.py).
+"""
+
+import asyncio
+import logging
+
+from llm_routing import LatencyRouter
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_failover_to_equivalent_model():
+    """A failing model is skipped in favour of the next candidate and penalized."""
+    router = LatencyRouter()
+
+    async def call(model):
+        if model == "openai/gpt-4o":
+            raise RuntimeError("503 Service Unavailable")
+        return f"answer from {model}"
+
+    served, result = asyncio.run(router.execute(["openai/gpt-4o", "anthropic/claude"], call, hedge=False))
+    assert served == "anthropic/claude" and result == "answer from anthropic/claude"
+    assert router.stats_for("openai/gpt-4o").error_rate > 0
+
+
+def test_hedge_cancels_loser():
+    """A stalled request is hedged at the deadline and the loser is cancelled."""
+    router = LatencyRouter()
+    for _ in range(10):
+        router.stats_for("slow/model").record_success(0.05)
+    cancelled = []
+
+    async def call(model):
+        try:
+            await asyncio.sleep(5 if model == "slow/model" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    async def run():
+        import llm_routing
+        original = llm_routing.HEDGE_MIN_DELAY
+        llm_routing.HEDGE_MIN_DELAY = 0.05
+        try:
+            result = await router.execute(["slow/model", "fast/model"], call, hedge=True)
+            await asyncio.sleep(0)  # let the cancellation land
+            return result
+        finally:
+            llm_routing.HEDGE_MIN_DELAY = original
+
+    served, _ = asyncio.run(run())
+    assert served == "fast/model"
+    assert cancelled == ["slow/model"]
+
+
+def test_rank_routes_around_slow_model():
+    """The requested model keeps priority unless it is much slower than an equivalent."""
+    router = LatencyRouter()
+    router.stats_for("a").record_success(1.0)
+    router.stats_for("b").record_success(0.8)
+    assert router.rank(["a", "b"]) == ["a", "b"]
+
+    for _ in range(5):
+        router.stats_for("a").record_success(10.0)
+    assert router.rank(["a", "b"]) == ["b", "a"]
+
+
+def main():
+    """Run all tests."""
+    for test in (test_failover_to_equivalent_model, test_hedge_cancels_loser, test_rank_routes_around_slow_model):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
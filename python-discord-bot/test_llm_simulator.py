@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline LLM simulator (llm_simulator.py).
+"""
+
+import time
+import asyncio
+import logging
+
+import litellm
+
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from llm_resilience import retry_after_seconds
+from llm_simulator import DISCIPLINES, PROFILES, LatencyProfile, llm_simulator
+from orchestrator import speaker_choice_schema
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TOPIC = "The user wants to discuss: CAR-T therapy for solid tumors\n\n"
+
+
+def simulated(body, **settings):
+    """Run `body(client)` with the simulator on (instant by default)."""
+    saved = dict(llm_simulator.__dict__)
+    llm_simulator.enabled = True
+    llm_simulator.profile = PROFILES["instant"]
+    for name, value in settings.items():
+        setattr(llm_simulator, name, value)
+    try:
+        return asyncio.run(body(LLMClient()))
+    finally:
+        llm_simulator.__dict__.update(saved)
+
+
+def agent_messages(system_prompt):
+    return [LLMMessage(role="system", content=system_prompt), LLMMessage(role="user", content=TOPIC + "Your turn.")]
+
+
+def test_deterministic_role_replies():
+    """The same prompt gets the same reply, in the voice of the agent named in the system prompt."""
+    async def body(client):
+        assert client.providers[LLMProvider.ANTHROPIC]["is_available"]
+        pi = agent_messages("You are a Principal Investigator. Your expertise is in immunology.")
+        first = await client.generate_response(LLMProvider.OPENAI, pi, model="openai/gpt-4o")
+        second = await client.generate_response(LLMProvider.OPENAI, pi, model="openai/gpt-4o")
+        critic = await client.generate_response(
+            LLMProvider.OPENAI, agent_messages("You are a Scientific Critic."), model="openai/gpt-4o"
+        )
+        assert first.content == second.content
+        assert first.content.startswith("Welcome, everyone. Today we are looking at CAR-T therapy for solid tumors.")
+        assert critic.content.startswith("I want to push back")
+        assert first.usage["completion_tokens"] == len(first.content.split(" "))
+        summary = await client.generate_response(
+            LLMProvider.OPENAI, agent_messages("You are the Summary Agent; produce a final summary."),
+            model="openai/gpt-4o", max_tokens=5,
+        )
+        assert summary.content == "Summary: The team discussed CAR-T"
+
+    simulated(body)
+
+
+def test_structured_calls():
+    """Speaker selection and persona generation get JSON that validates."""
+    async def body(client):
+        choice = await client.generate_structured(
+            LLMProvider.OPENAI, [LLMMessage(role="user", content=TOPIC + "Who speaks next?")],
+            schema=speaker_choice_schema(["Immunologist", "Scientific Critic"]), model="openai/gpt-4o",
+        )
+        assert choice.agent in ("Immunologist", "Scientific Critic") and choice.rationale
+        # Mistral models only get JSON mode: the schema comes from the prompt
+        variables = await client.generate_agent_variables("CAR-T therapy", "scientist", model="mistral/mistral-small-latest")
+        assert variables["agent_name"] in DISCIPLINES and variables["expertise"]
+
+    simulated(body)
+
+
+def test_streaming():
+    """Streams arrive word by word at the profile's speed, with usage."""
+    async def body(client):
+        stream = client.stream_response(
+            LLMProvider.OPENAI, agent_messages("You are a Scientific Critic."), model="openai/gpt-4o", max_tokens=8
+        )
+        start = time.perf_counter()
+        deltas = [delta async for delta in stream]
+        elapsed = time.perf_counter() - start
+        assert len(deltas) == 8 and stream.response.usage["completion_tokens"] == 8
+        assert elapsed >= 0.05 + 7 / 200
+
+    simulated(body, profile=LatencyProfile(50, 200, jitter=0))
+
+
+def test_fault_injection():
+    """Injected 429s carry Retry-After; injected 500s are server errors."""
+    async def body(client):
+        messages = [{"role": "user", "content": "hi"}]
+        try:
+            await litellm.acompletion(model="sim/openai/gpt-4o", messages=messages)
+            assert False, "expected a rate limit"
+        except litellm.RateLimitError as e:
+            assert retry_after_seconds(e) == 2.5
+        llm_simulator.rate_limit_rate, llm_simulator.error_rate = 0.0, 1.0
+        try:
+            await litellm.acompletion(model="sim/openai/gpt-4o", messages=messages)
+            assert False, "expected a server error"
+        except litellm.InternalServerError:
+            pass
+        assert (llm_simulator.rate_limited, llm_simulator.errors) == (1, 1)
+
+    simulated(body, rate_limit_rate=1.0, retry_after=2.5, rate_limited=0, errors=0)
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_deterministic_role_replies,
+        test_structured_calls,
+        test_streaming,
+        test_fault_injection,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
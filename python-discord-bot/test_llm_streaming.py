@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-streaming API of the LLM client (no API calls).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import llm_client
+from models import LLMMessage, LLMProvider
+from usage_ledger import usage_ledger, usage_scope
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# The client only routes to providers with an API key; these tests never call the API
+llm_client.providers[LLMProvider.OPENAI]["is_available"] = True
+
+
+def fake_acompletion(deltas, usage=None, fail_after=None, delay=0):
+    """Replacement for litellm.acompletion that streams the given deltas (and fails after `fail_after` of them)."""
+    calls = []
+
+    async def acompletion(**kwargs):
+        calls.append(kwargs)
+
+        async def stream():
+            for index, delta in enumerate(deltas):
+                if index == fail_after:
+                    raise ConnectionError("stream dropped")
+                await asyncio.sleep(delay)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+            if usage:
+                yield SimpleNamespace(choices=[], usage=SimpleNamespace(**usage))
+
+        return stream()
+
+    return acompletion, calls
+
+
+def test_stream_response():
+    """Deltas arrive in order and the final response carries usage and timings."""
+    acompletion, calls = fake_acompletion(
+        ["Par", "is", "."], usage={"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    )
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = acompletion
+    try:
+        async def run():
+            stream = llm_client.stream_response(
+                provider=LLMProvider.OPENAI,
+                messages=[LLMMessage(role="user", content="Capital of France?")],
+            )
+            return [delta async for delta in stream], stream.response
+
+        deltas, response = asyncio.run(run())
+    finally:
+        llm_client_module.acompletion = original
+
+    assert deltas == ["Par", "is", "."]
+    assert response.content == "Paris."
+    assert response.usage == {
+        "prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15,
+        "cached_tokens": 0, "cache_creation_tokens": 0,
+    }
+    assert response.time_to_first_token_ms is not None
+    assert response.latency_ms >= response.time_to_first_token_ms
+    assert calls[0]["stream"] is True and calls[0]["model"] == "openai/gpt-4o"
+
+
+def test_stream_agent_uses_agent_prompt():
+    """stream_agent builds the same messages as call_agent."""
+    acompletion, calls = fake_acompletion(["Let's ", "begin."])
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = acompletion
+    try:
+        async def run():
+            return [delta async for delta in llm_client.stream_agent(
+                agent_key="scientist",
+                conversation_history="Discuss CRISPR delivery.",
+                agent_name="Virologist",
+            )]
+
+        deltas = asyncio.run(run())
+    finally:
+        llm_client_module.acompletion = original
+
+    assert "".join(deltas) == "Let's begin."
+    messages = calls[0]["messages"]
+    assert "You are a Virologist" in messages[0]["content"]
+    assert messages[1] == {"role": "user", "content": "Discuss CRISPR delivery."}
+
+
+def test_unfinished_streams_are_billed():
+    """Streams that fail, are closed early or are cancelled still count their tokens for the meeting."""
+    deltas = ["Gene ", "drives ", "are ", "promising ", "but ", "risky."]
+
+    def open_stream():
+        return llm_client.stream_response(
+            provider=LLMProvider.OPENAI, messages=[LLMMessage(role="user", content="Discuss gene drives.")]
+        )
+
+    async def failed():
+        try:
+            async for _ in open_stream():
+                pass
+            assert False, "expected the stream to fail"
+        except ConnectionError:
+            pass
+
+    async def closed_early():
+        deltas = open_stream().__aiter__()
+        await deltas.__anext__()
+        await deltas.aclose()
+
+    async def cancelled():
+        async def consume():
+            async for _ in open_stream():
+                pass
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    original = llm_client_module.acompletion
+    try:
+        for meeting_id, body, fake in (
+            ("stream-failed", failed, fake_acompletion(deltas, fail_after=3)),
+            ("stream-closed", closed_early, fake_acompletion(deltas)),
+            ("stream-cancelled", cancelled, fake_acompletion(deltas, delay=0.02)),
+        ):
+            llm_client_module.acompletion = fake[0]
+            with usage_scope(meeting_id=meeting_id):
+                asyncio.run(body())
+            totals = usage_ledger.totals_for("meeting", meeting_id)
+            assert totals.calls == 1 and totals.prompt_tokens > 0, meeting_id
+            assert 0 < totals.completion_tokens < 10, meeting_id
+    finally:
+        llm_client_module.acompletion = original
+
+
+def main():
+    """Run all tests."""
+    for test in (test_stream_response, test_stream_agent_uses_agent_prompt, test_unfinished_streams_are_billed):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
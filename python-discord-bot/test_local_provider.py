@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI-compatible local endpoint (local_provider.py), served by local_llm_stub.py.
+"""
+
+import time
+import asyncio
+import logging
+
+from aiohttp import web
+
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from local_provider import LocalEndpoint, litellm_request, local_endpoint
+from local_llm_stub import StubServer
+from model_routing import FAST, ModelRoutingPolicy
+from orchestrator import speaker_choice_schema
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def with_stub(body, latency_ms=5, **endpoint):
+    """Run `body(client, stub)` against a stub server on a free port."""
+    stub = StubServer(latency_ms=latency_ms, seed=1)
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    saved = dict(local_endpoint.__dict__)
+    local_endpoint.base_url = f"http://127.0.0.1:{port}/v1"
+    local_endpoint.models = ["stub"]
+    for name, value in endpoint.items():
+        setattr(local_endpoint, name, value)
+    try:
+        return await body(LLMClient(), stub)
+    finally:
+        local_endpoint.__dict__.update(saved)
+        await runner.cleanup()
+
+
+def test_request_routing():
+    """Local models go to the endpoint as OpenAI-compatible models, never with the OpenAI key."""
+    endpoint = LocalEndpoint(base_url="http://gpu-box:8000/v1", models=["llama"], max_output_tokens=256)
+    kwargs = endpoint.request_kwargs("local/llama", {}, max_tokens=1000)
+    assert kwargs["model"] == "openai/llama" and kwargs["api_base"] == "http://gpu-box:8000/v1"
+    assert kwargs["api_key"] == "local" and kwargs["max_tokens"] == 256
+    assert endpoint.request_kwargs("local/llama", {"api_key": "secret"})["api_key"] == "secret"
+    assert litellm_request("openai/gpt-4o", {"api_key": "sk"}, 10) == {"model": "openai/gpt-4o", "max_tokens": 10, "api_key": "sk"}
+    assert endpoint.tier_models() == {"fast": "local/llama", "standard": "local/llama", "premium": "local/llama"}
+
+
+def test_local_sites_stay_local_under_budget():
+    """Forcing the fast tier (a meeting near its budget) keeps call sites pinned to the local endpoint."""
+    tiers = {"openai": {FAST: "openai/mini", "standard": "openai/std"}}
+    policy = ModelRoutingPolicy({"selection": "local/llama", "turn": "standard"}, tiers, default_provider="openai")
+    assert policy.model_for("selection", tier=FAST) == "local/llama"
+    assert policy.model_for("selection", {"model": "anthropic"}, tier=FAST) == "local/llama"
+    assert policy.model_for("turn", tier=FAST) == "openai/mini"
+
+
+def test_structured_selection_on_stub():
+    """A schema-constrained selection call is answered by the local endpoint."""
+    async def body(client, stub):
+        assert client.providers[LLMProvider.LOCAL]["is_available"]
+        choice = await client.generate_structured(
+            provider=LLMProvider.LOCAL,
+            messages=[LLMMessage(role="user", content="Who speaks next?")],
+            schema=speaker_choice_schema(["Immunologist", "Scientific Critic"]),
+            model="local/stub",
+            reply_kind="selection",
+        )
+        assert choice.agent in ("Immunologist", "Scientific Critic")
+        assert stub.requests == 1
+
+    asyncio.run(with_stub(body))
+
+
+def test_streaming_on_stub():
+    """Streamed replies arrive token by token with usage."""
+    async def body(client, stub):
+        stream = client.stream_response(
+            LLMProvider.LOCAL, [LLMMessage(role="user", content="Hello")], model="local/stub", max_tokens=10
+        )
+        deltas = [delta async for delta in stream]
+        assert len(deltas) == 10
+        assert stream.response.usage["completion_tokens"] == 10
+        assert local_endpoint._in_flight == 0
+
+    asyncio.run(with_stub(body))
+
+
+def test_concurrency_limit():
+    """No more requests than the server's limit are in flight at once."""
+    async def body(client, stub):
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, local_endpoint._in_flight)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client.generate_response(LLMProvider.LOCAL, [LLMMessage(role="user", content="hi")], model="local/stub")
+            for _ in range(3)
+        ))
+        elapsed = time.perf_counter() - start
+        watcher.cancel()
+        assert peak == 1
+        assert elapsed >= 0.12
+
+    asyncio.run(with_stub(body, latency_ms=50, max_concurrency=1))
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_request_routing,
+        test_local_sites_stay_local_under_budget,
+        test_structured_selection_on_stub,
+        test_streaming_on_stub,
+        test_concurrency_limit,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
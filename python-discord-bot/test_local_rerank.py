@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for local BM25 reranking (local_rerank.py).
+"""
+
+import logging
+from local_rerank import BM25Scorer, extract_last_turn, rerank_texts
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ABSTRACTS = [
+    "We study protein folding with language models.",
+    "CAR-T cell therapy response prediction using deep learning on single-cell data.",
+    "Engineering T-cell receptors for improved tumor recognition in immunotherapy.",
+    "A survey of graph neural networks.",
+]
+
+CONVERSATION = (
+    "The user wants to discuss: immunotherapy\n\n"
+    "[Principal Investigator]: Let's talk about protein folding.\n"
+    "[Immunologist]: I think T-cell receptor engineering is the key to tumor recognition."
+)
+
+
+def test_extract_last_turn():
+    """Only the last speaker's text is used for reranking."""
+    assert extract_last_turn(CONVERSATION).startswith("I think T-cell receptor")
+
+
+def test_scores():
+    """Documents sharing rare query terms score highest."""
+    scorer = BM25Scorer(ABSTRACTS)
+    scores = scorer.score("t-cell tumor recognition")
+    assert scores.argmax() == 2
+    assert scores[3] == 0
+
+
+def test_rerank():
+    """Keywords and the last turn outweigh earlier turns."""
+    indices = rerank_texts(ABSTRACTS, ["immunotherapy"], CONVERSATION, k=2)
+    assert indices[0] == 2
+    assert 0 not in indices
+
+
+def main():
+    """Run all tests."""
+    for test in (test_extract_last_turn, test_scores, test_rerank):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
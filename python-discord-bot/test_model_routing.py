@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for per-call-site model routing (model_routing.py).
+"""
+
+import asyncio
+import logging
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMProvider
+from model_routing import ModelRoutingPolicy, FAST, PREMIUM
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TIERS = {
+    "openai": {FAST: "openai/mini", "standard": "openai/std", PREMIUM: "openai/big"},
+    "anthropic": {FAST: "anthropic/haiku", "standard": "anthropic/sonnet", PREMIUM: "anthropic/opus"},
+}
+CALL_SITES = {"selection": FAST, "turn": "standard", "summary": PREMIUM}
+
+
+def test_call_sites_map_to_tiers():
+    """Control calls get the fast tier, content calls the premium one."""
+    policy = ModelRoutingPolicy(CALL_SITES, TIERS, default_provider="openai")
+    assert policy.model_for("selection") == "openai/mini"
+    assert policy.model_for("turn") == "openai/std"
+    assert policy.model_for("summary") == "openai/big"
+
+
+def test_agent_model_is_honoured():
+    """A stored provider picks that provider's tier model; a full model string wins outright."""
+    policy = ModelRoutingPolicy(CALL_SITES, TIERS, default_provider="openai")
+    assert policy.model_for("turn", {"model": "anthropic"}) == "anthropic/sonnet"
+    assert policy.model_for("turn", {"model": "mistral/mistral-large-latest"}) == "mistral/mistral-large-latest"
+    assert policy.model_for("turn", {"model": None}) == "openai/std"
+
+
+def test_meeting_overrides():
+    """Per-meeting overrides change tiers or pin models without touching the deployment policy."""
+    policy = ModelRoutingPolicy(CALL_SITES, TIERS, default_provider="openai")
+    meeting = policy.with_overrides({"turn": PREMIUM, "selection": "openai/pinned"})
+    assert meeting.model_for("turn") == "openai/big"
+    assert meeting.model_for("selection") == "openai/pinned"
+    assert policy.model_for("turn") == "openai/std"
+
+    economy = policy.with_overrides("economy")
+    assert economy.model_for("turn") == "openai/mini"
+    assert policy.with_overrides(None) is policy
+
+
+def test_client_accepts_full_model_strings():
+    """LLMClient sends routed model strings as is, on the model's own provider."""
+    client = LLMClient()
+    for provider in (LLMProvider.OPENAI, LLMProvider.ANTHROPIC):
+        client.providers[provider]["is_available"] = True
+    seen = []
+
+    async def fake_acompletion(model, messages, **kwargs):
+        seen.append(model)
+        raise RuntimeError("stop here")
+
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = fake_acompletion
+    try:
+        provider, full_model = client._resolve_model(LLMProvider.OPENAI, "anthropic/claude-3-haiku-20240307")
+        assert provider == LLMProvider.ANTHROPIC and full_model == "anthropic/claude-3-haiku-20240307"
+        try:
+            asyncio.run(client.generate_response(LLMProvider.OPENAI, [], model="openai/gpt-4o-mini"))
+        except RuntimeError:
+            pass
+    finally:
+        llm_client_module.acompletion = original
+    assert seen[0] == "openai/gpt-4o-mini"
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_call_sites_map_to_tiers,
+        test_agent_model_is_honoured,
+        test_meeting_overrides,
+        test_client_accepts_full_model_strings,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
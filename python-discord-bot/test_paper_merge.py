@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for cross-source paper deduplication (paper_merge.py).
+"""
+
+import logging
+from paper_merge import merge_papers, rank_papers, paper_keys
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PUBMED_PAPER = {
+    "title": "Deep Learning for T-Cell Receptor Specificity",
+    "authors": "A. Smith, B. Jones",
+    "date": "2024-01-02",
+    "abstract": "Short abstract.",
+    "doi": "10.1000/tcr.2024.1",
+}
+
+S2_PAPER = {
+    "title": "Deep learning for T-cell receptor specificity.",
+    "abstract": "A much longer abstract describing the T-cell receptor model in detail.",
+    "externalIds": {"DOI": "10.1000/TCR.2024.1", "ArXiv": "2401.01234"},
+}
+
+ARXIV_PAPER = {
+    "title": "Deep Learning for T Cell Receptor Specificity",
+    "authors": "A. Smith",
+    "date": "2024-01-01",
+    "abstract": "",
+    "doi": "10.48550/arXiv.2401.01234v2",
+}
+
+UNRELATED_PAPER = {
+    "title": "Protein folding with language models",
+    "abstract": "Protein structure prediction.",
+    "doi": "10.1000/fold.1",
+}
+
+
+def test_keys():
+    """DOIs are normalized and arXiv DOIs resolve to arXiv IDs."""
+    assert "doi:10.1000/tcr.2024.1" in paper_keys(S2_PAPER)
+    assert "arxiv:2401.01234" in paper_keys(ARXIV_PAPER)
+    assert not any(k.startswith("doi:") for k in paper_keys(ARXIV_PAPER))
+
+
+def test_merge_across_sources():
+    """The same paper from three sources collapses into one rich record."""
+    merged = merge_papers({
+        "pubmed": [PUBMED_PAPER, UNRELATED_PAPER],
+        "arxiv": [ARXIV_PAPER],
+        "semanticscholar": [S2_PAPER],
+    })
+    assert len(merged) == 2
+    paper = merged[0]
+    assert paper["sources"] == ["pubmed", "arxiv", "semanticscholar"]
+    assert paper["abstract"] == S2_PAPER["abstract"]
+    assert paper["authors"] == PUBMED_PAPER["authors"]
+    assert paper["doi"] == PUBMED_PAPER["doi"]
+    assert paper["externalIds"]["ArXiv"] == "2401.01234"
+
+
+def test_rank():
+    """Papers found by more sources and matching more keywords rank first."""
+    merged = merge_papers({
+        "pubmed": [UNRELATED_PAPER, PUBMED_PAPER],
+        "semanticscholar": [S2_PAPER],
+    })
+    ranked = rank_papers(merged, keywords=["T-cell receptor"])
+    assert ranked[0]["doi"] == PUBMED_PAPER["doi"]
+
+
+def main():
+    """Run all tests."""
+    for test in (test_keys, test_merge_across_sources, test_rank):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
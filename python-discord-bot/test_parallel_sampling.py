@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared PI opening of parallel runs (n>1 sampling).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMProvider
+from orchestrator import AgentOrchestrator, run_temperature
+from usage_ledger import record_usage, usage_ledger, usage_scope
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def fake_completion(requests):
+    async def fake_acompletion(model, messages, **kwargs):
+        requests.append((model, kwargs.get("temperature"), kwargs.get("n", 1)))
+        n = kwargs.get("n", 1)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(message=SimpleNamespace(content=f"t={kwargs['temperature']} #{i}"), finish_reason="stop")
+                for i in range(n)
+            ],
+            usage={"prompt_tokens": 100, "completion_tokens": 20 * n, "total_tokens": 100 + 20 * n},
+        )
+    return fake_acompletion
+
+
+def test_run_temperatures():
+    """Parallel runs are spread over a few temperature levels only when asked to."""
+    assert [run_temperature(i, 5, True) for i in range(5)] == [0.5, 0.5, 0.75, 0.75, 1.0]
+    assert [run_temperature(i, 2, True) for i in range(2)] == [0.5, 1.0]
+    assert {run_temperature(i, 5, False) for i in range(5)} == {1.0}
+    assert run_temperature(0, 1, True) == 1.0
+
+
+def sample(model, temperatures):
+    client = LLMClient()
+    for provider in (LLMProvider.OPENAI, LLMProvider.ANTHROPIC):
+        client.providers[provider]["is_available"] = True
+    requests = []
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = fake_completion(requests)
+    try:
+        replies = asyncio.run(client.sample_agent(
+            "principal_investigator", "Open the meeting.", temperatures, model=model
+        ))
+    finally:
+        llm_client_module.acompletion = original
+    return replies, requests
+
+
+def test_one_request_per_temperature():
+    """Models with `n` get one request per distinct temperature; replies keep the run order."""
+    replies, requests = sample("openai/gpt-4o", [0.5, 0.5, 1.0, 1.0, 1.0])
+    assert sorted((t, n) for _, t, n in requests) == [(0.5, 2), (1.0, 3)]
+    assert replies == ["t=0.5 #0", "t=0.5 #1", "t=1.0 #0", "t=1.0 #1", "t=1.0 #2"]
+
+
+def test_one_request_per_run_without_n():
+    """Models without `n` get a request per run, the first one alone (it warms the prefix cache)."""
+    replies, requests = sample("anthropic/claude-3-5-sonnet-20240620", [1.0, 1.0, 1.0])
+    assert [n for _, _, n in requests] == [1, 1, 1]
+    assert len(replies) == 3
+
+
+class SamplingLLM:
+    def __init__(self):
+        self.sample_calls = []
+        self.own_calls = []
+
+    async def sample_agent(self, temperatures, **kwargs):
+        self.sample_calls.append(temperatures)
+        await asyncio.sleep(0.01)
+        n = len(temperatures)
+        record_usage(kwargs["model"], {"prompt_tokens": 100, "completion_tokens": 20 * n, "total_tokens": 100 + 20 * n})
+        return [f"opening {i}" for i in range(len(temperatures))]
+
+    async def call_agent(self, **kwargs):
+        self.own_calls.append(kwargs["model"])
+        return f"own opening ({kwargs['model']})"
+
+
+OPENING_KWARGS = dict(
+    agent_key="principal_investigator", conversation_history=["Agenda", "Open the meeting."], model="openai/gpt-4o",
+)
+
+
+def parallel_group(orchestrator, count, group="g1"):
+    """Register `count` active runs of a parallel group, at temperatures 0.5 ... 1.0."""
+    runs = []
+    for i in range(count):
+        run = {
+            "id": f"{group}-m{i}", "parallel_group": group, "parallel_index": i, "total_parallel_meetings": count,
+            "temperature": run_temperature(i, count, True),
+        }
+        orchestrator.active_meetings[run["id"]] = run
+        runs.append(run)
+    return runs
+
+
+def opening(orchestrator, run, **overrides):
+    return orchestrator._shared_opening(run, {**OPENING_KWARGS, "temperature": run["temperature"], **overrides})
+
+
+def test_parallel_runs_share_the_opening():
+    """All runs of a parallel group get their own sample from a single sample_agent call."""
+    llm = SamplingLLM()
+    orchestrator = AgentOrchestrator(llm)
+    runs = parallel_group(orchestrator, 3)
+
+    async def run_all():
+        return await asyncio.gather(*(opening(orchestrator, run) for run in runs))
+
+    openings = asyncio.run(run_all())
+    assert openings == ["opening 0", "opening 1", "opening 2"]
+    assert llm.sample_calls == [[0.5, 0.75, 1.0]] and llm.own_calls == []
+    assert orchestrator.shared_openings == {}
+
+
+def test_missing_late_and_diverging_runs():
+    """Nothing is left behind for a run that never arrives; a late run gets its sample, a diverging run one call."""
+    llm = SamplingLLM()
+    orchestrator = AgentOrchestrator(llm)
+    runs = parallel_group(orchestrator, 4)
+
+    async def run_all():
+        # Run 3 never gets to its opening; run 2 arrives with a downgraded model
+        shared = await asyncio.gather(opening(orchestrator, runs[0]), opening(orchestrator, runs[2], model="openai/gpt-4o-mini"))
+        assert orchestrator.shared_openings == {}
+        late = await opening(orchestrator, runs[1])
+        return shared, late
+
+    (first, diverged), late = asyncio.run(run_all())
+    assert (first, late) == ("opening 0", "opening 1")
+    assert diverged == "own opening (openai/gpt-4o-mini)"
+    assert llm.sample_calls == [[0.5, 0.5, 0.75, 1.0]] and llm.own_calls == ["openai/gpt-4o-mini"]
+    assert orchestrator.shared_openings == {}
+
+
+def test_shared_opening_is_billed_to_every_run():
+    """The group's samples are split evenly between its runs' meetings, not billed to the first run."""
+    llm = SamplingLLM()
+    orchestrator = AgentOrchestrator(llm)
+    runs = parallel_group(orchestrator, 3, group="g-billing")
+
+    async def run_opening(run):
+        with usage_scope(meeting_id=run["id"], session_id="s-billing"):
+            return await opening(orchestrator, run)
+
+    async def run_all():
+        return await asyncio.gather(*(run_opening(run) for run in runs))
+
+    asyncio.run(run_all())
+    totals = [usage_ledger.totals_for("meeting", run["id"]) for run in runs]
+    assert [t.total_tokens for t in totals] == [54, 53, 53]
+    assert [t.calls for t in totals] == [1, 0, 0]
+    assert totals[0].cost_usd > 0 and len({round(t.cost_usd, 9) for t in totals}) == 1
+    assert usage_ledger.totals_for("session", "s-billing").total_tokens == 160
+    assert ("meeting", "g-billing:opening") not in usage_ledger.totals
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_run_temperatures,
+        test_one_request_per_temperature,
+        test_one_request_per_run_without_n,
+        test_parallel_runs_share_the_opening,
+        test_missing_late_and_diverging_runs,
+        test_shared_opening_is_billed_to_every_run,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
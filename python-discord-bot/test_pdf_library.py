@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental library ingest (pdf_library.py).
+"""
+
+import os
+import logging
+import tempfile
+
+import pdf_library
+from pdf_library import PdfLibrary
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_incremental_ingest():
+    """Only new or changed files are embedded; removed files drop out of search."""
+    original_backend = pdf_library.LIBRARY_EMBEDDING_BACKEND
+    pdf_library.LIBRARY_EMBEDDING_BACKEND = "hashing"
+    try:
+        with tempfile.TemporaryDirectory() as library_dir:
+            write(os.path.join(library_dir, "tcell.txt"), "T cell exhaustion markers in CAR-T therapy\nPD-1 and TIM-3.")
+            write(os.path.join(library_dir, "folding.md"), "# Protein folding with language models\nStructure.")
+            library = PdfLibrary(library_dir)
+
+            stats = library.ingest()
+            assert (stats["added"], stats["chunks"]) == (2, 2)
+            assert library.ingest()["unchanged"] == 2
+
+            # Same content, new mtime: hashed but not re-embedded
+            os.utime(os.path.join(library_dir, "tcell.txt"), (1, 1))
+            stats = library.ingest()
+            assert (stats["unchanged"], stats["chunks"]) == (2, 0)
+
+            write(os.path.join(library_dir, "folding.md"), "# Gut microbiome and diet\nMetagenomics.")
+            stats = library.ingest()
+            assert (stats["updated"], stats["chunks"]) == (1, 1)
+            assert library.store.count == 3  # the old folding chunk is a tombstone
+
+            titles = [hit["title"] for hit in library.search("protein folding structure", k=5)]
+            assert "Protein folding with language models" not in titles
+
+            os.remove(os.path.join(library_dir, "tcell.txt"))
+            assert library.ingest()["removed"] == 1
+            hits = library.search("T cell exhaustion", k=5)
+            assert [hit["file"] for hit in hits] == ["folding.md"]
+    finally:
+        pdf_library.LIBRARY_EMBEDDING_BACKEND = original_backend
+
+
+def test_compact():
+    """Compaction drops tombstoned rows and keeps search results intact."""
+    original_backend = pdf_library.LIBRARY_EMBEDDING_BACKEND
+    pdf_library.LIBRARY_EMBEDDING_BACKEND = "hashing"
+    try:
+        with tempfile.TemporaryDirectory() as library_dir:
+            write(os.path.join(library_dir, "a.txt"), "Single-cell RNA sequencing of tumour infiltrates")
+            write(os.path.join(library_dir, "b.txt"), "CRISPR screening in primary human T cells")
+            library = PdfLibrary(library_dir)
+            library.ingest()
+            write(os.path.join(library_dir, "a.txt"), "Spatial transcriptomics of lymph nodes")
+            library.ingest()
+
+            library.compact()
+            assert library.store.count == 2
+            assert library.search("CRISPR screening T cells", k=1)[0]["file"] == "b.txt"
+    finally:
+        pdf_library.LIBRARY_EMBEDDING_BACKEND = original_backend
+
+
+def main():
+    """Run all tests."""
+    for test in (test_incremental_ingest, test_compact):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
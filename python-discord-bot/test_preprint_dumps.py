@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental preprint dump ingest (preprint_dumps.py).
+"""
+
+import json
+import logging
+import tempfile
+
+import preprint_dumps
+from preprint_dumps import DumpIndex, get_dump_index, ingest_records, load_doi_index, load_manifest, dump_path
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def make_record(doi, title, date="2025-03-12"):
+    return {"title": title, "doi": doi, "authors": "A. Author", "abstract": f"About {title}.",
+            "date": date, "journal": "bioRxiv"}
+
+
+def in_dump_dir(body):
+    """Run `body()` with the dumps in a fresh temporary directory."""
+    saved = preprint_dumps.SERVER_DUMPS_DIR
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            preprint_dumps.SERVER_DUMPS_DIR = tmp_dir
+            return body()
+    finally:
+        preprint_dumps.SERVER_DUMPS_DIR = saved
+
+
+def test_ingest_deduplicates():
+    """Records are appended once per DOI, and the manifest tracks the last date."""
+    def body():
+        stats = ingest_records("biorxiv", [
+            make_record("10.1101/2025.03.01.1", "First"),
+            make_record("10.1101/2025.03.01.2", "Second", date="2025-03-13"),
+            make_record(None, "No DOI"),
+        ])
+        assert stats == {"added": 2, "duplicates": 0, "invalid": 1}
+
+        stats = ingest_records("biorxiv", [
+            make_record("https://doi.org/10.1101/2025.03.01.1", "First again"),
+            make_record("10.1101/2025.03.01.3", "Third"),
+        ])
+        assert stats == {"added": 1, "duplicates": 1, "invalid": 0}
+
+        path = dump_path("biorxiv")
+        with open(path) as f:
+            titles = [json.loads(line)["title"] for line in f]
+        assert titles == ["First", "Second", "Third"]
+        assert len(load_doi_index(path)) == 3
+        assert load_manifest()["biorxiv"]["last_date"] == "2025-03-13"
+
+    in_dump_dir(body)
+
+
+def test_dump_index_follows_appends():
+    """A loaded DumpIndex picks up ingested records without re-reading the dump, and the Tool Agent searches it."""
+    from tool_agent_file import function_to_call
+
+    def body():
+        ingest_records("biorxiv", [make_record("10.1101/2025.03.01.1", "CAR-T cells in solid tumors")])
+        index = DumpIndex(dump_path("biorxiv"))
+        assert index.refresh() == 1 and index.refresh() == 0
+        offset = index.offset
+
+        ingest_records("biorxiv", [
+            make_record("10.1101/2025.03.01.2", "Armored CAR-T cells", date="2025-03-13"),
+            make_record("10.1101/2025.03.01.3", "Gut microbiome and sleep"),
+        ])
+        assert index.refresh() == 2 and index.offset > offset
+        assert list(index.querier.df["date"]) == ["2025-03-12", "2025-03-13", "2025-03-12"]
+        hits = index.search_keywords(["car-t"], fields=["title"])
+        assert sorted(hits["title"]) == ["Armored CAR-T cells", "CAR-T cells in solid tumors"]
+
+        papers = function_to_call["bioarxiv"]("(CAR-T) AND (solid tumors)")
+        assert [paper["title"] for paper in papers] == ["CAR-T cells in solid tumors"]
+        assert get_dump_index("biorxiv").path == dump_path("biorxiv")
+
+    in_dump_dir(body)
+
+
+def main():
+    """Run all tests."""
+    for test in (test_ingest_deduplicates, test_dump_index_follows_appends):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the cache-friendly prompt layout (prompt_cache.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from litellm.types.utils import Usage
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from prompt_cache import conversation_messages, split_history, to_litellm_messages, usage_dict
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_prefix_stays_stable_as_history_grows():
+    """Earlier segments are byte-identical between calls; only the last one changes."""
+    history = "Agenda: CAR-T\n\n"
+    checkpoints = [len(history)]
+    history += "[PI (Opening)]: Welcome.\n"
+    checkpoints.append(len(history))
+    first = split_history(history + "[Biologist]: A.", checkpoints)
+    second = split_history(history + "[Biologist]: A.\n[Chemist]: B.", checkpoints, "\nSynthesize.")
+
+    assert first[:-1] == second[:-1] == ["Agenda: CAR-T\n\n", "[PI (Opening)]: Welcome.\n"]
+    assert "".join(second) == history + "[Biologist]: A.\n[Chemist]: B.\nSynthesize."
+    assert split_history("short", [100]) == ["short"]
+
+
+def test_cache_markers_only_where_needed():
+    """Anthropic gets cache_control on the system prompt and the end of the prefix; OpenAI plain text."""
+    messages = [LLMMessage(role="system", content="You are a PI.")] + conversation_messages(["agenda", "round 1", "now"])
+    assert [m.cache for m in messages] == [False, False, True, False]
+
+    anthropic = to_litellm_messages(messages, "anthropic/claude-3-5-sonnet-20240620")
+    assert anthropic[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert anthropic[2]["content"][0] == {"type": "text", "text": "round 1", "cache_control": {"type": "ephemeral"}}
+    assert anthropic[3]["content"] == "now"
+
+    openai = to_litellm_messages(messages, "openai/gpt-4o")
+    assert all(isinstance(m["content"], str) for m in openai)
+
+
+def test_cached_tokens_reported():
+    """Cache reads and writes are reported alongside the usual token counts."""
+    usage = Usage(
+        prompt_tokens=1200, completion_tokens=50, total_tokens=1250,
+        prompt_tokens_details={"cached_tokens": 1024}, cache_creation_input_tokens=0,
+    )
+    assert usage_dict(usage)["cached_tokens"] == 1024
+    assert usage_dict({"prompt_tokens": 3})["cached_tokens"] == 0
+
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    calls = []
+
+    async def acompletion(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = acompletion
+    try:
+        response = asyncio.run(client.generate_response(
+            LLMProvider.OPENAI,
+            [LLMMessage(role="system", content="sys")] + conversation_messages(["agenda", "now"]),
+            model="openai/gpt-4o",
+        ))
+    finally:
+        llm_client_module.acompletion = original
+    assert response.usage["cached_tokens"] == 1024
+    assert [m["content"] for m in calls[0]["messages"]] == ["sys", "agenda", "now"]
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_prefix_stays_stable_as_history_grows,
+        test_cache_markers_only_where_needed,
+        test_cached_tokens_reported,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for adaptive max_tokens (reply_budget.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMProvider
+from reply_budget import ReplyBudgets, DEFAULT_MAX_TOKENS, REPLY_TOKEN_FLOOR, reply_budgets
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_defaults_until_enough_samples():
+    """The fixed default applies until min_samples replies have been seen."""
+    budgets = ReplyBudgets(min_samples=5, caps={"scientist": 1000})
+    for _ in range(4):
+        budgets.observe("scientist", 100)
+    assert budgets.max_tokens("scientist") == DEFAULT_MAX_TOKENS["scientist"]
+    budgets.observe("scientist", 100)
+    assert budgets.max_tokens("scientist") == 120
+
+
+def test_percentile_floor_and_cap():
+    """The limit follows the percentile with headroom, within the floor and the cap."""
+    budgets = ReplyBudgets(percentile=0.95, headroom=1.0, min_samples=1, caps={"scientist": 400, "selection": 300})
+    for length in range(1, 101):
+        budgets.observe("scientist", length * 3)
+    assert budgets.max_tokens("scientist") == 285
+    budgets.observe("selection", 10)
+    assert budgets.max_tokens("selection") == REPLY_TOKEN_FLOOR
+    for _ in range(50):
+        budgets.observe("scientist", 900)
+    assert budgets.max_tokens("scientist") == 400
+
+
+def test_truncated_replies_raise_the_limit():
+    """A reply cut off at its limit counts as longer than the limit."""
+    budgets = ReplyBudgets(percentile=0.5, headroom=1.0, min_samples=1, caps={"summary_agent": 2000})
+    budgets.observe("summary_agent", 200, limit=200, finish_reason="length")
+    assert budgets.max_tokens("summary_agent") == 300
+
+
+def test_call_agent_uses_learned_limit():
+    """call_agent requests the learned max_tokens and the transcript stop sequences."""
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    seen = []
+
+    async def fake_acompletion(model, messages, **kwargs):
+        seen.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"), finish_reason="stop")],
+            usage={"prompt_tokens": 10, "completion_tokens": 40, "total_tokens": 50},
+        )
+
+    original_budgets = llm_client_module.reply_budgets
+    original = llm_client_module.acompletion
+    llm_client_module.reply_budgets = ReplyBudgets(headroom=1.0, min_samples=1)
+    llm_client_module.acompletion = fake_acompletion
+    try:
+        for _ in range(2):
+            asyncio.run(client.call_agent("scientist", "Discuss.", model="openai/gpt-4o"))
+    finally:
+        llm_client_module.acompletion = original
+        llm_client_module.reply_budgets = original_budgets
+    assert seen[0]["max_tokens"] == DEFAULT_MAX_TOKENS["scientist"]
+    assert seen[1]["max_tokens"] == REPLY_TOKEN_FLOOR
+    assert "\n=== ROUND" in seen[1]["stop"]
+    assert reply_budgets is original_budgets
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_defaults_until_enough_samples,
+        test_percentile_floor_and_cap,
+        test_truncated_replies_raise_the_limit,
+        test_call_agent_uses_learned_limit,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
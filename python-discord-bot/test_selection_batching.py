@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for batched speaker selection across concurrent meetings (selection_batcher.py).
+"""
+
+import json
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMProvider
+from selection_batcher import SelectionBatcher, batch_decision_schema
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MODEL = "openai/gpt-4o-mini"
+MEETINGS = {
+    "m1": ["Scientist 1", "Scientific Critic"],
+    "m2": ["Scientist 2"],
+    "m3": ["Scientist 1", "Scientist 3"],
+}
+
+
+def fake_completion(calls, skip=()):
+    """Answers a batch prompt with the last agent of every meeting it mentions (except `skip`)."""
+    async def fake_acompletion(model, messages, **kwargs):
+        prompt = messages[-1]["content"] if isinstance(messages[-1]["content"], str) else ""
+        calls.append(prompt)
+        decisions = [
+            {"meeting_id": meeting_id, "agent": agents[-1], "rationale": "batched"}
+            for meeting_id, agents in MEETINGS.items()
+            if f"### Meeting {meeting_id}\n" in prompt and meeting_id not in skip
+        ]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"decisions": decisions})), finish_reason="stop")],
+            usage={"prompt_tokens": 300, "completion_tokens": 60, "total_tokens": 360},
+        )
+    return fake_acompletion
+
+
+def run_selections(meetings, skip=(), window_ms=20):
+    """Select concurrently for each meeting; select_alone records which meetings fell back."""
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    calls, alone = [], []
+
+    def select_alone_for(meeting_id):
+        async def select_alone():
+            alone.append(meeting_id)
+            return SimpleNamespace(agent=MEETINGS[meeting_id][0], rationale="alone")
+        return select_alone
+
+    async def run():
+        batcher = SelectionBatcher(client, window_ms=window_ms, max_batch=8)
+        return await asyncio.gather(*(
+            batcher.select(meeting_id, MODEL, MEETINGS[meeting_id], f"Transcript of {meeting_id}", select_alone_for(meeting_id))
+            for meeting_id in meetings
+        ))
+
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = fake_completion(calls, skip)
+    try:
+        choices = asyncio.run(run())
+    finally:
+        llm_client_module.acompletion = original
+    return choices, calls, alone
+
+
+def test_schema_restricts_agents_per_meeting():
+    """A decision must name one of its own meeting's agents."""
+    schema = batch_decision_schema(MEETINGS)
+    schema.model_validate({"decisions": [{"meeting_id": "m2", "agent": "Scientist 2", "rationale": ""}]})
+    try:
+        schema.model_validate({"decisions": [{"meeting_id": "m2", "agent": "Scientist 1", "rationale": ""}]})
+    except Exception:
+        pass
+    else:
+        raise AssertionError("m2 cannot choose Scientist 1")
+
+
+def test_concurrent_selections_share_one_call():
+    """Meetings selecting within the window are decided in one call and get their own decision back."""
+    choices, calls, alone = run_selections(["m1", "m2", "m3"])
+    assert len(calls) == 1
+    assert [c.agent for c in choices] == ["Scientific Critic", "Scientist 2", "Scientist 3"]
+    assert alone == []
+
+
+def test_missing_decisions_fall_back():
+    """A meeting the batch reply left out selects on its own."""
+    choices, calls, alone = run_selections(["m1", "m2", "m3"], skip=("m2",))
+    assert len(calls) == 1
+    assert alone == ["m2"]
+    assert [c.rationale for c in choices] == ["batched", "alone", "batched"]
+
+
+def test_single_request_is_not_batched():
+    """A request alone in its window makes the meeting's normal call."""
+    choices, calls, alone = run_selections(["m1"])
+    assert calls == [] and alone == ["m1"]
+    assert choices[0].agent == "Scientist 1"
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_schema_restricts_agents_per_meeting,
+        test_concurrent_selections_share_one_call,
+        test_missing_decisions_fall_back,
+        test_single_request_is_not_batched,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script for schema-validated JSON output (structured_output.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import litellm
+from pydantic import ValidationError
+
+import llm_client as llm_client_module
+from llm_client import LLMClient, ScientistVariables
+from models import LLMMessage, LLMProvider
+from orchestrator import speaker_choice_schema
+from structured_output import StructuredOutputError, parse_structured
+from tool_agent_file import LiteratureQuery, search_literature
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def fake_acompletion(replies):
+    """Replacement for litellm.acompletion returning the given replies in turn."""
+    calls = []
+
+    async def acompletion(**kwargs):
+        calls.append(kwargs)
+        content = replies[min(len(calls), len(replies)) - 1]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage={})
+
+    return acompletion, calls
+
+
+def run_structured(replies, schema):
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+    acompletion, calls = fake_acompletion(replies)
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = acompletion
+    try:
+        try:
+            result = asyncio.run(client.generate_structured(
+                LLMProvider.OPENAI, [LLMMessage(role="user", content="Pick someone")], schema, model="openai/gpt-4o"
+            ))
+        except StructuredOutputError as e:
+            result = e
+    finally:
+        llm_client_module.acompletion = original
+    return result, calls
+
+
+def test_parse_tolerates_fences():
+    """Fenced or prose-wrapped JSON still validates; wrong shapes do not."""
+    text = 'Sure:\n```json\n{"agent_name": "Geologist", "expertise": "rocks", "goal": "dig"}\n```'
+    assert parse_structured(text, ScientistVariables).agent_name == "Geologist"
+    try:
+        parse_structured('{"expertise": "rocks"}', ScientistVariables)
+        assert False, "expected a validation error"
+    except ValidationError:
+        pass
+
+
+def test_speaker_schema_restricts_agents():
+    """The selection schema only accepts agents who may speak."""
+    schema = speaker_choice_schema(["Biologist", "Chemist"])
+    assert schema.model_json_schema()["properties"]["agent"]["enum"] == ["Biologist", "Chemist"]
+    try:
+        schema(agent="Physicist", rationale="x")
+        assert False, "expected a validation error"
+    except ValidationError:
+        pass
+
+
+def test_one_repair_attempt():
+    """An invalid reply is repaired once, at temperature 0, with the schema requested natively."""
+    schema = speaker_choice_schema(["Biologist", "Chemist"])
+    result, calls = run_structured(
+        ['{"agent": "Physicist", "rationale": "x"}', '{"agent": "Chemist", "rationale": "fixed"}'], schema
+    )
+    assert result.agent == "Chemist" and result.rationale == "fixed"
+    assert len(calls) == 2
+    assert calls[0]["response_format"]["type"] == "json_schema"
+    assert calls[1]["temperature"] == 0
+    assert calls[1]["messages"][-2]["role"] == "assistant"
+    assert "agent" in calls[1]["messages"][-1]["content"]
+
+
+def test_gives_up_after_repair():
+    """A reply that is still invalid after the repair raises StructuredOutputError."""
+    result, calls = run_structured(["not json at all"], ScientistVariables)
+    assert isinstance(result, StructuredOutputError)
+    assert result.raw_output == "not json at all"
+    assert len(calls) == 2
+
+
+def test_literature_query_needs_a_source():
+    """An empty source list is invalid, so the Tool Agent never searches nothing."""
+    assert parse_structured('{"resource": "pubmed", "keywords": ["SCD1"]}', LiteratureQuery).resource == "pubmed"
+    assert parse_structured('{"resource": ["pubmed", "arxiv"], "keywords": ["SCD1"]}', LiteratureQuery).resource == [
+        "pubmed", "arxiv"
+    ]
+    try:
+        parse_structured('{"resource": [], "keywords": ["SCD1"]}', LiteratureQuery)
+        assert False, "expected a validation error"
+    except ValidationError:
+        pass
+
+    calls = []
+
+    def fake_completion(messages, **kwargs):
+        calls.append(messages)
+        reply = '{"resource": [], "keywords": ["SCD1"]}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage={})
+
+    original = litellm.completion
+    litellm.completion = fake_completion
+    try:
+        assert search_literature("[Immunologist]: What do we know about SCD1?") is None
+    finally:
+        litellm.completion = original
+    assert len(calls) == 2
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_parse_tolerates_fences,
+        test_speaker_schema_restricts_agents,
+        test_one_repair_attempt,
+        test_gives_up_after_repair,
+        test_literature_query_needs_a_source,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for recording and replaying LLM traffic (traffic_log.py), with the offline simulator as the "provider".
+"""
+
+import json
+import time
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from llm_simulator import PROFILES, LatencyProfile, llm_simulator
+from orchestrator import speaker_choice_schema
+from traffic_log import ReplayMiss, load_meetings, traffic_log
+from usage_ledger import usage_scope
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TOPIC = "The user wants to discuss: CAR-T therapy for solid tumors\n\n"
+CRITIC = [LLMMessage(role="system", content="You are a Scientific Critic."), LLMMessage(role="user", content=TOPIC + "Your turn.")]
+
+
+def with_log(body, **settings):
+    """Run `body(record_dir)` with a fresh traffic log and an instant simulator behind it."""
+    saved_log, saved_simulator = dict(traffic_log.__dict__), dict(llm_simulator.__dict__)
+    traffic_log._entries, traffic_log.hits, traffic_log.misses = {}, 0, 0
+    llm_simulator.enabled = True
+    llm_simulator.profile = PROFILES["instant"]
+    for name, value in settings.items():
+        setattr(traffic_log, name, value)
+    try:
+        with tempfile.TemporaryDirectory() as record_dir:
+            return body(record_dir)
+    finally:
+        traffic_log.__dict__.update(saved_log)
+        llm_simulator.__dict__.update(saved_simulator)
+
+
+async def meeting_calls(client):
+    """A plain call, a streamed call and a structured call, as a meeting makes them."""
+    reply = await client.generate_response(LLMProvider.OPENAI, CRITIC, model="openai/gpt-4o", max_tokens=20)
+    stream = client.stream_response(LLMProvider.OPENAI, CRITIC, model="openai/gpt-4o", temperature=0.3)
+    streamed = "".join([delta async for delta in stream])
+    choice = await client.generate_structured(
+        LLMProvider.OPENAI, [LLMMessage(role="user", content=TOPIC + "Who speaks next?")],
+        schema=speaker_choice_schema(["Immunologist", "Scientific Critic"]), model="openai/gpt-4o",
+    )
+    return reply.content, streamed, choice.agent, choice.rationale
+
+
+def record(record_dir, meeting_id="m1"):
+    traffic_log.record_dir = record_dir
+    with usage_scope(meeting_id=meeting_id, session_id="s1"):
+        traffic_log.record_meeting(meeting_id, {"meeting_id": meeting_id, "session_id": "s1", "agenda": "CAR-T"})
+        outcome = asyncio.run(meeting_calls(LLMClient()))
+    traffic_log.record_dir = ""
+    return outcome
+
+
+def test_record_per_meeting():
+    """Every call of a meeting lands in its log, with its kind, key, timing and response."""
+    def body(record_dir):
+        content, streamed, agent, _ = record(record_dir)
+        lines = [json.loads(line) for line in (Path(record_dir) / "m1.jsonl").read_text().splitlines()]
+        assert [entry["kind"] for entry in lines] == ["meeting", "chat", "stream", "chat"]
+        assert lines[1]["response"]["choices"] == [content] and lines[1]["model"] == "openai/gpt-4o"
+        assert lines[2]["response"]["choices"] == [streamed] and lines[2]["ttft_ms"] <= lines[2]["ms"]
+        assert agent in lines[3]["response"]["choices"][0] and lines[3]["key"] != lines[1]["key"]
+        assert all("request" not in entry for entry in lines[1:])
+        assert load_meetings(record_dir)[0]["agenda"] == "CAR-T"
+
+    with_log(body)
+
+
+def test_replay_serves_recorded_responses():
+    """With the provider gone, the same calls get the recorded responses."""
+    def body(record_dir):
+        recorded = record(record_dir)
+        llm_simulator.enabled = False
+        traffic_log.load(record_dir)
+        replayed = asyncio.run(meeting_calls(LLMClient()))
+        assert replayed == recorded
+        assert (traffic_log.hits, traffic_log.misses) == (3, 0)
+
+        async def unrecorded(client):
+            await client.generate_response(LLMProvider.OPENAI, CRITIC, model="openai/gpt-4o", temperature=0.9)
+        try:
+            asyncio.run(unrecorded(LLMClient()))
+            assert False, "expected a replay miss"
+        except Exception as e:
+            assert "not in the replayed traffic" in str(e)
+
+    with_log(body, on_miss="error")
+
+
+def test_replay_latency_scale():
+    """Replies take the recorded time, times the scale."""
+    def body(record_dir):
+        llm_simulator.profile = LatencyProfile(300, 1000, jitter=0)
+        record(record_dir)
+        llm_simulator.enabled = False
+        traffic_log.load(record_dir)
+        entries = [entry for queue in traffic_log._entries.values() for entry in queue]
+        assert len(entries) == 3 and all(entry["ms"] >= 300 for entry in entries)
+        assert traffic_log.delay(entries[0]["ms"]) == entries[0]["ms"] / 1000
+        traffic_log.latency_scale = 0.5
+        assert traffic_log.delay(entries[0]["ms"]) == entries[0]["ms"] / 2000
+        traffic_log.latency_scale = 0
+        assert all(traffic_log.delay(entry["ms"]) == 0 for entry in entries)
+
+        traffic_log.latency_scale = 1
+        client = LLMClient()
+        start = time.perf_counter()
+        asyncio.run(client.generate_response(LLMProvider.OPENAI, CRITIC, model="openai/gpt-4o", max_tokens=20))
+        assert time.perf_counter() - start >= 0.3
+
+    with_log(body)
+
+
+def test_tool_steps():
+    """Tool Agent steps are recorded, replayed without running, and run live when unrecorded."""
+    def body(record_dir):
+        calls = []
+
+        def search():
+            calls.append("search")
+            return [{"title": "Armored CAR-T cells", "year": 2024}]
+
+        traffic_log.record_dir = record_dir
+        with usage_scope(meeting_id="m2"):
+            papers = traffic_log.tool_call("search", {"resource": "arxiv", "query": "CAR-T"}, search)
+        traffic_log.record_dir = ""
+        traffic_log.load(record_dir)
+        assert traffic_log.tool_call("search", {"resource": "arxiv", "query": "CAR-T"}, search) == papers
+        assert calls == ["search"]
+        assert traffic_log.tool_call("search", {"resource": "pubmed", "query": "CAR-T"}, search) == papers
+        assert calls == ["search", "search"]
+        traffic_log.on_miss = "error"
+        try:
+            traffic_log.tool_call("search", {"resource": "pubmed", "query": "TIL"}, search)
+            assert False, "expected a replay miss"
+        except ReplayMiss:
+            pass
+
+    with_log(body, latency_scale=0)
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_record_per_meeting,
+        test_replay_serves_recorded_responses,
+        test_replay_latency_scale,
+        test_tool_steps,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
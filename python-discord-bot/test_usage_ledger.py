@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for per-meeting usage accounting and budgets (usage_ledger.py).
+"""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import llm_client as llm_client_module
+from llm_client import LLMClient
+from models import LLMMessage, LLMProvider
+from model_routing import ModelRoutingPolicy, FAST
+from usage_ledger import (
+    Budget, UsageLedger, UsageScope, BUDGET_OK, BUDGET_DOWNGRADE, BUDGET_EXHAUSTED,
+    bind_usage_scope, current_scope, usage_ledger, usage_scope,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+USAGE = {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}
+
+
+def test_scope_follows_tasks_and_threads():
+    """Calls made from tasks and worker threads are billed to the scope that started them."""
+    ledger = UsageLedger()
+
+    async def background_call():
+        ledger.record("openai/gpt-4o-mini", USAGE)
+
+    async def meeting():
+        bind_usage_scope(meeting_id="m1", session_id="s1", user_id=42)
+        await asyncio.gather(
+            asyncio.to_thread(ledger.record, "openai/gpt-4o-mini", USAGE),
+            asyncio.create_task(background_call()),
+        )
+
+    asyncio.run(meeting())
+    assert ledger.totals_for("meeting", "m1").total_tokens == 300
+    assert ledger.totals_for("session", "s1").calls == 2
+    assert ledger.totals_for("user", "42").cost_usd > 0
+    # The binding did not leak out of the meeting's task
+    assert current_scope().meeting_id is None
+
+    with usage_scope(meeting_id="m2"):
+        ledger.record("openai/gpt-4o-mini", USAGE)
+    assert ledger.totals_for("meeting", "m2").to_record()["byModel"]["openai/gpt-4o-mini"]["calls"] == 1
+
+
+def test_budget_status_transitions():
+    """A meeting budget moves from ok to downgrade to exhausted."""
+    ledger = UsageLedger()
+    scope = UsageScope(meeting_id="m1")
+    budget = Budget(max_tokens=1000)
+    assert ledger.budget_status(scope, budget) == BUDGET_OK
+    for _ in range(6):
+        ledger.record("openai/gpt-4o-mini", USAGE, scope)
+    assert ledger.budget_status(scope, budget) == BUDGET_DOWNGRADE
+    ledger.record("openai/gpt-4o-mini", USAGE, scope)
+    assert ledger.budget_status(scope, budget) == BUDGET_EXHAUSTED
+    # Other meetings are unaffected
+    assert ledger.budget_status(UsageScope(meeting_id="m2"), budget) == BUDGET_OK
+
+
+def test_forced_tier_downgrades_pinned_models():
+    """Forcing the fast tier replaces an agent's pinned model with its provider's fast model."""
+    policy = ModelRoutingPolicy(
+        {"turn": "standard"},
+        {"openai": {FAST: "openai/mini", "standard": "openai/std"},
+         "anthropic": {FAST: "anthropic/haiku", "standard": "anthropic/sonnet"}},
+        default_provider="openai",
+    )
+    assert policy.model_for("turn", {"model": "anthropic/claude-3-opus"}) == "anthropic/claude-3-opus"
+    assert policy.model_for("turn", {"model": "anthropic/claude-3-opus"}, tier=FAST) == "anthropic/haiku"
+    assert policy.model_for("turn", tier=FAST) == "openai/mini"
+
+
+def test_client_records_usage():
+    """LLMClient completions are recorded against the current meeting."""
+    client = LLMClient()
+    client.providers[LLMProvider.OPENAI]["is_available"] = True
+
+    async def fake_acompletion(model, messages, **kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))],
+            usage=SimpleNamespace(**USAGE),
+        )
+
+    original = llm_client_module.acompletion
+    llm_client_module.acompletion = fake_acompletion
+    try:
+        with usage_scope(meeting_id="client-test"):
+            asyncio.run(client.generate_response(
+                LLMProvider.OPENAI, [LLMMessage(role="user", content="hi")], model="openai/gpt-4o-mini"
+            ))
+    finally:
+        llm_client_module.acompletion = original
+    totals = usage_ledger.totals_for("meeting", "client-test")
+    assert totals.calls == 1 and totals.prompt_tokens == 100 and totals.completion_tokens == 50
+
+
+def main():
+    """Run all tests."""
+    for test in (
+        test_scope_follows_tasks_and_threads,
+        test_budget_status_transitions,
+        test_forced_tier_downgrades_pinned_models,
+        test_client_records_usage,
+    ):
+        test()
+        logger.info(f"✅ {test.__name__} passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,29 +3,42 @@
 import os
 import sys
 import re
-import json
+import time
 import logging
+import contextvars
 from pathlib import Path
+from typing import Annotated, List, Optional, Union
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # -- Third-Party / External Imports --
 from semanticscholar import SemanticScholar
-from litellm import completion
+from pydantic import BaseModel, Field
 from langchain import hub
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain.schema import Document
 from langchain_community.chat_models import ChatLiteLLM
-from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import ConfigurableField
 
 # -- Local Imports (adjust paths if needed) --
 from paperscraper.pubmed import get_query_from_keywords_and_date, get_pubmed_papers
 from paperscraper.arxiv import get_arxiv_papers_api
-from paperscraper.xrxiv.xrxiv_query import XRXivQuery
-# from paperscraper.pdf import save_pdf  # only if needed
+from paper_merge import merge_and_rank
+from local_rerank import rerank_texts
+from preprint_dumps import get_dump_index
+from corpus_index import search_corpus
+from embedding_backends import get_embedding_backend
+from pdf_library import search_library
+from model_routing import model_policy
+from structured_output import complete_structured
+from usage_ledger import record_usage
+from reply_budget import reply_budgets
+from traffic_log import traffic_log
 
 # =============================================================================
 # 1) Load environment variables
@@ -51,10 +64,6 @@ logger.info(f"ANTHROPIC_API_KEY loaded: {bool(ANTHROPIC_API_KEY)}")
 # 2) Configuration Constants
 # =============================================================================
 
-BIOARXIV_FILEPATH = "server_dumps/biorxiv_2025-03-11.jsonl"
-MEDARXIV_FILEPATH = "server_dumps/medrxiv_2025-03-11.jsonl"
-CHEMARXIV_FILEPATH = "server_dumps/chemrxiv_2025-03-11.jsonl"
-
 PAPER_METADATA_FIELDS = ["title", "authors", "date", "abstract", "doi"]
 
 NUM_KEYWORDS = 2
@@ -63,11 +72,28 @@ MAX_ARXIV_RESULTS = 10
 MAX_BIOARXIV_RESULTS = 10
 MAX_CHEMARXIV_RESULTS = 10
 MAX_S2_RESULTS = 10
-MAX_TOKENS = 10000
+MAX_PREPRINT_RESULTS = 10
+MAX_LIBRARY_RESULTS = 5
 TEMPERATURE = 0.7
 MAX_SOURCES_TO_PRINT = 2
 
-# You can switch model here if you like, e.g. "anthropic/claude-3-5" or "mistral/mistral-small"
+# Extra sources queried alongside the one the LLM picks (comma-separated, e.g. "semanticscholar,arxiv").
+# Results from all sources are deduplicated and ranked before the RAG step.
+# "preprints" adds semantic search over the locally indexed bioRxiv/medRxiv/chemRxiv dumps,
+# "bioarxiv"/"medarxiv"/"chemarxiv" keyword search over one dump (kept current with
+# `python manage_dumps.py ingest`), "library" full-text search over the lab's own papers
+# (see manage_library.py).
+EXTRA_SOURCES = [s.strip() for s in os.getenv("TOOL_AGENT_EXTRA_SOURCES", "").split(",") if s.strip()]
+MAX_MERGED_PAPERS = 20
+
+# How abstracts are narrowed down before they reach the LLM:
+#   "faiss" - embed with EMBEDDING_BACKEND (OpenAI by default) and retrieve from a FAISS index (default)
+#   "bm25"  - score locally with BM25 against the keywords and the last speaker's turn
+RETRIEVAL_MODE = os.getenv("TOOL_AGENT_RETRIEVAL_MODE", "faiss").lower()
+RETRIEVAL_TOP_K = int(os.getenv("TOOL_AGENT_RETRIEVAL_TOP_K", "4"))
+
+# Model for the answer step, e.g. "anthropic/claude-3-5" or "mistral/mistral-small".
+# Keyword extraction is a control call and uses the routing policy's "keywords" model.
 MODEL = "openai/gpt-4o"  
 
 ERROR_MESSAGE = "Unable to retrieve information."
@@ -108,56 +134,154 @@ def query_arxiv(query: str) -> list[dict]:
     return papers.to_dict(orient="records")
 
 
+def plain_query(query: str) -> str:
+    """Strip the boolean syntax, which only matters to keyword search engines."""
+    return " ".join(re.sub(r"[()]|\b(?:AND|OR)\b", " ", query).split())
+
+
+def dump_keywords(query: str) -> list[str]:
+    """The AND-separated terms of a query, as the dump search expects them (matched as regexes)."""
+    return [re.escape(term) for term in (plain_query(part) for part in re.split(r"\bAND\b", query)) if term]
+
+
 def query_bioarxiv(query: str) -> list[dict]:
     """Get papers from local biorxiv dump."""
-    querier = XRXivQuery(BIOARXIV_FILEPATH)
-    papers = querier.search_keywords(query, fields=PAPER_METADATA_FIELDS)
-    return papers.to_dict(orient="records")
+    papers = get_dump_index("biorxiv").search_keywords(dump_keywords(query), fields=PAPER_METADATA_FIELDS)
+    return papers.head(MAX_BIOARXIV_RESULTS).to_dict(orient="records")
 
 
 def query_medarxiv(query: str) -> list[dict]:
     """Get papers from local medarxiv dump."""
-    querier = XRXivQuery(MEDARXIV_FILEPATH)
-    papers = querier.search_keywords(query, fields=PAPER_METADATA_FIELDS)
-    return papers.to_dict(orient="records")
+    papers = get_dump_index("medrxiv").search_keywords(dump_keywords(query), fields=PAPER_METADATA_FIELDS)
+    return papers.head(MAX_BIOARXIV_RESULTS).to_dict(orient="records")
 
 
 def query_chemarxiv(query: str) -> list[dict]:
     """Get papers from local chemarxiv dump."""
-    querier = XRXivQuery(CHEMARXIV_FILEPATH)
-    papers = querier.search_keywords(query, fields=PAPER_METADATA_FIELDS)
-    return papers.to_dict(orient="records")
+    papers = get_dump_index("chemrxiv").search_keywords(dump_keywords(query), fields=PAPER_METADATA_FIELDS)
+    return papers.head(MAX_CHEMARXIV_RESULTS).to_dict(orient="records")
+
+
+def query_preprints(query: str) -> list[dict]:
+    """Semantic search over the local preprint dumps (needs `manage_dumps.py build-index`)."""
+    papers = search_corpus(plain_query(query), k=MAX_PREPRINT_RESULTS)
+    return [{field: paper.get(field) for field in PAPER_METADATA_FIELDS} for paper in papers]
+
+
+def query_library(query: str) -> list[dict]:
+    """Full-text search over the lab's own papers (needs `manage_library.py ingest`)."""
+    return search_library(plain_query(query), k=MAX_LIBRARY_RESULTS)
 
 # You can expand your function_to_call dict with more archives if you like
 function_to_call = {
     "pubmed": query_pubmed,
     "arxiv": query_arxiv,
     "semanticscholar": query_s2,
-    # "bioarxiv": query_bioarxiv,
-    # "medarxiv": query_medarxiv,
-    # "chemarxiv": query_chemarxiv,
+    "preprints": query_preprints,
+    "library": query_library,
+    "bioarxiv": query_bioarxiv,
+    "medarxiv": query_medarxiv,
+    "chemarxiv": query_chemarxiv,
 }
 
 # =============================================================================
-# 4) Main tool_agent function
+# 3b) Retrieval helpers
 # =============================================================================
 
-def tool_agent(conversation: str) -> str:
+def select_context_documents(
+    docs: list[Document],
+    input_str: str,
+    conversation: str,
+    keywords: list[str],
+    mode: str = RETRIEVAL_MODE,
+    k: int = RETRIEVAL_TOP_K,
+    vectorstore: Optional[FAISS] = None,
+    embeddings=None,
+) -> list[Document]:
     """
-    The specialized tool agent that:
-    1) Reads the conversation so far.
-    2) Extracts up to NUM_KEYWORDS from the conversation (using an LLM).
-    3) Decides which resource to query (pubmed, arxiv, semanticscholar, etc.).
-    4) Retrieves relevant papers from that resource.
-    5) Summarizes them with a retrieval QA chain (LangChain).
-    6) Returns text with references.
+    Pick the k abstracts that will be stuffed into the LLM prompt.
+
+    In "bm25" mode the abstracts are scored locally against the keywords and the
+    last speaker's turn. Otherwise they are embedded and retrieved with FAISS,
+    reusing `vectorstore` if it was already built for these docs. `embeddings`
+    defaults to the configured backend (EMBEDDING_BACKEND).
+    """
+    if mode == "bm25":
+        indices = rerank_texts([d.page_content for d in docs], keywords, conversation, k)
+        return [docs[i] for i in indices]
+
+    if vectorstore is None:
+        vectorstore = FAISS.from_documents(docs, embeddings or get_embedding_backend())
+    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    return retriever.invoke(input_str)
+
+
+_combine_docs_chain = None
+
+
+class UsageRecorder(BaseCallbackHandler):
+    """Records the answer step's token usage in the usage ledger and its length in the reply budgets."""
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        self.max_tokens = max_tokens
+
+    def on_llm_end(self, response, **kwargs):
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage")
+        record_usage(llm_output.get("model") or MODEL, token_usage)
+        generation_info = (response.generations[0][0].generation_info or {}) if response.generations and response.generations[0] else {}
+        reply_budgets.observe(
+            "tool_agent",
+            (token_usage or {}).get("completion_tokens", 0),
+            self.max_tokens,
+            generation_info.get("finish_reason"),
+        )
+
+
+def get_combine_docs_chain():
+    """The stuff-documents QA chain, built once (pulling the prompt hits the LangChain hub).
+
+    max_tokens is configurable per call: config={"configurable": {"max_tokens": n}}.
+    """
+    global _combine_docs_chain
+    if _combine_docs_chain is None:
+        retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
+        llm = ChatLiteLLM(
+            model=MODEL,
+            temperature=TEMPERATURE,
+            max_tokens=reply_budgets.max_tokens("tool_agent")
+        ).configurable_fields(max_tokens=ConfigurableField(id="max_tokens"))
+        _combine_docs_chain = create_stuff_documents_chain(llm, retrieval_qa_chat_prompt)
+    return _combine_docs_chain
+
+# =============================================================================
+# 4) Main tool_agent function
+# =============================================================================
+
+class LiteratureQuery(BaseModel):
+    """What the keyword-extraction call returns: sources to query and keywords."""
+    resource: Union[str, Annotated[List[str], Field(min_length=1)]]  # An empty list is repaired, not searched
+    keywords: List[str]
+
+
+@dataclass
+class LiteratureContext:
+    """Search results for one Tool Agent query: everything needed before the answer step."""
+    resources: list[str]
+    keywords: list[str]
+    papers: list[dict]
+    docs: list[Document]
+    vectorstore: Optional[FAISS] = None  # Pre-built FAISS index (prefetch in "faiss" mode)
+    created_at: float = field(default_factory=time.time)
 
-    Args:
-        conversation: The entire conversation so far.
+
+def search_literature(conversation: str) -> Optional[LiteratureContext]:
+    """
+    Steps 1-4 of the Tool Agent: extract keywords and resources from the
+    conversation with an LLM, query the sources and merge the results.
 
     Returns:
-        A text response summarizing newly discovered information and sources,
-        or an ERROR_MESSAGE if something fails.
+        A LiteratureContext, or None if keyword extraction or the search fails.
     """
     # 1) Use your model to parse the conversation for the resource + keywords
     messages = [
@@ -168,7 +292,7 @@ def tool_agent(conversation: str) -> str:
                 "Whenever you receive a conversation transcript, use it to identify up to {NUM_KEYWORDS} keywords "
                 "from the last speaker. Then decide which source to obtain additional information from. "
                 "The available sources are pubmed for medical, arxiv for comp sci/physics/mathematics, "
-                "and semanticscholar for other fields."
+                "and semanticscholar for other fields. If several sources are relevant you may list more than one."
             )
         },
         {
@@ -177,94 +301,35 @@ def tool_agent(conversation: str) -> str:
                 f"{conversation}\n\n"
                 f"Given the above conversation, give me up to {NUM_KEYWORDS} keywords I should obtain additional "
                 "information on AND tell me which resource (pubmed/arxiv/semanticscholar) is best. "
-                "Answer as valid JSON with keys `resource` (string) and `keywords` (list of strings)."
+                "Answer as valid JSON with keys `resource` (string, or list of strings if several "
+                "sources are relevant) and `keywords` (list of strings)."
             )
         }
     ]
 
     try:
-        # 2) Call an LLM to get a JSON with resource + keywords
-        completion_resp = completion(
-            model=MODEL,
-            messages=messages,
+        # 2) Call an LLM for schema-validated JSON with resource + keywords
+        query = complete_structured(
+            model_policy.model_for("keywords"),
+            messages,
+            LiteratureQuery,
             temperature=TEMPERATURE,
-            max_tokens=MAX_TOKENS,
+            reply_kind="keywords",
         )
-        json_str = completion_resp.choices[0].message.content.strip()
     except Exception as e:
         logger.error(f"LLM error in tool_agent: {e}")
-        return ERROR_MESSAGE
+        return None
 
-    logger.debug(f"tool_agent JSON from LLM: {json_str}")
-
-    def parse_llm_json_output(llm_output: str):
-        """
-        Safely extracts and parses JSON from a string that may include
-        triple backticks and optional "json" language tags.
-        """
-
-        # 1. Use a regex to capture anything between ```json ... ``` or just ``` ... ```.
-        #    This handles the case where the LLM might output:
-        #
-        #    ```json
-        #    {
-        #      "resource": "arxiv",
-        #      "keywords": ["AI", "latest research"]
-        #    }
-        #    ```
-        #
-        #    or
-        #
-        #    ```
-        #    {
-        #      "resource": "arxiv",
-        #      "keywords": ["AI", "latest research"]
-        #    }
-        #    ```
-        
-        pattern = r"```(?:json)?\s*(.*?)\s*```"
-        match = re.search(pattern, llm_output, re.DOTALL)
-        
-        if match:
-            # Extract just the JSON part inside the code block
-            json_str = match.group(1)
-        else:
-            # If there's no fenced code block, assume the entire string is JSON
-            json_str = llm_output.strip()
+    logger.debug(f"tool_agent query from LLM: {query}")
 
-        try:
-            # 2. Attempt to parse the JSON
-            json_dict = json.loads(json_str)
-            
-            # 3. Extract required fields
-            resource = json_dict["resource"]
-            keywords = json_dict["keywords"]
-            
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            logger.error(f"Error decoding JSON or missing keys: {e}")
-            return ERROR_MESSAGE
-        
-        # 4. You can now safely use `resource` and `keywords`
-        return resource, keywords
-
-    resource, keywords = parse_llm_json_output(json_str)
-    # # 3) Parse the JSON to extract "resource" and "keywords"
-    # try:
-    #     print(json_str)
-    #     json_dict = json.loads(json_str)
-    #     resource = json_dict["resource"]
-    #     keywords = json_dict["keywords"]
-    # except (json.JSONDecodeError, KeyError, TypeError) as e:
-    #     logger.error(f"Error decoding JSON or missing keys: {e}")
-    #     return ERROR_MESSAGE
-
-    # Validate
-    if not isinstance(resource, str):
-        logger.error("`resource` is not a string.")
-        return ERROR_MESSAGE
+    resources = [query.resource] if isinstance(query.resource, str) else list(query.resource)
+    keywords = query.keywords
+    for extra in EXTRA_SOURCES:
+        if extra not in resources:
+            resources.append(extra)
     if not isinstance(keywords, list) or any(not isinstance(k, str) for k in keywords):
         logger.error("`keywords` must be a list of strings.")
-        return ERROR_MESSAGE
+        return None
 
     # 4) Formulate a search query from the keywords and query the chosen resource
     def get_papers(resource_name: str, keywords_list: list[str]) -> list[dict]:
@@ -278,13 +343,27 @@ def tool_agent(conversation: str) -> str:
             keywords_list, start_date="None", end_date="None"
         )
         logger.info(f"tool_agent: Querying {resource_name} with: {query_string}")
-        papers_list = func(query_string)
-        return papers_list
+        # Recorded and replayed with the meeting's LLM traffic (see traffic_log.py)
+        return traffic_log.tool_call(
+            "search", {"resource": resource_name, "query": query_string}, lambda: func(query_string)
+        )
 
-    papers = get_papers(resource, keywords)
+    # Query every chosen source concurrently, then merge duplicates across sources
+    with ThreadPoolExecutor(max_workers=len(resources)) as pool:
+        # Each in a copy of the caller's context, so the searches are logged to its meeting
+        futures = {name: pool.submit(contextvars.copy_context().run, get_papers, name, keywords) for name in resources}
+    papers_by_source = {}
+    for name, future in futures.items():
+        try:
+            papers_by_source[name] = future.result()
+        except Exception as e:
+            logger.error(f"Error querying {name}: {e}")
+            papers_by_source[name] = []
+
+    papers = merge_and_rank(papers_by_source, keywords)[:MAX_MERGED_PAPERS]
     if not papers:
         logger.warning("No relevant papers found for the chosen resource/keywords.")
-        return ERROR_MESSAGE
+        return None
 
     # 5) Turn the abstracts into a small RAG pipeline for summarization
     docs = []
@@ -296,22 +375,54 @@ def tool_agent(conversation: str) -> str:
 
     if not docs:
         logger.warning("All retrieved papers had empty abstracts.")
-        return ERROR_MESSAGE
+        return None
 
-    # Create vector store from docs
-    embeddings = OpenAIEmbeddings()  # uses OPENAI_API_KEY under the hood
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    retriever = vectorstore.as_retriever()
-
-    # Create a retrieval-qa pipeline
-    retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
-    llm = ChatLiteLLM(
-        model=MODEL,
-        temperature=TEMPERATURE,
-        max_tokens=MAX_TOKENS
-    )
-    combine_docs_chain = create_stuff_documents_chain(llm, retrieval_qa_chat_prompt)
-    retrieval_chain = create_retrieval_chain(retriever, combine_docs_chain)
+    return LiteratureContext(resources=resources, keywords=keywords, papers=papers, docs=docs)
+
+
+def prefetch_literature(conversation: str) -> Optional[LiteratureContext]:
+    """
+    Search ahead of time so a later Tool Agent turn only has to answer.
+
+    In "faiss" mode the vector index is built here too, so the embedding calls
+    also happen off the critical path.
+    """
+    literature_context = search_literature(conversation)
+    if literature_context and RETRIEVAL_MODE != "bm25":
+        literature_context.vectorstore = FAISS.from_documents(literature_context.docs, get_embedding_backend())
+    return literature_context
+
+
+def tool_agent(conversation: str, literature_context: Optional[LiteratureContext] = None) -> str:
+    """
+    The specialized tool agent that:
+    1) Reads the conversation so far.
+    2) Extracts up to NUM_KEYWORDS from the conversation (using an LLM).
+    3) Decides which resource(s) to query (pubmed, arxiv, semanticscholar, etc.).
+    4) Retrieves relevant papers and merges duplicates across sources.
+    5) Narrows the abstracts down (FAISS or local BM25) and summarizes them
+       with a stuff-documents QA chain (LangChain).
+    6) Returns text with references.
+
+    Steps 1-4 are skipped when warm results from prefetch_literature() are passed in.
+
+    Args:
+        conversation: The entire conversation so far.
+        literature_context: Optional prefetched search results to answer from.
+
+    Returns:
+        A text response summarizing newly discovered information and sources,
+        or an ERROR_MESSAGE if something fails.
+    """
+    if literature_context is None:
+        literature_context = search_literature(conversation)
+        if literature_context is None:
+            return ERROR_MESSAGE
+    else:
+        logger.info(f"tool_agent: Answering from prefetched results ({len(literature_context.docs)} abstracts)")
+
+    docs = literature_context.docs
+    keywords = literature_context.keywords
 
     # The actual question to pass to the retriever:
     input_str = (
@@ -320,17 +431,27 @@ def tool_agent(conversation: str) -> str:
     )
 
     try:
-        response = retrieval_chain.invoke({"input": input_str})
-        answer_text = response["answer"]
+        context_docs = select_context_documents(
+            docs, input_str, conversation, keywords, vectorstore=literature_context.vectorstore
+        )
+        max_tokens = reply_budgets.max_tokens("tool_agent")
+        answer_text = traffic_log.tool_call(
+            "tool_answer",
+            {"model": MODEL, "input": input_str, "context": [doc.page_content for doc in context_docs]},
+            lambda: get_combine_docs_chain().invoke(
+                {"input": input_str, "context": context_docs},
+                config={"callbacks": [UsageRecorder(max_tokens)], "configurable": {"max_tokens": max_tokens}},
+            ),
+        )
     except Exception as e:
         logger.error(f"Error in retrieval QA chain: {e}")
         return ERROR_MESSAGE
 
     # 6) Build a final output with references
-    output = f"**[Tool Agent]** Searching *{resource}* for relevant info...\n\n"
+    output = f"**[Tool Agent]** Searching *{', '.join(literature_context.resources)}* for relevant info...\n\n"
     output += answer_text
     output += "\n\n**Sources (sample)**\n"
-    for paper in papers[:MAX_SOURCES_TO_PRINT]:
+    for paper in literature_context.papers[:MAX_SOURCES_TO_PRINT]:
         title = paper.get("title") or "Untitled"
         output += f"- {title}\n"
 
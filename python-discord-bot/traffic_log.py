@@ -0,0 +1,371 @@
+# traffic_log.py
+
+"""
+Record and replay of LLM and Tool Agent traffic.
+
+Recording (LLM_RECORD_DIR=traffic) appends one compact JSON line per call to
+<dir>/<meeting id>.jsonl: every chat completion (plain, streamed, structured,
+batched), every Tool Agent literature search and QA answer, and a header with
+the meeting's setup. Each line holds the request's hash, the model, the
+response, the error if the call failed, and its timing (total and time to
+first token). With LLM_RECORD_REQUESTS=true the prompts are stored too.
+
+Replay (LLM_REPLAY_DIR=traffic) answers calls from such logs instead of the
+providers: a request is matched by its hash (model, messages, temperature, n,
+stop, response format; not max_tokens, which the reply budgets adapt), and
+repeated identical requests get their recorded responses in order. Responses
+arrive after the recorded latency times LLM_REPLAY_LATENCY_SCALE (0 for
+instant). A request that was never recorded is simulated (see
+llm_simulator.py), or fails with LLM_REPLAY_ON_MISS=error; a Tool Agent step
+that was never recorded runs live.
+
+replay_meetings.py reruns recorded meetings this way, to benchmark
+orchestrator and database changes against real traffic.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import litellm
+from litellm import CustomLLM, ModelResponse
+
+from llm_simulator import llm_simulator, message_text
+from prompt_cache import usage_dict
+from usage_ledger import current_scope
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "replay/"
+
+# Record every call to <LLM_RECORD_DIR>/<meeting id>.jsonl (off when empty), optionally with prompts
+LLM_RECORD_DIR = os.getenv("LLM_RECORD_DIR", "").strip()
+LLM_RECORD_REQUESTS = os.getenv("LLM_RECORD_REQUESTS", "false").lower() == "true"
+
+# Serve calls from the logs in this directory (or file), with latencies scaled by LLM_REPLAY_LATENCY_SCALE;
+# unrecorded LLM calls are "simulate"d or raise an "error"
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", "").strip()
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1"))
+LLM_REPLAY_ON_MISS = os.getenv("LLM_REPLAY_ON_MISS", "simulate").lower()
+
+
+class ReplayMiss(LookupError):
+    """A replayed call that is not in the logs (with LLM_REPLAY_ON_MISS=error)."""
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str, separators=(",", ":")).encode()
+    ).hexdigest()[:24]
+
+
+def chat_key(model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+    """The replay key of a chat completion (max_tokens and streaming do not change it)."""
+    stop = params.get("stop")
+    return request_key({
+        "model": model,
+        "messages": [[m.get("role"), message_text(m)] for m in messages],
+        "temperature": params.get("temperature"),
+        "n": params.get("n") or 1,
+        "stop": [stop] if isinstance(stop, str) else (stop or None),
+        "response_format": params.get("response_format"),
+    })
+
+
+def response_record(response: Any) -> Dict[str, Any]:
+    """The parts of a litellm response that are replayed."""
+    choices = getattr(response, "choices", None) or []
+    return {
+        "choices": [(choice.message.content or "") for choice in choices],
+        "finish": getattr(choices[0], "finish_reason", None) if choices else None,
+        "usage": usage_dict(getattr(response, "usage", None)),
+    }
+
+
+def meeting_file(meeting_id: Optional[str]) -> str:
+    return re.sub(r"[^\w.-]", "_", str(meeting_id or "unscoped")) + ".jsonl"
+
+
+class TrafficLog(CustomLLM):
+    """Appends calls to per-meeting logs, and serves "replay/<model>" from loaded logs."""
+
+    def __init__(
+        self,
+        record_dir: str = "",
+        include_requests: bool = False,
+        replay_dir: str = "",
+        latency_scale: float = 1.0,
+        on_miss: str = "simulate",
+    ):
+        super().__init__()
+        self.record_dir = record_dir
+        self.include_requests = include_requests
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.replay_dir = ""
+        self.hits = 0
+        self.misses = 0
+        if replay_dir:
+            self.load(replay_dir)
+
+    @classmethod
+    def from_env(cls) -> "TrafficLog":
+        return cls(
+            record_dir=LLM_RECORD_DIR,
+            include_requests=LLM_RECORD_REQUESTS,
+            replay_dir=LLM_REPLAY_DIR,
+            latency_scale=LLM_REPLAY_LATENCY_SCALE,
+            on_miss=LLM_REPLAY_ON_MISS,
+        )
+
+    @property
+    def recording(self) -> bool:
+        return bool(self.record_dir)
+
+    @property
+    def replaying(self) -> bool:
+        return bool(self.replay_dir)
+
+    # Recording
+
+    def _append(self, entry: Dict[str, Any], meeting_id: Optional[str] = None) -> None:
+        meeting_id = meeting_id or current_scope().meeting_id
+        line = json.dumps(entry, default=str, separators=(",", ":"))
+        path = Path(self.record_dir) / meeting_file(meeting_id)
+        try:
+            with self._lock:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record {entry.get('kind')} call to {path}: {e}")
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        model: str,
+        started: float,
+        latency_ms: float,
+        response: Any = None,
+        error: Optional[BaseException] = None,
+        ttft_ms: Optional[float] = None,
+        request: Any = None,
+    ) -> None:
+        """
+        Append one call to the current meeting's log.
+
+        Args:
+            kind: "chat", "stream", "batch", "structured", "search" or "tool_answer"
+            key: The request's replay key (see chat_key / request_key)
+            model: Full litellm model string ("" for non-LLM calls)
+            started: Wall-clock start (time.time())
+            latency_ms: Time until the complete response (or the error)
+            response: The response (JSON-serializable)
+            error: The call's exception, if it failed
+            ttft_ms: Time to first token of a stream
+            request: The request, stored with LLM_RECORD_REQUESTS
+        """
+        if not self.recording:
+            return
+        entry = {"ts": round(started, 3), "kind": kind, "key": key, "model": model, "ms": round(latency_ms, 1)}
+        if ttft_ms is not None:
+            entry["ttft_ms"] = round(ttft_ms, 1)
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        else:
+            entry["response"] = response
+        if self.include_requests and request is not None:
+            entry["request"] = request
+        self._append(entry)
+
+    def record_meeting(self, meeting_id: str, setup: Dict[str, Any]) -> None:
+        """Append a meeting's setup (agents, agenda, rounds, modes) to its log, for replay_meetings.py."""
+        if self.recording:
+            self._append({"ts": round(time.time(), 3), "kind": "meeting", "meeting": setup}, meeting_id)
+
+    async def observe(self, kind: str, model: str, call: Dict[str, Any], completion: Awaitable[Any]) -> Any:
+        """Await a litellm completion made with `call` (messages and options) and record it."""
+        if not self.recording:
+            return await completion
+        key = chat_key(model, call["messages"], call)
+        started, start = time.time(), time.perf_counter()
+        try:
+            response = await completion
+        except Exception as e:
+            self.record(kind, key, model, started, (time.perf_counter() - start) * 1000, error=e, request=call)
+            raise
+        self.record(kind, key, model, started, (time.perf_counter() - start) * 1000, response_record(response), request=call)
+        return response
+
+    def observe_sync(self, kind: str, model: str, call: Dict[str, Any], completion: Callable[[], Any]) -> Any:
+        """Blocking variant of observe()."""
+        if not self.recording:
+            return completion()
+        key = chat_key(model, call["messages"], call)
+        started, start = time.time(), time.perf_counter()
+        try:
+            response = completion()
+        except Exception as e:
+            self.record(kind, key, model, started, (time.perf_counter() - start) * 1000, error=e, request=call)
+            raise
+        self.record(kind, key, model, started, (time.perf_counter() - start) * 1000, response_record(response), request=call)
+        return response
+
+    def tool_call(self, kind: str, payload: Dict[str, Any], live: Callable[[], Any]) -> Any:
+        """
+        A Tool Agent step (literature search, QA answer): replayed if recorded, else run (and recorded).
+
+        Args:
+            kind: "search" or "tool_answer"
+            payload: What the result depends on (JSON-serializable)
+            live: Runs the step
+        """
+        key = request_key({"kind": kind, **payload})
+        if self.replaying:
+            entry = self.next_entry(key)
+            if entry is not None:
+                time.sleep(self.delay(entry["ms"]))
+                return entry["response"]
+            if self.on_miss == "error":
+                raise ReplayMiss(f"No recorded {kind} for {key}")
+        started, start = time.time(), time.perf_counter()
+        try:
+            result = live()
+        except Exception as e:
+            self.record(kind, key, "", started, (time.perf_counter() - start) * 1000, error=e, request=payload)
+            raise
+        self.record(kind, key, "", started, (time.perf_counter() - start) * 1000, result, request=payload)
+        return result
+
+    # Replay
+
+    def load(self, path: str) -> None:
+        """Serve the successful calls in a log file, or in every *.jsonl in a directory."""
+        files = sorted(Path(path).glob("*.jsonl")) if Path(path).is_dir() else [Path(path)]
+        count = 0
+        for file in files:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry.get("key") and "response" in entry:
+                        self._entries.setdefault(entry["key"], deque()).append(entry)
+                        count += 1
+        self.replay_dir = str(path)
+        logger.info(f"Replaying {count} recorded calls from {len(files)} logs in {path}")
+
+    def next_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """The next recorded response to a request (the last one again once they run out)."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def delay(self, recorded_ms: Optional[float]) -> float:
+        return (recorded_ms or 0) / 1000 * self.latency_scale
+
+    def _miss(self, model: str) -> None:
+        if self.on_miss == "error":
+            raise litellm.NotFoundError(message="Request not in the replayed traffic", model=model, llm_provider="replay")
+        logger.debug(f"Replay miss for {model}, simulating")
+
+    @staticmethod
+    def _usage(recorded: Dict[str, Any]) -> Dict[str, int]:
+        usage = recorded.get("usage") or {}
+        return {k: usage.get(k, 0) for k in ("prompt_tokens", "completion_tokens", "total_tokens")}
+
+    def _response(self, model: str, entry: Dict[str, Any]) -> ModelResponse:
+        recorded = entry["response"]
+        return ModelResponse(
+            model=model,
+            choices=[
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": recorded.get("finish") or "stop"}
+                for i, text in enumerate(recorded["choices"])
+            ],
+            usage=self._usage(recorded),
+        )
+
+    async def acompletion(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                          encoding, api_key, logging_obj, optional_params, **kwargs) -> ModelResponse:
+        entry = self.next_entry(chat_key(model, messages, optional_params))
+        if entry is None:
+            self._miss(model)
+            return await llm_simulator.acompletion(model, messages, api_base, custom_prompt_dict, model_response,
+                                                   print_verbose, encoding, api_key, logging_obj, optional_params)
+        await asyncio.sleep(self.delay(entry["ms"]))
+        return self._response(model, entry)
+
+    def completion(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                   encoding, api_key, logging_obj, optional_params, **kwargs) -> ModelResponse:
+        entry = self.next_entry(chat_key(model, messages, optional_params))
+        if entry is None:
+            self._miss(model)
+            return llm_simulator.completion(model, messages, api_base, custom_prompt_dict, model_response,
+                                            print_verbose, encoding, api_key, logging_obj, optional_params)
+        time.sleep(self.delay(entry["ms"]))
+        return self._response(model, entry)
+
+    async def astreaming(self, model, messages, api_base, custom_prompt_dict, model_response, print_verbose,
+                         encoding, api_key, logging_obj, optional_params, **kwargs):
+        entry = self.next_entry(chat_key(model, messages, optional_params))
+        if entry is None:
+            self._miss(model)
+            async for chunk in llm_simulator.astreaming(model, messages, api_base, custom_prompt_dict, model_response,
+                                                         print_verbose, encoding, api_key, logging_obj, optional_params):
+                yield chunk
+            return
+        recorded = entry["response"]
+        words = recorded["choices"][0].split(" ") if recorded["choices"] else []
+        # The first token after the recorded TTFT, the rest spread over the remaining time
+        ttft_ms = entry.get("ttft_ms", entry["ms"])
+        await asyncio.sleep(self.delay(ttft_ms))
+        per_word = self.delay(max(0.0, entry["ms"] - ttft_ms)) / max(1, len(words) - 1)
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(per_word)
+            yield {"text": word if index == 0 else " " + word, "is_finished": False, "finish_reason": None,
+                   "usage": None, "index": 0, "tool_use": None}
+        yield {"text": "", "is_finished": True, "finish_reason": recorded.get("finish") or "stop",
+               "usage": self._usage(recorded), "index": 0, "tool_use": None}
+
+
+def replayed_request(full_model: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """litellm arguments sending a call for `full_model` to the replayed traffic."""
+    return {"model": PREFIX + full_model, "max_tokens": max_tokens}
+
+
+def load_meetings(path: str) -> List[Dict[str, Any]]:
+    """The recorded meeting setups in a log file or directory, in start order."""
+    files = sorted(Path(path).glob("*.jsonl")) if Path(path).is_dir() else [Path(path)]
+    meetings = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                if '"kind":"meeting"' in line:
+                    entry = json.loads(line)
+                    meetings.append({"ts": entry["ts"], **entry["meeting"]})
+    return sorted(meetings, key=lambda m: m["ts"])
+
+
+# Process-wide log
+traffic_log = TrafficLog.from_env()
+litellm.custom_provider_map = [
+    item for item in litellm.custom_provider_map if item["provider"] != PREFIX.rstrip("/")
+] + [{"provider": PREFIX.rstrip("/"), "custom_handler": traffic_log}]
+if traffic_log.recording:
+    logger.info(f"Recording LLM traffic to {traffic_log.record_dir}")
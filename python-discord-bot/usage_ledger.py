@@ -0,0 +1,260 @@
+# usage_ledger.py
+
+"""
+Token and cost accounting per meeting, session and user, with budgets.
+
+Every LLM call records its usage here (LLMClient completions and streams,
+the Tool Agent's keyword extraction and answer step, persona generation).
+Calls are attributed to whatever scope is active in the calling task:
+the orchestrator binds the meeting for the duration of a conversation, and
+the meeting commands bind the session and user. Context variables follow
+asyncio tasks and asyncio.to_thread, so background work (literature
+prefetch, deferred Tool Agent turns) is attributed correctly.
+
+Budgets are checked by the orchestrator before each turn: past
+BUDGET_DOWNGRADE_AT of a budget, calls are routed to the fast model tier;
+once a budget is spent, the remaining rounds are skipped and the meeting
+goes straight to its summary.
+"""
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prompt_cache import usage_dict
+
+logger = logging.getLogger(__name__)
+
+# Budgets; 0 means unlimited. Session and user totals are kept for the lifetime of the process.
+MEETING_TOKEN_BUDGET = int(os.getenv("MEETING_TOKEN_BUDGET", "0"))
+MEETING_COST_BUDGET_USD = float(os.getenv("MEETING_COST_BUDGET_USD", "0"))
+SESSION_COST_BUDGET_USD = float(os.getenv("SESSION_COST_BUDGET_USD", "0"))
+USER_COST_BUDGET_USD = float(os.getenv("USER_COST_BUDGET_USD", "0"))
+
+# Fraction of a budget after which calls are downgraded to the fast model tier
+BUDGET_DOWNGRADE_AT = float(os.getenv("BUDGET_DOWNGRADE_AT", "0.8"))
+
+# Price of a Batch API call relative to an interactive one (see batch_api.py)
+BATCH_COST_FACTOR = float(os.getenv("BATCH_COST_FACTOR", "0.5"))
+
+BUDGET_OK, BUDGET_DOWNGRADE, BUDGET_EXHAUSTED = "ok", "downgrade", "exhausted"
+
+
+@dataclass
+class UsageScope:
+    """Who an LLM call is billed to."""
+    meeting_id: Optional[str] = None
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+_current_scope: ContextVar[UsageScope] = ContextVar("usage_scope", default=UsageScope())
+
+
+def current_scope() -> UsageScope:
+    return _current_scope.get()
+
+
+def bind_usage_scope(**ids: Optional[str]) -> UsageScope:
+    """
+    Attribute LLM calls in the rest of the current task (and tasks it starts) to these ids.
+
+    Ids that are not given (or None) are inherited from the enclosing scope.
+    """
+    scope = replace(current_scope(), **{k: str(v) for k, v in ids.items() if v is not None})
+    _current_scope.set(scope)
+    return scope
+
+
+@contextmanager
+def usage_scope(**ids: Optional[str]) -> Iterator[UsageScope]:
+    """Like bind_usage_scope, but only within the `with` block."""
+    token = _current_scope.set(replace(current_scope(), **{k: str(v) for k, v in ids.items() if v is not None}))
+    try:
+        yield _current_scope.get()
+    finally:
+        _current_scope.reset(token)
+
+
+def estimate_cost(model: str, usage: Dict[str, int]) -> float:
+    """USD cost of a call from litellm's price table (0 for unknown models)."""
+    try:
+        import litellm
+        from litellm.types.utils import Usage
+
+        usage_object = Usage(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
+            prompt_tokens_details={"cached_tokens": usage.get("cached_tokens", 0)},
+            cache_creation_input_tokens=usage.get("cache_creation_tokens", 0),
+        )
+        prompt_cost, completion_cost = litellm.cost_per_token(model=model, usage_object=usage_object)
+        return prompt_cost + completion_cost
+    except Exception as e:
+        logger.debug(f"No price for {model}: {e}")
+        return 0.0
+
+
+@dataclass
+class UsageTotals:
+    """Accumulated usage for one meeting, session or user."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+    calls: int = 0
+    by_model: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def add(self, model: str, usage: Dict[str, int], cost: float) -> None:
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cached_tokens += usage.get("cached_tokens", 0)
+        self.total_tokens += usage.get("total_tokens", 0)
+        self.cost_usd += cost
+        self.calls += 1
+        per_model = self.by_model.setdefault(model, {"totalTokens": 0, "costUsd": 0.0, "calls": 0})
+        per_model["totalTokens"] += usage.get("total_tokens", 0)
+        per_model["costUsd"] += cost
+        per_model["calls"] += 1
+
+    def add_share(self, other: "UsageTotals", index: int, count: int) -> None:
+        """Add share `index` of `count` equal shares of `other` (token and call counts stay whole)."""
+        def part(n):
+            return int(n) // count + (1 if index < int(n) % count else 0)
+
+        self.prompt_tokens += part(other.prompt_tokens)
+        self.completion_tokens += part(other.completion_tokens)
+        self.cached_tokens += part(other.cached_tokens)
+        self.total_tokens += part(other.total_tokens)
+        self.cost_usd += other.cost_usd / count
+        self.calls += part(other.calls)
+        for model, totals in other.by_model.items():
+            per_model = self.by_model.setdefault(model, {"totalTokens": 0, "costUsd": 0.0, "calls": 0})
+            per_model["totalTokens"] += part(totals["totalTokens"])
+            per_model["costUsd"] += totals["costUsd"] / count
+            per_model["calls"] += part(totals["calls"])
+
+    def to_record(self) -> Dict[str, Any]:
+        """The totals as stored on the meeting record (camelCase, like the API)."""
+        return {
+            "promptTokens": self.prompt_tokens,
+            "completionTokens": self.completion_tokens,
+            "cachedTokens": self.cached_tokens,
+            "totalTokens": self.total_tokens,
+            "costUsd": round(self.cost_usd, 6),
+            "calls": self.calls,
+            "byModel": self.by_model,
+        }
+
+
+@dataclass
+class Budget:
+    """Token and/or cost limits (None or 0 means no limit)."""
+    max_tokens: Optional[int] = None
+    max_cost_usd: Optional[float] = None
+
+    def fraction_used(self, totals: UsageTotals) -> float:
+        fractions = [0.0]
+        if self.max_tokens:
+            fractions.append(totals.total_tokens / self.max_tokens)
+        if self.max_cost_usd:
+            fractions.append(totals.cost_usd / self.max_cost_usd)
+        return max(fractions)
+
+
+DEFAULT_MEETING_BUDGET = Budget(MEETING_TOKEN_BUDGET or None, MEETING_COST_BUDGET_USD or None)
+DEFAULT_SESSION_BUDGET = Budget(max_cost_usd=SESSION_COST_BUDGET_USD or None)
+DEFAULT_USER_BUDGET = Budget(max_cost_usd=USER_COST_BUDGET_USD or None)
+
+
+class UsageLedger:
+    """Process-wide usage totals keyed by ("meeting" | "session" | "user", id)."""
+
+    def __init__(self):
+        self.totals: Dict[Tuple[str, str], UsageTotals] = {}
+        # Records arrive from worker threads (Tool Agent pipeline) as well as the event loop
+        self._lock = threading.Lock()
+
+    def totals_for(self, kind: str, key: Optional[str]) -> UsageTotals:
+        with self._lock:
+            return self.totals.setdefault((kind, str(key)), UsageTotals())
+
+    def record(self, model: str, usage: Any, scope: Optional[UsageScope] = None, batch: bool = False) -> float:
+        """
+        Add a call's usage to its meeting, session and user.
+
+        Args:
+            model: Full litellm model string (for pricing)
+            usage: Usage dict or litellm Usage object
+            scope: Attribution (defaults to the current scope)
+            batch: The call went through a provider batch (priced at BATCH_COST_FACTOR)
+
+        Returns:
+            The estimated cost of the call in USD
+        """
+        usage = usage_dict(usage)
+        cost = estimate_cost(model, usage)
+        if batch:
+            cost *= BATCH_COST_FACTOR
+        scope = scope or current_scope()
+        with self._lock:
+            for kind, key in (("meeting", scope.meeting_id), ("session", scope.session_id), ("user", scope.user_id)):
+                if key is not None:
+                    self.totals.setdefault((kind, key), UsageTotals()).add(model, usage, cost)
+        return cost
+
+    def split(self, kind: str, key: str, keys: List[str]) -> None:
+        """
+        Move the usage recorded under (kind, key) to `keys` in equal shares.
+
+        For calls made on behalf of several meetings at once (e.g. the PI opening
+        sampled for all runs of a parallel group).
+        """
+        with self._lock:
+            shared = self.totals.pop((kind, str(key)), None)
+            if shared is None or not keys:
+                return
+            for index, share_key in enumerate(keys):
+                self.totals.setdefault((kind, str(share_key)), UsageTotals()).add_share(shared, index, len(keys))
+
+    def budget_status(
+        self,
+        scope: Optional[UsageScope] = None,
+        meeting_budget: Optional[Budget] = None,
+    ) -> str:
+        """
+        BUDGET_OK, BUDGET_DOWNGRADE or BUDGET_EXHAUSTED for the tightest applicable budget.
+
+        Args:
+            scope: Meeting, session and user to check (defaults to the current scope)
+            meeting_budget: Per-meeting budget (defaults to the deployment's)
+        """
+        scope = scope or current_scope()
+        checks = (
+            ("meeting", scope.meeting_id, meeting_budget or DEFAULT_MEETING_BUDGET),
+            ("session", scope.session_id, DEFAULT_SESSION_BUDGET),
+            ("user", scope.user_id, DEFAULT_USER_BUDGET),
+        )
+        used = max(
+            [budget.fraction_used(self.totals_for(kind, key)) for kind, key, budget in checks if key is not None] or [0.0]
+        )
+        if used >= 1:
+            return BUDGET_EXHAUSTED
+        if used >= BUDGET_DOWNGRADE_AT:
+            return BUDGET_DOWNGRADE
+        return BUDGET_OK
+
+
+# Process-wide ledger
+usage_ledger = UsageLedger()
+
+
+def record_usage(model: str, usage: Any, batch: bool = False) -> float:
+    """Record a call's usage against the current scope (see UsageLedger.record)."""
+    return usage_ledger.record(model, usage, batch=batch)